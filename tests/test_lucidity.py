@@ -0,0 +1,43 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module that contains tests for vendored lucidity template parsing
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import pytest
+
+from tp.common.nameit.vendor import lucidity
+
+
+@pytest.fixture
+def templates():
+    return [lucidity.Template('shot', '/shots/{shot}'), lucidity.Template('asset', '/assets/{asset}')]
+
+
+def test_parse_with_list(templates):
+    data, template = lucidity.parse('/assets/chair', templates)
+
+    assert data == {'asset': 'chair'}
+    assert template is templates[1]
+
+
+def test_parse_with_generator(templates):
+    data, template = lucidity.parse('/shots/010', (template for template in templates))
+
+    assert data == {'shot': '010'}
+    assert template is templates[0]
+
+
+def test_get_matcher_with_iterator_is_cached(templates):
+    matcher = lucidity.get_matcher(iter(templates))
+
+    assert lucidity.get_matcher(templates) is matcher
+    assert matcher.parse('/assets/chair')[1] is templates[1]
+
+
+def test_parse_no_match(templates):
+    with pytest.raises(lucidity.ParseError):
+        lucidity.parse('/unknown/path', iter(templates))
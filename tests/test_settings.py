@@ -0,0 +1,76 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module that contains tests for file settings write batching
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import json
+import time
+
+import pytest
+
+from tp.common.python import settings
+
+
+def _read_json(settings_object):
+    with open(settings_object.file_path, 'r') as settings_file:
+        return json.load(settings_file)
+
+
+@pytest.fixture
+def json_settings(tmpdir):
+    json_settings = settings.JSONSettings(str(tmpdir))
+    json_settings.set('a', 1)
+    yield json_settings
+    json_settings.set_write_delay(0)
+
+
+def test_delayed_write_is_deferred_during_transaction(json_settings):
+    json_settings.set_write_delay(0.1)
+    with json_settings.transaction():
+        json_settings.set('b', 'partial')
+        time.sleep(0.3)
+        assert 'b' not in _read_json(json_settings)
+
+    json_settings.flush()
+    assert _read_json(json_settings) == {'a': 1, 'b': 'partial'}
+
+
+def test_delayed_write_is_not_written_after_rollback(json_settings):
+    json_settings.set_write_delay(0.1)
+    json_settings.set('a', 2)
+    with pytest.raises(ValueError):
+        with json_settings.transaction():
+            json_settings.set('b', 'partial')
+            time.sleep(0.3)
+            raise ValueError('rollback')
+
+    assert json_settings.is_dirty()
+    time.sleep(0.3)
+    assert _read_json(json_settings) == {'a': 2}
+    assert not json_settings.is_dirty()
+
+
+def test_rollback_keeps_changes_pending_before_transaction(json_settings):
+    json_settings.set_write_delay(5)
+    json_settings.set('b', 2)
+    with pytest.raises(ValueError):
+        with json_settings.transaction():
+            json_settings.set('c', 3)
+            raise ValueError('rollback')
+
+    json_settings.flush()
+    assert _read_json(json_settings) == {'a': 1, 'b': 2}
+
+
+def test_atomic_write_keeps_file_mode(tmpdir):
+    file_path = str(tmpdir.join('settings.json'))
+    settings.write_file_atomically(file_path, '{}')
+    os.chmod(file_path, 0o664)
+    settings.write_file_atomically(file_path, '{"a": 1}')
+
+    assert os.stat(file_path).st_mode & 0o777 == 0o664
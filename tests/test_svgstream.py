@@ -0,0 +1,44 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module that contains tests for streaming SVG transforms
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import io
+
+from tp.common.svg import svgstream
+
+GRADIENT_SVG = b"""<svg xmlns="http://www.w3.org/2000/svg">
+<defs><linearGradient id="abc"><stop stop-color="#abc"/></linearGradient></defs>
+<rect fill="url(#abc)" stroke="#555555" style="fill:url('#abc');stroke:#abc"/>
+</svg>"""
+
+
+def _recolor(source, color_map):
+    target = io.BytesIO()
+    svgstream.transform(io.BytesIO(source), target, [('recolor', {'color_map': color_map})])
+    return target.getvalue().decode('utf-8')
+
+
+def test_recolor_text():
+    assert svgstream.recolor_text('fill:#ABC;stroke:#555555', {'#aabbcc': '#ff0000'}) == 'fill:#ff0000;stroke:#555555'
+
+
+def test_recolor_text_keeps_references():
+    color_map = {'#aabbcc': '#ff0000'}
+
+    assert svgstream.recolor_text('url(#abc)', color_map) == 'url(#abc)'
+    assert svgstream.recolor_text('fill:url("#abc");stroke:#abc', color_map) == 'fill:url("#abc");stroke:#ff0000'
+
+
+def test_recolor_keeps_gradient_references():
+    result = _recolor(GRADIENT_SVG, {'#abc': '#ff0000', '#555555': '#00ff00'})
+
+    assert 'id="abc"' in result
+    assert 'stop-color="#ff0000"' in result
+    assert 'fill="url(#abc)"' in result
+    assert 'stroke="#00ff00"' in result
+    assert "fill:url('#abc');stroke:#ff0000" in result
@@ -14,10 +14,12 @@ import shortuuid
 
 from tpDcc import dcc
 from tpDcc.managers import configs
-from tpDcc.libs.python import python, timedate, fileio, jsonio, signal, version, sqlite, modules
+from tpDcc.libs.python import python, timedate, fileio, jsonio, signal, sqlite, modules
 from tpDcc.libs.python import path as path_utils, contexts, decorators, folder as folder_utils
 from tpDcc.libs.plugin.core import factory
 
+from tp.common.python import profiler, version
+
 from tpDcc.libs.datalibrary.core import consts, scanner, datapart
 
 LOGGER = logging.getLogger(consts.LIB_ID)
@@ -572,6 +574,7 @@ class DataLibrary(object):
                 return plugin.above(location), plugin.below(location)
 
     @decorators.timestamp
+    @profiler.instrument('datalibrary')
     def sync(self, locations=None, recursive=True, full=True, progress_callback=lambda message, percent: None):
         """
         This function cycles over all the search locations stored in the data base and attempts to populate it with
@@ -629,6 +632,7 @@ class DataLibrary(object):
                                 '$(IDENTIFIER)': relative_identifier if self._relative_paths else identifier,
                                 '$(FIELDS)': ','.join(field_names), '$(FIELDS_VALUES)': field_values})
                         self.scanned.emit(relative_identifier if self._relative_paths else identifier)
+                        profiler.count('scanned_identifiers', 'datalibrary')
                         scanned_identifiers.append(relative_identifier if self._relative_paths else identifier)
 
         if full:
@@ -819,6 +823,7 @@ class DataLibrary(object):
     # TAGS
     # ============================================================================================================
 
+    @profiler.instrument('datalibrary')
     def sync_tags(self, identifiers):
 
         all_tags = list()
@@ -891,6 +896,7 @@ class DataLibrary(object):
     # VERSIONS
     # ============================================================================================================
 
+    @profiler.instrument('datalibrary')
     def sync_versions(self, identifiers):
 
         all_versions = dict()
@@ -909,23 +915,13 @@ class DataLibrary(object):
             if not version_path or not os.path.isdir(version_path):
                 continue
 
-            # name = self.find_data(identifier).get(identifier, dict()).get('name')
+            # Comments file is parsed only once per asset instead of once per version
             version_folder_name = os.path.basename(version_path)
-            version_file = version.VersionFile(versions_path)
-            version_file.set_version_folder_name(version_folder_name)
-            # version_file.set_version_name(name)
-            has_versions = version_file.has_versions()
-            if not has_versions:
-                continue
-            versions = version_file.get_versions()
-            if not versions:
-                continue
             version_list = list()
-            for version_number, version_file_name in versions.items():
-                comment, user = version_file.get_version_data(version_number)
+            for version_data in version.VersionIndex(version_path).versions():
                 version_list.append({
-                    'uuid': version_folder_name, 'version_number': version_number,
-                    'name': version_file_name, 'comment': comment, 'user': user})
+                    'uuid': version_folder_name, 'version_number': version_data['version'],
+                    'name': version_data['name'], 'comment': version_data['comment'], 'user': version_data['user']})
             if not version_list:
                 continue
             all_versions.setdefault(identifier, version_list)
@@ -1050,6 +1046,7 @@ class DataLibrary(object):
     # THUMBS
     # ============================================================================================================
 
+    @profiler.instrument('datalibrary')
     def sync_thumbs(self, identifiers):
 
         all_thumbs = list()
@@ -1165,6 +1162,7 @@ class DataLibrary(object):
     # METADATA
     # ============================================================================================================
 
+    @profiler.instrument('datalibrary')
     def sync_metadata(self, identifiers):
 
         all_metadata = list()
@@ -1312,6 +1310,7 @@ class DataLibrary(object):
     # DEPENDENCIES
     # ============================================================================================================
 
+    @profiler.instrument('datalibrary')
     def sync_dependencies(self, identifiers):
 
         all_dependencies = list()
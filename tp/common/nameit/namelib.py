@@ -364,6 +364,173 @@ class Rule(Serializable, object):
         return "{{{}}}".format("}_{".join(fields))
 
 
+class RuleSolver(object):
+    """
+    Class that precompiles a rule and its tokens so many names can be solved and parsed without looking up the
+    rule fields, tokens and token values for each name.
+    """
+
+    def __init__(self, rule, tokens):
+        super(RuleSolver, self).__init__()
+
+        self._rule = rule
+        self._fields = rule.fields()
+        self._auto_fix = rule.auto_fix
+        self._format = rule._pattern(self._fields)
+
+        tokens_by_name = dict()
+        for token in tokens:
+            tokens_by_name.setdefault(token.name, token)
+
+        self._field_tokens = list()
+        self._missing_fields = list()
+        for field in self._fields:
+            token = tokens_by_name.get(field)
+            if not token:
+                self._missing_fields.append(field)
+                continue
+            items = token.get_items()
+            default = token._get_default()
+            is_required = default is None or default == -1
+            iterator_index = -1
+            inverse_items = dict()
+            for i, (key, value) in enumerate(items.items()):
+                if key == 'iterator' and value == '#' and iterator_index == -1:
+                    iterator_index = i
+                inverse_items.setdefault(value, (i, key))
+            self._field_tokens.append(
+                (field, token, items, default, is_required, token.is_iterator(default), iterator_index, inverse_items))
+
+        self._fingerprint = self.fingerprint(rule, tokens_by_name)
+
+    @staticmethod
+    def fingerprint(rule, tokens_by_name):
+        """
+        Returns a hashable value that changes when the given rule or the tokens it uses are edited
+        :param rule: Rule
+        :param tokens_by_name: dict(str, Token)
+        :return: tuple
+        """
+
+        token_data = list()
+        for field in rule.fields():
+            token = tokens_by_name.get(field)
+            if not token:
+                token_data.append(None)
+                continue
+            token_data.append((
+                id(token), token.name, str(token.default), tuple(token.values['key']),
+                tuple(token.values['value'])))
+
+        return rule.name, rule.expression, rule.auto_fix, rule.iterator_format, tuple(token_data)
+
+    def is_valid(self, fingerprint):
+        """
+        Returns whether this solver was compiled with the given fingerprint
+        :param fingerprint: tuple
+        :return: bool
+        """
+
+        return self._fingerprint == fingerprint
+
+    def solve(self, *args, **kwargs):
+        """
+        Solves a name with the given values. Behaves as NameLib.solve
+        :return: str or None
+        """
+
+        if self._missing_fields:
+            LOGGER.warning('Expression not valid: token {} not found in tokens list'.format(self._missing_fields[0]))
+            return None
+
+        i = 0
+        values = dict()
+        for field, token, items, default, is_required, is_iterator, _, _ in self._field_tokens:
+            if is_required:
+                if kwargs.get(field) is not None:
+                    values[field] = kwargs[field]
+                else:
+                    values[field] = args[i] if i < len(args) else None
+                    i += 1
+                continue
+            values[field] = self._solve_token(token, items, default, is_iterator, kwargs.get(field))
+
+        if not values:
+            return None
+
+        if not any(value is None for value in values.values()):
+            return self._format.format(**values)
+
+        valid_values = OrderedDict()
+        for field in self._fields:
+            if field not in values:
+                continue
+            value = values[field]
+            if value is None:
+                if self._auto_fix:
+                    continue
+                LOGGER.warning(
+                    'Missing field: "{}" when generating new name (None will be used instead)!'.format(field))
+            valid_values[field] = value
+
+        return self._rule._pattern(valid_values.keys()).format(**valid_values)
+
+    def parse(self, name, get_keys=False):
+        """
+        Parses given name. Behaves as Rule.parse
+        :param name: str
+        :param get_keys: bool
+        :return: OrderedDict
+        """
+
+        if self._missing_fields:
+            raise Exception('Not token found with name: {} in name: "{}"'.format(self._missing_fields[0], name))
+
+        ret_val = OrderedDict()
+        split_name = name.split('_')
+        for i, (field, _, _, _, is_required, _, iterator_index, inverse_items) in enumerate(self._field_tokens):
+            if i > len(split_name) - 1:
+                ret_val[field] = None
+                continue
+            value = split_name[i]
+            if is_required:
+                ret_val[field] = value
+                continue
+            found_index, found_key = inverse_items.get(value, (-1, None))
+            if iterator_index > -1 and str(value).isdigit() and (found_index == -1 or iterator_index < found_index):
+                ret_val[field] = '#' if get_keys else value
+            elif found_index > -1:
+                ret_val[field] = found_key if get_keys else value
+            else:
+                ret_val[field] = None
+
+        return ret_val
+
+    def _solve_token(self, token, items, default, is_iterator, name):
+        """
+        Internal function that solves a token using its precomputed items. Behaves as Token.solve
+        """
+
+        if token.name == 'rule_name':
+            return self._rule.name
+
+        if name is None:
+            if is_iterator:
+                return token._get_default_iterator_value(0, rule=self._rule)
+            return default
+
+        if 'iterator' in items:
+            if name not in items:
+                return token._get_default_iterator_value(name, rule=self._rule)
+            return name
+
+        solved_token = items.get(name)
+        if not solved_token and name in items.values():
+            return name
+
+        return solved_token
+
+
 class Template(Serializable, object):
     """
     Class that defines a template in the naming manager
@@ -485,6 +652,7 @@ class NameLib(object):
         self._templates_tokens = list()
         self._tokens = list()
         self._rules = list()
+        self._rule_solvers = dict()
 
         self._naming_repo_env = 'NAMING_REPO'
         self._parser_format = parser_format or 'yaml'
@@ -608,6 +776,7 @@ class NameLib(object):
         if self.has_rule(name):
             rule = self.get_rule(name)
             self._rules.pop(self._rules.index(rule))
+            self._rule_solvers.pop(id(rule), None)
             return True
         return False
 
@@ -617,6 +786,7 @@ class NameLib(object):
         """
 
         python.clear_list(self._rules)
+        self._rule_solvers.clear()
         self._active_rule = None
         return True
 
@@ -926,6 +1096,67 @@ class NameLib(object):
                 return
         return rule.solve(**values)
 
+    def solve_many(self, names_data, rule_name=None):
+        """
+        Solves multiple names at once. Rule and tokens are compiled only once for all the names.
+        :param names_data: list(dict or list), each item can be a dictionary of keyword values or a list of
+            positional values
+        :param rule_name: str or None, name of the rule to use. If not given, active rule is used
+        :return: list(str)
+        """
+
+        solver = self.get_rule_solver(rule_name)
+        if not solver:
+            LOGGER.warning('Impossible to solve because no rule is activated!')
+            return [None] * len(names_data)
+
+        solved_names = list()
+        for name_data in names_data:
+            if isinstance(name_data, dict):
+                solved_names.append(solver.solve(**name_data))
+            else:
+                solved_names.append(solver.solve(*name_data))
+
+        return solved_names
+
+    def parse_many(self, names, rule_name=None, get_keys=False):
+        """
+        Parses multiple names at once. Rule and tokens are compiled only once for all the names.
+        :param names: list(str)
+        :param rule_name: str or None, name of the rule to use. If not given, active rule is used
+        :param get_keys: bool
+        :return: list(OrderedDict)
+        """
+
+        solver = self.get_rule_solver(rule_name)
+        if not solver:
+            return [None] * len(names)
+
+        return [solver.parse(name, get_keys=get_keys) for name in names]
+
+    def get_rule_solver(self, rule_name=None):
+        """
+        Returns the precompiled solver of the given rule. Solvers are cached and compiled again only if the rule or
+        its tokens were edited.
+        :param rule_name: str or None, name of the rule. If not given, active rule is used
+        :return: RuleSolver or None
+        """
+
+        rule = self.get_rule(rule_name) if rule_name else self.active_rule()
+        if not rule:
+            return None
+
+        tokens_by_name = dict()
+        for token in self._tokens:
+            tokens_by_name.setdefault(token.name, token)
+
+        fingerprint = RuleSolver.fingerprint(rule, tokens_by_name)
+        solver = self._rule_solvers.get(id(rule))
+        if not solver or not solver.is_valid(fingerprint):
+            solver = self._rule_solvers[id(rule)] = RuleSolver(rule, self._tokens)
+
+        return solver
+
     def parse_field_from_string(self, string_to_parse, field_name):
         active_rule = self.active_rule()
         if not active_rule:
@@ -1243,6 +1474,7 @@ class NameLib(object):
 
         self._active_rule = ''
         python.clear_list(self._rules)
+        self._rule_solvers.clear()
         python.clear_list(self._tokens)
         python.clear_list(self._templates)
         python.clear_list(self._templates_tokens)
@@ -1,5 +1,3 @@
-import re
-
 from tp.common.python import path, jsonio
 from tp.common.naming import token, rule
 
@@ -22,6 +20,8 @@ class NameManager(object):
 		self._tokens = list()									# type: list[tp.common.naming.rule.Token]
 		self._name = ''
 		self._description = ''
+		self._revision = 0
+		self._index = None										# type: tuple or None
 
 		if config is not None:
 			self._parse_config(config)
@@ -96,11 +96,21 @@ class NameManager(object):
 		"""
 
 		self._parent_manager = value
+		self.invalidate()
 
 	# =================================================================================================================
 	# BASER
 	# =================================================================================================================
 
+	def invalidate(self):
+		"""
+		Invalidates cached rules and tokens index. Must be called if rules or tokens of this manager are modified.
+		Managers using this one as parent manager detect the change automatically.
+		"""
+
+		self._revision += 1
+		self._index = None
+
 	def rule_count(self, recursive=False):
 		"""
 		Returns the total count of rules within this manager.
@@ -147,6 +157,9 @@ class NameManager(object):
 		:rtype: :class:`tp.common.naming.rule.Rule` or None
 		"""
 
+		if recursive:
+			return self._get_index()[0].get(rule_name)
+
 		for rule_found in self.iterate_rules(recursive):
 			if rule_found.name == rule_name:
 				return rule_found
@@ -196,6 +209,9 @@ class NameManager(object):
 		:rtype: :class:`tp.common.token.Token` or None
 		"""
 
+		if recursive:
+			return self._get_index()[1].get(name)
+
 		for found_token in self.iterate_tokens(recursive):
 			if found_token.name == name:
 				return found_token
@@ -213,28 +229,51 @@ class NameManager(object):
 		:raises ValueError: if missing tokens are detected within the given rule.
 		"""
 
-		expression = self.rule(rule_name).expression
-		expression_tokens = set(re.findall(NameManager.REGEX_FILTER, expression))
-		new_str = expression
-		missing_keys = set()
+		return self.resolve_many(rule_name, [tokens])[0]
 
-		for token_found in expression_tokens:
-			token_value = tokens.get(token_found)
-			if token_value is None:
-				missing_keys.add(token_found)
-				continue
-			token_key_value = self.token(token_found, recursive=True)
-			try:
-				remapped_value = token_key_value.value_for_key(token_value) or token_value
-			except AttributeError:
-				# if the token does not exist, we use the given value
-				remapped_value = token_value
-			new_str = re.sub('{' + token_found + '}', remapped_value, new_str)
+	def resolve_many(self, rule_name, tokens_list):
+		"""
+		Resolves the given rule expression for each one of the given token dictionaries. Rule expression is compiled
+		and tokens are looked up only once.
 
-		if missing_keys:
-			raise ValueError('Missing expression tokens, rule: {}, tokens: {}'.format(rule_name, missing_keys))
+		:param  str rule_name: name of the rule.
+		:param list[dict] tokens_list: list of token keys and values to set for the rule expression.
+		:return: list of formatted resolved strings.
+		:rtype: list[str]
+		:raises ValueError: if rule does not exist or if missing tokens are detected within the given rule.
+		"""
 
-		return new_str
+		rules_index, tokens_index = self._get_index()
+		rule_found = rules_index.get(rule_name)
+		if rule_found is None:
+			raise ValueError('Rule not found: {}'.format(rule_name))
+
+		slots = rule_found.slots()
+		expression_tokens = rule_found.tokens()
+		remappers = dict()
+		for token_name in expression_tokens:
+			# if the token does not exist, we use the given value
+			remappers[token_name] = getattr(tokens_index.get(token_name), 'value_for_key', None)
+
+		resolved = list()
+		for tokens in tokens_list:
+			values = dict()
+			missing_keys = set()
+			for token_name in expression_tokens:
+				token_value = tokens.get(token_name)
+				if token_value is None:
+					missing_keys.add(token_name)
+					continue
+				remapper = remappers[token_name]
+				values[token_name] = (remapper(token_value) or token_value) if remapper else token_value
+			if missing_keys:
+				raise ValueError('Missing expression tokens, rule: {}, tokens: {}'.format(rule_name, missing_keys))
+			new_str = list(slots)
+			for i in range(1, len(new_str), 2):
+				new_str[i] = values[new_str[i]]
+			resolved.append(''.join(new_str))
+
+		return resolved
 
 	# =================================================================================================================
 	# INTERNAL
@@ -250,4 +289,44 @@ class NameManager(object):
 		self._tokens = [token.Token.from_dict(token_map) for token_map in config_data.get('tokens', list())]
 		self._rules = [rule.Rule.from_dict(rule_data) for rule_data in config_data.get('rules', list())]
 		self._name = config_data.get('name', '')
+		self.invalidate()
+
+	def _revisions(self):
+		"""
+		Internal function that returns the revisions of this manager and all its parent managers.
+
+		:return: manager hierarchy revisions.
+		:rtype: tuple(int)
+		"""
+
+		revisions = list()
+		manager = self
+		while manager is not None:
+			revisions.append((id(manager), manager._revision))
+			manager = manager.parent_manager
+
+		return tuple(revisions)
+
+	def _get_index(self):
+		"""
+		Internal function that returns the flattened rules and tokens index of this manager hierarchy. Index is cached
+		until this manager or any of its parent managers is invalidated.
+
+		:return: tuple with rules and tokens dictionaries.
+		:rtype: tuple(dict(str, tp.common.naming.rule.Rule), dict(str, tp.common.naming.token.Token))
+		"""
+
+		revisions = self._revisions()
+		if self._index is not None and self._index[0] == revisions:
+			return self._index[1], self._index[2]
+
+		rules_index = dict()
+		for rule_found in self.iterate_rules(recursive=True):
+			rules_index.setdefault(rule_found.name, rule_found)
+		tokens_index = dict()
+		for token_found in self.iterate_tokens(recursive=True):
+			tokens_index.setdefault(token_found.name, token_found)
+		self._index = (revisions, rules_index, tokens_index)
+
+		return rules_index, tokens_index
 
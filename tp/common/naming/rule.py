@@ -1,8 +1,13 @@
+import re
+
+
 class Rule(object):
 	"""
 	Class that encapsulates a rule expression.
 	"""
 
+	REGEX_SLOTS = re.compile(r'{([^}]*)}')
+
 	def __init__(self, name, creator, description, expression, example_fields):
 		"""
 		Constructor.
@@ -19,6 +24,7 @@ class Rule(object):
 		self._description = description
 		self._expression = expression
 		self._example_fields = example_fields
+		self._slots = None
 
 	def __repr__(self):
 		"""
@@ -111,3 +117,31 @@ class Rule(object):
 	@property
 	def example_fields(self):
 		return self._example_fields
+
+	# =================================================================================================================
+	# BASE
+	# =================================================================================================================
+
+	def slots(self):
+		"""
+		Returns the expression compiled into a list of literal strings and token names. Even indices contain literal
+		strings and odd indices contain token names. Expression is only compiled once.
+
+		:return: compiled expression slots.
+		:rtype: list[str]
+		"""
+
+		if self._slots is None:
+			self._slots = self.REGEX_SLOTS.split(self._expression or '')
+
+		return self._slots
+
+	def tokens(self):
+		"""
+		Returns the unique token names used by the rule expression.
+
+		:return: token names.
+		:rtype: set[str]
+		"""
+
+		return set(self.slots()[1::2])
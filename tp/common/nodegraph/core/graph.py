@@ -17,7 +17,7 @@ from Qt.QtCore import Signal, QObject, QPoint, QMimeData
 from Qt.QtWidgets import QApplication, QUndoStack, QUndoView
 
 from tp.core import log
-from tp.common.python import path
+from tp.common.python import path, profiler
 from tp.common.nodegraph.core import consts, utils, factory, abstract, node, socket, commands, menus
 from tp.common.nodegraph.models import graph as graph_model
 from tp.common.nodegraph.views import graph as graph_view
@@ -340,8 +340,9 @@ class NodeGraph(QObject):
 			raise IOError('File does not exist: {}'.format(file_path))
 
 		try:
-			with open(file_path) as data_file:
-				data = json.load(data_file)
+			with profiler.span('import_session', 'nodegraph'):
+				with open(file_path) as data_file:
+					data = json.load(data_file)
 		except Exception as exc:
 			data = None
 			logger.error('Cannot read data from file: {}'.format(exc))
@@ -363,8 +364,9 @@ class NodeGraph(QObject):
 
 		data = self._serialize(self.all_nodes())
 		file_path = file_path.strip()
-		with open(file_path, 'w') as file_out:
-			json.dump(data, file_out, indent=1, separators=(',', ':'))
+		with profiler.span('save_session', 'nodegraph'):
+			with open(file_path, 'w') as file_out:
+				json.dump(data, file_out, indent=1, separators=(',', ':'))
 
 	def clear_session(self):
 		"""
@@ -1223,6 +1225,7 @@ class NodeGraph(QObject):
 	# INTERNAL
 	# =================================================================================================================
 
+	@profiler.instrument('nodegraph')
 	def _serialize(self, nodes):
 		"""
 		Intenral function that serializes given nodes.
@@ -1271,6 +1274,7 @@ class NodeGraph(QObject):
 
 		return data
 
+	@profiler.instrument('nodegraph')
 	def _deserialize(self, data, relative_pos=False, pos=None):
 		"""
 		Internal function that deserializes node data.
@@ -0,0 +1,429 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module that contains the data model of option lists
+"""
+
+from __future__ import print_function, division, absolute_import
+
+from collections import OrderedDict
+
+from tp.common.python import helpers, signal
+
+GROUP_TYPE = 'group'
+
+
+def option_type_from_value(value):
+    """
+    Returns the option type that matches the type of the given value
+    :param value: variant
+    :return: str or None
+    """
+
+    if helpers.is_string(value):
+        return 'string'
+    elif type(value) == float:
+        return 'float'
+    elif type(value) == int:
+        return 'integer'
+    elif type(value) == bool:
+        return 'boolean'
+    elif type(value) == dict:
+        return 'dictionary'
+    elif type(value) == list:
+        return 'list'
+    elif value is None:
+        return 'title'
+
+    return None
+
+
+def parse_option(option):
+    """
+    Parses an option stored in an options file
+    :param option: tuple(str, variant), option path and option value. Value can be a [value, option type] list
+    :return: tuple(list(str), variant, str), path names, value and type of the option
+    """
+
+    option_path, option_value = option[0], option[1]
+    option_type = None
+    if type(option_value) == list:
+        if option_path == 'list':
+            option_type = 'list'
+        else:
+            option_value, option_type = option_value[0], option_value[1]
+
+    names = option_path.split('.')
+    if names[-1] == '':
+        return names[:-1], option_value, GROUP_TYPE
+
+    return names, option_value, option_type or option_type_from_value(option_value)
+
+
+class OptionNode(object):
+    """
+    Class that stores an option or an option group
+    """
+
+    __slots__ = ('name', 'value', 'option_type', 'parent', 'children')
+
+    def __init__(self, name, value=None, option_type=None, parent=None):
+        self.name = name
+        self.value = value
+        self.option_type = option_type
+        self.parent = parent
+        self.children = OrderedDict()
+
+    def __repr__(self):
+        return '<{} {} ({})>'.format(self.__class__.__name__, self.path, self.option_type)
+
+    @property
+    def path(self):
+        names = list()
+        node = self
+        while node is not None and node.parent is not None:
+            names.append(node.name)
+            node = node.parent
+
+        return '.'.join(reversed(names))
+
+    @property
+    def key(self):
+        """
+        Returns the key used to store the option in options files. Group keys end with a dot.
+        :return: str
+        """
+
+        return self.path + '.' if self.is_group() else self.path
+
+    def is_group(self):
+        """
+        Returns whether this node is an option group
+        :return: bool
+        """
+
+        return self.option_type == GROUP_TYPE
+
+    def stored_value(self):
+        """
+        Returns the value stored in options files for this node
+        :return: variant
+        """
+
+        if self.is_group():
+            return self.value
+
+        return [self.value, self.option_type]
+
+
+class OptionModel(object):
+    """
+    Class that stores options independently of the widgets used to edit them.
+    Options are indexed by their path (group names and option name separated by dots), so options can be found
+    without traversing the hierarchy. Changed options are tracked, so only those are written back.
+    """
+
+    def __init__(self, options=None):
+        super(OptionModel, self).__init__()
+
+        self._root = OptionNode('', option_type=GROUP_TYPE)
+        self._index = dict()
+        self._changed = OrderedDict()
+        self._structure_changed = False
+
+        # emitted with the path of the option and its new value each time an option value changes
+        self.valueChanged = signal.Signal()
+        # emitted each time options are added, removed, renamed or moved
+        self.structureChanged = signal.Signal()
+
+        if options:
+            self.load(options)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, option_path):
+        return option_path.rstrip('.') in self._index
+
+    @property
+    def root(self):
+        return self._root
+
+    # =================================================================================================================
+    # BASE
+    # =================================================================================================================
+
+    def load(self, options):
+        """
+        Loads given options, replacing current ones
+        :param options: list(tuple(str, variant)), options as stored in options files
+        """
+
+        self._root = OptionNode('', option_type=GROUP_TYPE)
+        self._index = dict()
+        self._changed.clear()
+        self._structure_changed = False
+
+        for option in options or list():
+            names, value, option_type = parse_option(option)
+            parent = self._ensure_group(names[:-1])
+            node = self._index.get('.'.join(names))
+            if node is None:
+                node = OptionNode(names[-1], value=value, option_type=option_type, parent=parent)
+                parent.children[node.name] = node
+                self._index['.'.join(names)] = node
+            else:
+                node.value = value
+                node.option_type = option_type
+
+        self.structureChanged.emit()
+
+    def node(self, option_path):
+        """
+        Returns the node stored in the given path
+        :param option_path: str
+        :return: OptionNode or None
+        """
+
+        if not option_path:
+            return self._root
+
+        return self._index.get(option_path.rstrip('.'))
+
+    def get(self, option_path, default=None):
+        """
+        Returns the value of the option stored in the given path
+        :param option_path: str
+        :param default: variant
+        :return: variant
+        """
+
+        node = self.node(option_path)
+
+        return node.value if node is not None else default
+
+    def children(self, option_path=''):
+        """
+        Returns the nodes stored within the given group
+        :param option_path: str
+        :return: list(OptionNode)
+        """
+
+        node = self.node(option_path)
+
+        return list(node.children.values()) if node is not None else list()
+
+    def add(self, option_path, value=None, option_type=None):
+        """
+        Adds a new option. Missing parent groups are created.
+        :param option_path: str
+        :param value: variant
+        :param option_type: str or None, if not given, type is solved from the value
+        :return: OptionNode
+        """
+
+        names = option_path.rstrip('.').split('.')
+        if option_type is None:
+            option_type = GROUP_TYPE if option_path.endswith('.') else option_type_from_value(value)
+        node = self._index.get('.'.join(names))
+        if node is not None:
+            if node.option_type != option_type:
+                node.option_type = option_type
+                self._changed[node.path] = node
+            self.set_value(option_path, value)
+            return node
+
+        parent = self._ensure_group(names[:-1])
+        node = OptionNode(names[-1], value=value, option_type=option_type, parent=parent)
+        parent.children[node.name] = node
+        self._index['.'.join(names)] = node
+        self._changed[node.path] = node
+        self.structureChanged.emit()
+
+        return node
+
+    def set_value(self, option_path, value):
+        """
+        Sets the value of the option stored in the given path
+        :param option_path: str
+        :param value: variant
+        :return: bool, True if the value changed; False otherwise
+        """
+
+        node = self.node(option_path)
+        if node is None or node is self._root or node.value == value:
+            return False
+
+        node.value = value
+        self._changed[node.path] = node
+        self.valueChanged.emit(node.path, value)
+
+        return True
+
+    def remove(self, option_path):
+        """
+        Removes the option (or group with all its options) stored in the given path
+        :param option_path: str
+        :return: bool
+        """
+
+        node = self.node(option_path)
+        if node is None or node is self._root:
+            return False
+
+        node.parent.children.pop(node.name, None)
+        for path in self._subtree_paths(node):
+            self._index.pop(path, None)
+            self._changed.pop(path, None)
+        self._structure_changed = True
+        self.structureChanged.emit()
+
+        return True
+
+    def rename(self, option_path, new_name):
+        """
+        Renames the option stored in the given path
+        :param option_path: str
+        :param new_name: str
+        :return: bool
+        """
+
+        node = self.node(option_path)
+        if node is None or node is self._root or new_name in node.parent.children:
+            return False
+
+        old_paths = self._subtree_paths(node)
+        items = list(node.parent.children.items())
+        node.parent.children = OrderedDict(
+            (new_name if name == node.name else name, child) for name, child in items)
+        for path in old_paths:
+            self._index.pop(path, None)
+        node.name = new_name
+        self._index_subtree(node)
+        self._structure_changed = True
+        self.structureChanged.emit()
+
+        return True
+
+    def move(self, option_path, position):
+        """
+        Moves the option stored in the given path to the given position within its group
+        :param option_path: str
+        :param position: int
+        :return: bool
+        """
+
+        node = self.node(option_path)
+        if node is None or node is self._root:
+            return False
+
+        siblings = [child for child in node.parent.children.values() if child is not node]
+        siblings.insert(max(0, min(position, len(siblings))), node)
+        node.parent.children = OrderedDict((child.name, child) for child in siblings)
+        self._structure_changed = True
+        self.structureChanged.emit()
+
+        return True
+
+    def serialize(self, node=None):
+        """
+        Returns options in the format used by options files, in hierarchy order
+        :param node: OptionNode or None, if given, only the options of that group are returned
+        :return: list(tuple(str, variant))
+        """
+
+        return [(child.key, child.stored_value()) for child in self._iterate(node)]
+
+    def changes(self):
+        """
+        Returns options changed since the last time changes were written
+        :return: list(tuple(str, variant))
+        """
+
+        return [(node.key, node.stored_value()) for node in self._changed.values()]
+
+    def has_changes(self):
+        """
+        Returns whether there are options not written yet
+        :return: bool
+        """
+
+        return bool(self._changed) or self._structure_changed
+
+    def write(self, option_object, force=False):
+        """
+        Writes options into given option object. If options were only added or changed, only those options are
+        written. If options were removed, renamed or moved, all options are written.
+        :param option_object: object, object that stores options (must implement add_option and clear_options)
+        :param force: bool, whether to write all options
+        :return: int, number of written options
+        """
+
+        if force or self._structure_changed:
+            option_object.clear_options()
+            nodes = list(self._iterate())
+        else:
+            nodes = list(self._changed.values())
+
+        for node in nodes:
+            option_object.add_option(node.key, node.value, None, node.option_type)
+
+        self._changed.clear()
+        self._structure_changed = False
+
+        return len(nodes)
+
+    # =================================================================================================================
+    # INTERNAL
+    # =================================================================================================================
+
+    def _ensure_group(self, names):
+        """
+        Internal function that returns the group stored in the given path, creating missing groups
+        :param names: list(str)
+        :return: OptionNode
+        """
+
+        parent = self._root
+        for i, name in enumerate(names):
+            node = parent.children.get(name)
+            if node is None:
+                node = OptionNode(name, value=True, option_type=GROUP_TYPE, parent=parent)
+                parent.children[name] = node
+                self._index['.'.join(names[:i + 1])] = node
+            parent = node
+
+        return parent
+
+    def _iterate(self, node=None):
+        """
+        Internal function that iterates all the nodes of the given group in hierarchy order
+        :param node: OptionNode or None
+        :return: generator(OptionNode)
+        """
+
+        pending = list(reversed(list((node or self._root).children.values())))
+        while pending:
+            child = pending.pop()
+            yield child
+            pending.extend(reversed(list(child.children.values())))
+
+    def _subtree_paths(self, node):
+        """
+        Internal function that returns the paths of the given node and all its children
+        :param node: OptionNode
+        :return: list(str)
+        """
+
+        return [node.path] + [child.path for child in self._iterate(node)]
+
+    def _index_subtree(self, node):
+        """
+        Internal function that indexes the given node and all its children
+        :param node: OptionNode
+        """
+
+        self._index[node.path] = node
+        for child in self._iterate(node):
+            self._index[child.path] = child
@@ -17,11 +17,12 @@ from Qt.QtGui import QColor, QPalette, QPainter, QPen, QBrush, QPolygon
 
 from tpDcc import dcc
 from tpDcc.managers import resources
-from tpDcc.libs.python import python, name as name_utils
+from tpDcc.libs.python import name as name_utils
 from tpDcc.libs.qt.core import qtutils
 from tpDcc.libs.qt.widgets import layouts, messagebox
 
 from tpDcc.libs.options.core import factory
+from tp.common.options.core import model as options_model
 
 LOGGER = logging.getLogger('tpDcc-libs-options')
 
@@ -59,6 +60,8 @@ class OptionList(QGroupBox, object):
         self._option_group_class = OptionListGroup
         self._auto_rename = False
         self._widget_to_copy = None
+        self._options_model = None
+        self._pending_node = None
 
         self.setup_ui()
 
@@ -111,6 +114,16 @@ class OptionList(QGroupBox, object):
 
         self._load_widgets(options)
 
+    def get_options_model(self):
+        """
+        Returns the model that stores the options displayed by the list. It is shared by all the groups of the list.
+        :return: OptionModel or None
+        """
+
+        option_list = self._find_list(self) or self
+
+        return option_list._options_model
+
     def get_parent(self):
         """
         Returns parent Option
@@ -412,6 +425,10 @@ class OptionList(QGroupBox, object):
         :return: str
         """
 
+        # names of loaded options are already unique
+        if self._supress_update:
+            return name
+
         found = self._get_widget_names(parent)
         while name in found:
             name = name_utils.increment_last_number(name)
@@ -440,20 +457,6 @@ class OptionList(QGroupBox, object):
 
         return found
 
-    def _get_unique_name(self, name, parent):
-        """
-        Internal function that returns unique name for the new group
-        :param name: str
-        :param parent: QWidget
-        :return: str
-        """
-
-        found = self._get_widget_names(parent)
-        while name in found:
-            name = name_utils.increment_last_number(name)
-
-        return name
-
     def _handle_parenting(self, widget, parent):
         """
         Internal function that handles parenting of given widget and its parent
@@ -510,93 +513,95 @@ class OptionList(QGroupBox, object):
 
     def _load_widgets(self, options):
         """
-        Internal function that loads widget with given options
+        Internal function that loads widget with given options. Widgets of the options stored in collapsed groups
+        are not created until the groups are expanded.
         :param options: dict
         """
 
         self.clear_widgets()
+        self._options_model = options_model.OptionModel(options)
         if not options:
             return
 
+        self._create_widgets(self._options_model.root, self)
+
+    def _create_widgets(self, node, parent):
+        """
+        Internal function that creates the widgets of the options stored in the given model node
+        :param node: OptionNode
+        :param parent: OptionList
+        """
+
+        supress_update = self._supress_update
         self._supress_update = True
         self._disable_auto_expand = True
         self._auto_rename = False
 
         try:
-            for option in options:
-                option_type = None
-                if type(option[1]) == list:
-                    if option[0] == 'list':
-                        value = option[1]
-                        option_type = 'list'
-                    else:
-                        value = option[1][0]
-                        option_type = option[1][1]
-                    # value = option[1][0]
-                    # option_type = option[1][1]
-                else:
-                    value = option[1]
-
-                split_name = option[0].split('.')
-                if split_name[-1] == '':
-                    search_group = '.'.join(split_name[:-2])
-                    name = split_name[-2]
-                else:
-                    search_group = '.'.join(split_name[:-1])
-                    name = split_name[-1]
-
-                widget = self._find_group_widget(search_group)
-                if not widget:
-                    widget = self
-
-                is_group = False
-                if split_name[-1] == '':
-                    is_group = True
-                    parent_name = '.'.join(split_name[:-1])
-                    group = self._find_group_widget(parent_name)
-                    if not group:
-                        self.add_group(name, value, widget)
-
-                if len(split_name) > 1 and split_name[-1] != '':
-                    search_group = '.'.join(split_name[:-2])
-                    after_search_group = '.'.join(split_name[:-1])
-                    group_name = split_name[-2]
-                    group_widget = self._find_group_widget(search_group)
-                    widget = self._find_group_widget(after_search_group)
-                    if not widget:
-                        self.add_group(group_name, value, group_widget)
-                        widget = self._find_group_widget(after_search_group)
-
-                if not is_group:
-                    if not option_type:
-                        if python.is_string(value):
-                            option_type = 'string'
-                        elif type(value) == float:
-                            option_type = 'float'
-                        elif type(option[1]) == int:
-                            option_type = 'integer'
-                        elif type(option[1]) == bool:
-                            option_type = 'boolean'
-                        elif type(option[1]) == dict:
-                            option_type = 'dictionary'
-                        elif type(option[1]) == list:
-                            option_type = 'list'
-                        elif option[1] is None:
-                            option_type = 'title'
-
-                    new_option = self._add_custom_option(option_type, name, value, widget)
-                    if not new_option:
-                        self._add_option(option_type, name, value, widget)
-
+            for child in node.children.values():
+                if child.is_group():
+                    group = self.add_group(child.name, child.value, parent)
+                    if child.value:
+                        self._create_widgets(child, group)
+                    elif child.children:
+                        group._pending_node = child
+                    continue
+
+                new_option = self._add_custom_option(child.option_type, child.name, child.value, parent)
+                if not new_option:
+                    self._add_option(child.option_type, child.name, child.value, parent)
         except Exception:
             LOGGER.error(traceback.format_exc())
         finally:
             self._disable_auto_expand = False
-            # self.setVisible(True)
-            # self.setUpdatesEnabled(True)
-            self._supress_update = False
+            self._supress_update = supress_update
             self._auto_rename = True
 
+    def _create_pending_widgets(self):
+        """
+        Internal function that creates the widgets of the options of this group if they were not created yet
+        """
+
+        node = self._pending_node
+        if node is None:
+            return
+
+        self._pending_node = None
+        option_list = self._find_list(self) or self
+        option_list._create_widgets(node, self)
+
+    def _collect_widget_options(self, widget, prefix, options, pending_groups):
+        """
+        Internal function that collects the options of the widgets of the given option list
+        :param widget: OptionList
+        :param prefix: str, path of the given option list
+        :param options: list(tuple(str, variant)), list where options are added
+        :param pending_groups: list(tuple(OptionList, str)), list where groups which widgets were not created are added
+        """
+
+        for i in range(widget.child_layout.count()):
+            item = widget.child_layout.itemAt(i)
+            if not item:
+                continue
+            sub_widget = item.widget()
+            option_type = sub_widget.get_option_type()
+            value = sub_widget.get_value()
+            if hasattr(sub_widget, 'child_layout'):
+                path = '{}{}.'.format(prefix, sub_widget.get_name())
+                options.append((path, value))
+                pending_node = getattr(sub_widget, '_pending_node', None)
+                if pending_node is not None:
+                    # widgets of collapsed groups are not created, so their options are taken from the model
+                    old_prefix = pending_node.key
+                    for key, stored_value in self._options_model.serialize(pending_node):
+                        options.append((path + key[len(old_prefix):], stored_value))
+                    pending_groups.append((sub_widget, path))
+                else:
+                    self._collect_widget_options(sub_widget, path, options, pending_groups)
+            else:
+                path = '{}{}'.format(prefix, sub_widget.get_name())
+                options.append((path, [value, option_type]))
+
     def _find_list(self, widget):
         if widget.__class__.__name__.endswith('OptionList'):
             return widget
@@ -683,8 +688,20 @@ class OptionList(QGroupBox, object):
         if self._supress_update:
             return
 
+        model = self.get_options_model()
         if clear:
             self._write_all()
+        elif model is not None:
+            prefix = '' if self is self._find_list(self) else self._get_path(self)
+            for i in range(self.child_layout.count()):
+                item = self.child_layout.itemAt(i)
+                if not item:
+                    continue
+                widget = item.widget()
+                is_group = hasattr(widget, 'child_layout')
+                name = '{}{}{}'.format(prefix, widget.get_name(), '.' if is_group else '')
+                model.add(name, widget.get_value(), widget.get_option_type())
+            model.write(self._option_object)
         else:
             item_count = self.child_layout.count()
             for i in range(0, item_count):
@@ -725,10 +742,20 @@ class OptionList(QGroupBox, object):
             LOGGER.warning('Impossible to write options because option object is not defined!')
             return
 
-        self._option_object.clear_options()
-
         options_list = self._find_list(self)
-        self._write_widget_options(options_list)
+        model = options_list._options_model
+        if model is None:
+            self._option_object.clear_options()
+            self._write_widget_options(options_list)
+            return
+
+        options = list()
+        pending_groups = list()
+        options_list._collect_widget_options(options_list, '', options, pending_groups)
+        model.load(options)
+        for group, path in pending_groups:
+            group._pending_node = model.node(path)
+        model.write(self._option_object, force=True)
 
     def _fill_background(self, widget):
         """
@@ -914,6 +941,7 @@ class OptionListGroup(OptionList, object):
         """
 
         self.group.expand_group()
+        self._create_pending_widgets()
 
     def collapse_group(self):
         """
@@ -986,6 +1014,7 @@ class OptionListGroup(OptionList, object):
         :param parent: Option
         """
 
+        self._create_pending_widgets()
         group = parent.add_group(self.get_name(), parent)
         children = self.get_children()
         for child in children:
@@ -1007,6 +1036,8 @@ class OptionListGroup(OptionList, object):
         self._write_all()
 
     def _on_expand_updated(self, value):
+        if not self.group.is_collapsed():
+            self._create_pending_widgets()
         self.updateValues.emit(False)
 
 
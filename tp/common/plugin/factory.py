@@ -18,7 +18,7 @@ except ImportError:
     from inspect import getargspec as getfullargspec
 
 from tp.core import log, dcc
-from tp.common.python import helpers, modules, path as path_utils, folder as folder_utils
+from tp.common.python import helpers, modules, profiler, path as path_utils, folder as folder_utils
 
 logger = log.tpLogger
 
@@ -119,6 +119,7 @@ class PluginFactory(object):
     # BASE
     # ============================================================================================================
 
+    @profiler.instrument('plugin')
     def register_path(self, path_to_register, package_name=None, mechanism=PluginLoadingMechanism.GUESS):
         """
         Registers a search path within the factory. The factory will immediately being searching recursively withing
@@ -174,6 +175,8 @@ class PluginFactory(object):
             if not module_to_inspect:
                 continue
 
+            profiler.count('inspected_modules', 'plugin')
+
             try:
                 for item_name in dir(module_to_inspect):
                     item = getattr(module_to_inspect, item_name)
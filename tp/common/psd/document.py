@@ -23,7 +23,7 @@ def find_layers(layer):
 
     if is_group:
         for grp_layer in layer.layers:
-            find_layers(grp_layer)
+            layers.extend(find_layers(grp_layer))
     else:
         layers.append(layer)
     return layers
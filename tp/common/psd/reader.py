@@ -0,0 +1,881 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module that contains a pure Python reader for Photoshop documents (PSD and PSB).
+Files are memory mapped and only layer records are parsed when a document is opened, so the layer tree can be
+inspected without decoding any pixel. Layer channels are decoded on demand and layers can be exported into PNG
+files in parallel processes without Photoshop.
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import re
+import mmap
+import zlib
+import struct
+import logging
+import multiprocessing
+
+# concurrent.futures is not available in Python 2 (unless futures backport is installed), in that case layers are
+# exported serially
+FUTURES_AVAILABLE = True
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    FUTURES_AVAILABLE = False
+
+from tp.common.psd import consts
+
+LOGGER = logging.getLogger(consts.LIB_ID)
+
+PSD_SIGNATURE = b'8BPS'
+PSD_VERSION = 1
+PSB_VERSION = 2
+
+# color modes
+BITMAP_MODE = 0
+GRAYSCALE_MODE = 1
+INDEXED_MODE = 2
+RGB_MODE = 3
+
+# channel compression methods
+RAW_COMPRESSION = 0
+RLE_COMPRESSION = 1
+ZIP_COMPRESSION = 2
+ZIP_PREDICTION_COMPRESSION = 3
+
+# channel ids
+TRANSPARENCY_CHANNEL = -1
+USER_MASK_CHANNEL = -2
+REAL_USER_MASK_CHANNEL = -3
+
+# section divider types
+OTHER_SECTION = 0
+OPEN_FOLDER_SECTION = 1
+CLOSED_FOLDER_SECTION = 2
+BOUNDING_SECTION_DIVIDER = 3
+
+# additional layer information keys which length is stored with 8 bytes in PSB files
+_PSB_LONG_KEYS = (
+    b'LMsk', b'Lr16', b'Lr32', b'Layr', b'Mt16', b'Mt32', b'Mtrn', b'Alph', b'FMsk', b'lnk2', b'FEid', b'FXid',
+    b'PxSD')
+_TAGGED_BLOCK_SIGNATURES = (b'8BIM', b'8B64')
+_INVALID_FILE_NAME_CHARS = re.compile(r'[^\w\-. ]')
+
+
+class PsdError(Exception):
+    """
+    Exception raised when a Photoshop document cannot be read
+    """
+
+    pass
+
+
+class PsdLayer(object):
+    """
+    Class that stores the information of a layer record. Pixels are not decoded until they are requested.
+    """
+
+    def __init__(self, reader, index):
+        super(PsdLayer, self).__init__()
+
+        self._reader = reader
+        self._index = index
+
+        self.name = ''
+        self.top = self.left = self.bottom = self.right = 0
+        self.opacity = 255
+        self.flags = 0
+        self.blend_mode = b'norm'
+        self.section_type = OTHER_SECTION
+        self.mask_rect = None
+        self.channels = list()              # list of (channel id, offset, length) tuples
+        self.parent = None
+        self.children = list()
+
+    def __repr__(self):
+        return '<{} "{}" ({}, {}, {}, {})>'.format(
+            self.__class__.__name__, self.name, self.left, self.top, self.width, self.height)
+
+    # =================================================================================================================
+    # PROPERTIES
+    # =================================================================================================================
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def width(self):
+        return max(0, self.right - self.left)
+
+    @property
+    def height(self):
+        return max(0, self.bottom - self.top)
+
+    @property
+    def bbox(self):
+        return self.left, self.top, self.right, self.bottom
+
+    @property
+    def visible(self):
+        return not self.flags & 0x02
+
+    @property
+    def is_group(self):
+        return self.section_type in (OPEN_FOLDER_SECTION, CLOSED_FOLDER_SECTION)
+
+    @property
+    def is_divider(self):
+        return self.section_type == BOUNDING_SECTION_DIVIDER
+
+    # =================================================================================================================
+    # BASE
+    # =================================================================================================================
+
+    def path(self):
+        """
+        Returns the path of the layer within the layer tree (group names and layer name separated by /).
+
+        :return: layer path.
+        :rtype: str
+        """
+
+        names = list()
+        layer = self
+        while layer is not None:
+            names.append(layer.name)
+            layer = layer.parent
+
+        return '/'.join(reversed(names))
+
+    def descendants(self):
+        """
+        Returns all the layers (not groups) contained within this group, recursively and from top to bottom.
+
+        :return: list of layers.
+        :rtype: list(PsdLayer)
+        """
+
+        layers = list()
+        for child in self.children:
+            if child.is_group:
+                layers.extend(child.descendants())
+            else:
+                layers.append(child)
+
+        return layers
+
+    def channel_ids(self):
+        """
+        Returns the ids of all the channels of the layer.
+
+        :return: list of channel ids.
+        :rtype: list(int)
+        """
+
+        return [channel[0] for channel in self.channels]
+
+    def channel(self, channel_id):
+        """
+        Decodes and returns the pixels of the given channel as 8 bits per pixel data.
+
+        :param int channel_id: channel id (0, 1, 2 for RGB, -1 for transparency, -2 for user mask).
+        :return: channel data (width * height bytes) or None if the layer does not have the channel.
+        :rtype: bytes or None
+        """
+
+        for current_id, offset, length in self.channels:
+            if current_id != channel_id:
+                continue
+            if channel_id in (USER_MASK_CHANNEL, REAL_USER_MASK_CHANNEL) and self.mask_rect:
+                top, left, bottom, right = self.mask_rect
+                width, height = right - left, bottom - top
+            else:
+                width, height = self.width, self.height
+            return self._reader.decode_channel(offset, length, width, height)
+
+        return None
+
+    def rgba(self):
+        """
+        Decodes and returns the pixels of the layer as interleaved RGBA data.
+
+        :return: RGBA data (width * height * 4 bytes).
+        :rtype: bytearray
+        """
+
+        return self._reader.layer_rgba(self)
+
+
+class PsdReader(object):
+    """
+    Reader of Photoshop documents (PSD and PSB). File is memory mapped and only its layer records are parsed when it
+    is opened. Layer pixels are decoded on demand.
+
+    with PsdReader('file.psd') as psd:
+        for layer in psd.layers():
+            print(layer.path(), layer.bbox)
+        psd.export_layer(psd.layers()[0], 'layer.png')
+    """
+
+    def __init__(self, file_path):
+        super(PsdReader, self).__init__()
+
+        self._file_path = file_path
+        self._file = open(file_path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            self._file.close()
+            raise PsdError('Impossible to read empty or invalid file: "{}"'.format(file_path))
+
+        self._layers = list()
+        self._root = PsdLayer(self, -1)
+        self._merged_alpha = False
+        self._image_data_offset = 0
+
+        try:
+            self._read_header()
+            self._read_sections()
+        except (struct.error, IndexError):
+            self.close()
+            raise PsdError('Photoshop file is corrupted: "{}"'.format(file_path))
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # =================================================================================================================
+    # PROPERTIES
+    # =================================================================================================================
+
+    @property
+    def file_path(self):
+        return self._file_path
+
+    @property
+    def is_psb(self):
+        return self.version == PSB_VERSION
+
+    @property
+    def root(self):
+        return self._root
+
+    # =================================================================================================================
+    # BASE
+    # =================================================================================================================
+
+    def close(self):
+        """
+        Closes the memory mapped file
+        """
+
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def layers(self, include_groups=False):
+        """
+        Returns all the layers of the document from top to bottom.
+
+        :param bool include_groups: whether to include group layers.
+        :return: list of layers.
+        :rtype: list(PsdLayer)
+        """
+
+        if not include_groups:
+            return self._root.descendants()
+
+        layers = list()
+
+        def _walk(group):
+            for child in group.children:
+                layers.append(child)
+                if child.is_group:
+                    _walk(child)
+
+        _walk(self._root)
+
+        return layers
+
+    def find_layers(self, name=None):
+        """
+        Returns all the layers (not groups) of the document, optionally filtered by name.
+
+        :param str name: name of the layers to return. If not given, all layers are returned.
+        :return: list of layers.
+        :rtype: list(PsdLayer)
+        """
+
+        return [layer for layer in self.layers() if name is None or layer.name == name]
+
+    def decode_channel(self, offset, length, width, height):
+        """
+        Decodes the channel data stored at the given offset as 8 bits per pixel data.
+
+        :param int offset: offset of the channel data (including compression method).
+        :param int length: length of the channel data.
+        :param int width: width of the channel.
+        :param int height: height of the channel.
+        :return: channel data (width * height bytes).
+        :rtype: bytes
+        """
+
+        if width <= 0 or height <= 0 or length < 2:
+            return b''
+
+        compression = struct.unpack_from('>H', self._data, offset)[0]
+        data = self._decode(compression, offset + 2, offset + length, width, height)
+
+        return self._to_8_bits(data, width, height)
+
+    def layer_rgba(self, layer):
+        """
+        Decodes and returns the pixels of the given layer as interleaved RGBA data.
+
+        :param PsdLayer layer: layer to decode.
+        :return: RGBA data (width * height * 4 bytes).
+        :rtype: bytearray
+        """
+
+        pixel_count = layer.width * layer.height
+        rgba = bytearray(pixel_count * 4)
+        if not pixel_count:
+            return rgba
+
+        if self.color_mode == RGB_MODE:
+            color_channels = (0, 1, 2)
+        elif self.color_mode == GRAYSCALE_MODE:
+            color_channels = (0, 0, 0)
+        else:
+            raise PsdError('Color mode {} is not supported: "{}"'.format(self.color_mode, self._file_path))
+
+        decoded = dict()
+        for i, channel_id in enumerate(color_channels):
+            if channel_id not in decoded:
+                decoded[channel_id] = layer.channel(channel_id) or bytes(pixel_count)
+            rgba[i::4] = decoded[channel_id]
+        alpha = layer.channel(TRANSPARENCY_CHANNEL)
+        rgba[3::4] = alpha if alpha else b'\xff' * pixel_count
+
+        return rgba
+
+    def composite_rgba(self):
+        """
+        Decodes and returns the merged image stored in the document as interleaved RGBA data.
+
+        :return: RGBA data (width * height * 4 bytes).
+        :rtype: bytearray
+        """
+
+        width, height = self.width, self.height
+        compression = struct.unpack_from('>H', self._data, self._image_data_offset)[0]
+        start = self._image_data_offset + 2
+        channel_count = min(self.channel_count, 4)
+
+        channels = list()
+        if compression == RLE_COMPRESSION:
+            # row byte counts of all channels are stored before the compressed rows of all channels
+            count_size = 4 if self.is_psb else 2
+            counts = struct.unpack_from(
+                '>{}{}'.format(height * self.channel_count, 'I' if self.is_psb else 'H'), self._data, start)
+            position = start + height * self.channel_count * count_size
+            for i in range(channel_count):
+                rows = counts[i * height:(i + 1) * height]
+                channels.append(self._decode_rle_rows(position, rows, width))
+                position += sum(rows)
+        else:
+            channel_size = width * height * self.depth // 8
+            for i in range(channel_count):
+                channel_start = start + i * channel_size
+                data = self._decode(compression, channel_start, channel_start + channel_size, width, height)
+                channels.append(self._to_8_bits(data, width, height))
+
+        pixel_count = width * height
+        if self.color_mode == GRAYSCALE_MODE:
+            channels = [channels[0]] * 3 + channels[1:2]
+        rgba = bytearray(pixel_count * 4)
+        for i in range(3):
+            rgba[i::4] = channels[i]
+        rgba[3::4] = channels[3] if len(channels) > 3 else b'\xff' * pixel_count
+
+        return rgba
+
+    def export_layer(self, layer, png_path, canvas=False):
+        """
+        Exports given layer into a PNG file.
+
+        :param PsdLayer layer: layer to export.
+        :param str png_path: path of the PNG file.
+        :param bool canvas: if True, the PNG has the size of the document and the layer is placed at its position.
+            Otherwise, the PNG has the size of the layer bounding box.
+        :return: path of the exported PNG file or None if layer has no pixels.
+        :rtype: str or None
+        """
+
+        rgba = layer.rgba()
+        width, height = layer.width, layer.height
+        if canvas:
+            rgba = self._place_on_canvas(layer, rgba)
+            width, height = self.width, self.height
+        if not width or not height:
+            return None
+
+        png_folder = os.path.dirname(png_path)
+        if png_folder and not os.path.isdir(png_folder):
+            os.makedirs(png_folder)
+        write_png(png_path, width, height, rgba)
+
+        return png_path
+
+    # =================================================================================================================
+    # INTERNAL
+    # =================================================================================================================
+
+    def _read_header(self):
+        """
+        Internal function that reads file header.
+        """
+
+        if self._data[:4] != PSD_SIGNATURE:
+            raise PsdError('File is not a valid Photoshop document: "{}"'.format(self._file_path))
+
+        self.version, self.channel_count, self.height, self.width, self.depth, self.color_mode = struct.unpack_from(
+            '>H6xHIIHH', self._data, 4)
+        if self.version not in (PSD_VERSION, PSB_VERSION):
+            raise PsdError('Photoshop document version {} is not supported: "{}"'.format(
+                self.version, self._file_path))
+
+    def _read_length(self, offset, long_length=None):
+        """
+        Internal function that reads a length field, which uses 8 bytes in PSB files.
+
+        :param int offset: offset of the length field.
+        :param bool long_length: whether length uses 8 bytes. If not given, it depends on the document version.
+        :return: length value and offset after the length field.
+        :rtype: tuple(int, int)
+        """
+
+        long_length = self.is_psb if long_length is None else long_length
+        if long_length:
+            return struct.unpack_from('>Q', self._data, offset)[0], offset + 8
+
+        return struct.unpack_from('>I', self._data, offset)[0], offset + 4
+
+    def _read_sections(self):
+        """
+        Internal function that skips color mode data and image resources and reads layer and mask information.
+        """
+
+        offset = 26
+        color_data_length = struct.unpack_from('>I', self._data, offset)[0]
+        offset += 4 + color_data_length
+        resources_length = struct.unpack_from('>I', self._data, offset)[0]
+        offset += 4 + resources_length
+
+        layer_mask_length, offset = self._read_length(offset)
+        layer_mask_end = offset + layer_mask_length
+        self._image_data_offset = layer_mask_end
+        if not layer_mask_length:
+            return
+
+        layer_info_length, layer_info_offset = self._read_length(offset)
+        if layer_info_length:
+            self._read_layer_info(layer_info_offset)
+            offset = layer_info_offset + layer_info_length
+        else:
+            offset = layer_info_offset
+
+        # 16 and 32 bits documents store their layers in additional layer information blocks
+        if not self._layers and offset < layer_mask_end:
+            global_mask_length = struct.unpack_from('>I', self._data, offset)[0]
+            offset += 4 + global_mask_length
+            for key, data_offset, _ in self._read_tagged_blocks(offset, layer_mask_end):
+                if key in (b'Lr16', b'Lr32', b'Layr'):
+                    self._read_layer_info(data_offset)
+                    break
+
+    def _read_tagged_blocks(self, offset, end):
+        """
+        Internal function that iterates additional layer information blocks.
+
+        :param int offset: offset of the first block.
+        :param int end: end offset of the blocks.
+        :return: generator of block key, data offset and data length.
+        :rtype: generator(tuple(bytes, int, int))
+        """
+
+        while offset + 12 <= end:
+            signature = self._data[offset:offset + 4]
+            if signature not in _TAGGED_BLOCK_SIGNATURES:
+                # some writers pad blocks, so we look for the next block signature
+                offset += 1
+                continue
+            key = self._data[offset + 4:offset + 8]
+            length, data_offset = self._read_length(offset + 8, long_length=self.is_psb and key in _PSB_LONG_KEYS)
+            yield key, data_offset, length
+            offset = data_offset + length
+
+    def _read_layer_info(self, offset):
+        """
+        Internal function that reads layer records, computes channel data offsets and builds the layer tree.
+
+        :param int offset: offset of the layer count field.
+        """
+
+        layer_count = abs(struct.unpack_from('>h', self._data, offset)[0])
+        self._merged_alpha = struct.unpack_from('>h', self._data, offset)[0] < 0
+        offset += 2
+
+        layers = list()
+        for i in range(layer_count):
+            layer = PsdLayer(self, i)
+            layer.top, layer.left, layer.bottom, layer.right, channel_count = struct.unpack_from(
+                '>iiiiH', self._data, offset)
+            offset += 18
+            for _ in range(channel_count):
+                channel_id = struct.unpack_from('>h', self._data, offset)[0]
+                channel_length, offset = self._read_length(offset + 2)
+                layer.channels.append([channel_id, 0, channel_length])
+            layer.blend_mode = self._data[offset + 4:offset + 8]
+            layer.opacity, _, layer.flags = struct.unpack_from('>BBB', self._data, offset + 8)
+            extra_length = struct.unpack_from('>I', self._data, offset + 12)[0]
+            extra_offset = offset + 16
+            offset = extra_offset + extra_length
+            self._read_layer_extra_data(layer, extra_offset, offset)
+            layers.append(layer)
+
+        # channel image data is stored after all layer records, in the same order
+        for layer in layers:
+            for channel in layer.channels:
+                channel[1] = offset
+                offset += channel[2]
+            layer.channels = [tuple(channel) for channel in layer.channels]
+
+        self._layers = layers
+        self._build_tree()
+
+    def _read_layer_extra_data(self, layer, offset, end):
+        """
+        Internal function that reads layer mask, layer name and additional layer information of a layer record.
+
+        :param PsdLayer layer: layer record.
+        :param int offset: offset of the extra data.
+        :param int end: end offset of the extra data.
+        """
+
+        mask_length = struct.unpack_from('>I', self._data, offset)[0]
+        if mask_length >= 16:
+            layer.mask_rect = struct.unpack_from('>iiii', self._data, offset + 4)
+        offset += 4 + mask_length
+        blending_length = struct.unpack_from('>I', self._data, offset)[0]
+        offset += 4 + blending_length
+
+        # pascal string padded to a multiple of 4 bytes
+        name_length = struct.unpack_from('>B', self._data, offset)[0]
+        layer.name = self._data[offset + 1:offset + 1 + name_length].decode('latin-1')
+        offset += ((name_length + 1 + 3) // 4) * 4
+
+        for key, data_offset, length in self._read_tagged_blocks(offset, end):
+            if key == b'luni' and length >= 4:
+                char_count = struct.unpack_from('>I', self._data, data_offset)[0]
+                name_data = self._data[data_offset + 4:data_offset + 4 + char_count * 2]
+                layer.name = name_data.decode('utf-16-be', 'replace').rstrip('\x00')
+            elif key in (b'lsct', b'lsdk') and length >= 4:
+                layer.section_type = struct.unpack_from('>I', self._data, data_offset)[0]
+
+    def _build_tree(self):
+        """
+        Internal function that builds the layer tree. Layer records are stored from bottom to top, and groups are
+        delimited by a bounding section divider record (bottom) and the group record (top).
+        """
+
+        self._root.children = list()
+        groups = [self._root]
+        for layer in reversed(self._layers):
+            if layer.is_divider:
+                if len(groups) > 1:
+                    groups.pop()
+                continue
+            group = groups[-1]
+            layer.parent = group if group is not self._root else None
+            group.children.append(layer)
+            if layer.is_group:
+                layer.children = list()
+                groups.append(layer)
+
+    def _decode(self, compression, start, end, width, height):
+        """
+        Internal function that decodes channel data.
+
+        :param int compression: compression method.
+        :param int start: offset of the compressed data.
+        :param int end: end offset of the compressed data.
+        :param int width: width of the channel.
+        :param int height: height of the channel.
+        :return: decoded data, with the bit depth of the document.
+        :rtype: bytes
+        """
+
+        row_size = (width * self.depth + 7) // 8
+        if compression == RAW_COMPRESSION:
+            return self._data[start:start + row_size * height]
+        elif compression == RLE_COMPRESSION:
+            count_size = 4 if self.is_psb else 2
+            rows = struct.unpack_from('>{}{}'.format(height, 'I' if self.is_psb else 'H'), self._data, start)
+            return self._decode_rle_rows(start + height * count_size, rows, row_size, to_8_bits=False)
+        elif compression in (ZIP_COMPRESSION, ZIP_PREDICTION_COMPRESSION):
+            data = zlib.decompress(self._data[start:end])
+            if compression == ZIP_PREDICTION_COMPRESSION:
+                data = self._undo_prediction(data, width, height)
+            return data
+
+        raise PsdError('Compression method {} is not supported: "{}"'.format(compression, self._file_path))
+
+    def _decode_rle_rows(self, offset, row_lengths, row_size, to_8_bits=True):
+        """
+        Internal function that decodes PackBits compressed rows.
+
+        :param int offset: offset of the first compressed row.
+        :param list(int) row_lengths: compressed length of each row.
+        :param int row_size: decoded size of each row, in pixels if to_8_bits is True and in bytes otherwise.
+        :param bool to_8_bits: whether to convert decoded data into 8 bits per pixel data.
+        :return: decoded data.
+        :rtype: bytes
+        """
+
+        data = self._data
+        decoded = bytearray()
+        for row_length in row_lengths:
+            position, row_end = offset, offset + row_length
+            while position < row_end:
+                header = data[position]
+                header = header if isinstance(header, int) else ord(header)
+                if header < 128:
+                    decoded += data[position + 1:position + header + 2]
+                    position += header + 2
+                elif header > 128:
+                    decoded += data[position + 1:position + 2] * (257 - header)
+                    position += 2
+                else:
+                    position += 1
+            offset = row_end
+
+        if to_8_bits:
+            return self._to_8_bits(bytes(decoded), row_size, len(row_lengths))
+
+        return bytes(decoded)
+
+    def _undo_prediction(self, data, width, height):
+        """
+        Internal function that undoes the delta encoding used by ZIP with prediction compression.
+
+        :param bytes data: decompressed data.
+        :param int width: width of the channel.
+        :param int height: height of the channel.
+        :return: decoded data.
+        :rtype: bytes
+        """
+
+        if self.depth == 8:
+            decoded = bytearray(data)
+            for y in range(height):
+                row = y * width
+                for x in range(row + 1, row + width):
+                    decoded[x] = (decoded[x] + decoded[x - 1]) & 0xFF
+            return bytes(decoded)
+        elif self.depth == 16:
+            values = list(struct.unpack('>{}H'.format(width * height), data[:width * height * 2]))
+            for y in range(height):
+                row = y * width
+                for x in range(row + 1, row + width):
+                    values[x] = (values[x] + values[x - 1]) & 0xFFFF
+            return struct.pack('>{}H'.format(width * height), *values)
+        elif self.depth == 32:
+            # bytes of each row are delta encoded and stored by significance: first the most significant byte of all
+            # the values of the row, then the second one and so on
+            row_size = width * 4
+            decoded = bytearray(row_size * height)
+            for y in range(height):
+                start = y * row_size
+                row = bytearray(data[start:start + row_size])
+                for x in range(1, row_size):
+                    row[x] = (row[x] + row[x - 1]) & 0xFF
+                for byte_index in range(4):
+                    decoded[start + byte_index:start + row_size:4] = row[byte_index * width:(byte_index + 1) * width]
+            return bytes(decoded)
+
+        raise PsdError('ZIP with prediction is not supported for {} bits documents: "{}"'.format(
+            self.depth, self._file_path))
+
+    def _to_8_bits(self, data, width, height):
+        """
+        Internal function that converts decoded data with the bit depth of the document into 8 bits per pixel data.
+
+        :param bytes data: decoded data.
+        :param int width: width of the channel.
+        :param int height: height of the channel.
+        :return: 8 bits per pixel data.
+        :rtype: bytes
+        """
+
+        if self.depth == 8:
+            return data
+        elif self.depth == 16:
+            # most significant byte of each big endian value
+            return data[0::2]
+        elif self.depth == 32:
+            values = struct.unpack('>{}f'.format(width * height), data[:width * height * 4])
+            return bytes(bytearray(max(0, min(255, int(value * 255.0 + 0.5))) for value in values))
+        elif self.depth == 1:
+            row_size = (width + 7) // 8
+            decoded = bytearray(width * height)
+            for y in range(height):
+                for x in range(width):
+                    bit = (bytearray(data[y * row_size + x // 8:y * row_size + x // 8 + 1])[0] >> (7 - x % 8)) & 1
+                    decoded[y * width + x] = 0 if bit else 255
+            return bytes(decoded)
+
+        raise PsdError('Bit depth {} is not supported: "{}"'.format(self.depth, self._file_path))
+
+    def _place_on_canvas(self, layer, rgba):
+        """
+        Internal function that places given layer pixels into a transparent image with the size of the document.
+
+        :param PsdLayer layer: layer which pixels are placed.
+        :param bytearray rgba: RGBA data of the layer.
+        :return: RGBA data with the size of the document.
+        :rtype: bytearray
+        """
+
+        canvas = bytearray(self.width * self.height * 4)
+        left, right = max(layer.left, 0), min(layer.right, self.width)
+        if right <= left:
+            return canvas
+        for y in range(max(layer.top, 0), min(layer.bottom, self.height)):
+            source = ((y - layer.top) * layer.width + (left - layer.left)) * 4
+            target = (y * self.width + left) * 4
+            canvas[target:target + (right - left) * 4] = rgba[source:source + (right - left) * 4]
+
+        return canvas
+
+
+def write_png(png_path, width, height, rgba):
+    """
+    Writes RGBA data into a PNG file.
+
+    :param str png_path: path of the PNG file.
+    :param int width: width of the image.
+    :param int height: height of the image.
+    :param bytes or bytearray rgba: interleaved RGBA data (width * height * 4 bytes).
+    """
+
+    def _chunk(chunk_type, chunk_data):
+        return struct.pack('>I', len(chunk_data)) + chunk_type + chunk_data + struct.pack(
+            '>I', zlib.crc32(chunk_type + chunk_data) & 0xFFFFFFFF)
+
+    row_size = width * 4
+    raw = bytearray((row_size + 1) * height)
+    for y in range(height):
+        # filter type 0 (none) byte is left at the beginning of each row
+        raw[y * (row_size + 1) + 1:(y + 1) * (row_size + 1)] = rgba[y * row_size:(y + 1) * row_size]
+
+    with open(png_path, 'wb') as png_file:
+        png_file.write(b'\x89PNG\r\n\x1a\n')
+        png_file.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+        png_file.write(_chunk(b'IDAT', zlib.compress(bytes(raw), 6)))
+        png_file.write(_chunk(b'IEND', b''))
+
+
+def layer_file_name(layer, index=None):
+    """
+    Returns a valid PNG file name for the given layer.
+
+    :param PsdLayer layer: layer.
+    :param int index: index used as file name prefix.
+    :return: PNG file name.
+    :rtype: str
+    """
+
+    name = _INVALID_FILE_NAME_CHARS.sub('_', layer.name).strip() or 'Layer'
+    if index is not None:
+        name = '{:03d}_{}'.format(index, name)
+
+    return '{}.png'.format(name)
+
+
+def _export_layers_job(job):
+    """
+    Internal function used by process pool workers to export layers. Each worker memory maps the document.
+
+    :param tuple(str, list(tuple(int, str)), bool) job: document path, layer indices and PNG paths and canvas flag.
+    :return: exported PNG paths.
+    :rtype: list(str or None)
+    """
+
+    psd_path, layer_paths, canvas = job
+    exported = list()
+    with PsdReader(psd_path) as reader:
+        layers = dict((layer.index, layer) for layer in reader.layers())
+        for layer_index, png_path in layer_paths:
+            try:
+                exported.append(reader.export_layer(layers[layer_index], png_path, canvas=canvas))
+            except Exception as exc:
+                LOGGER.warning('Impossible to export layer {} of "{}": {}'.format(layer_index, psd_path, exc))
+                exported.append(None)
+
+    return exported
+
+
+def export_layers(psd_path, output_folder, layers=None, canvas=False, visible_only=False, processes=None):
+    """
+    Exports layers of the given Photoshop document into PNG files using parallel processes.
+
+    :param str psd_path: path of the Photoshop document.
+    :param str output_folder: folder where PNG files are stored.
+    :param list(str) layers: names of the layers to export. If not given, all layers are exported.
+    :param bool canvas: if True, PNG files have the size of the document and layers are placed at their position.
+    :param bool visible_only: whether to only export visible layers.
+    :param int processes: number of processes. If not given, the number of CPUs is used. If 1, layers are exported
+        in the current process.
+    :return: exported PNG paths, from top to bottom layer. Layers that could not be exported are not included.
+    :rtype: list(str)
+    """
+
+    with PsdReader(psd_path) as reader:
+        layer_paths = list()
+        for i, layer in enumerate(reader.layers()):
+            if layers is not None and layer.name not in layers:
+                continue
+            if visible_only and not layer.visible:
+                continue
+            if not layer.width or not layer.height:
+                continue
+            layer_paths.append((layer.index, os.path.join(output_folder, layer_file_name(layer, index=i))))
+    if not layer_paths:
+        return list()
+
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1 or not FUTURES_AVAILABLE:
+        return [png_path for png_path in _export_layers_job((psd_path, layer_paths, canvas)) if png_path]
+
+    chunk_count = min(len(layer_paths), processes * 4)
+    jobs = [(psd_path, layer_paths[i::chunk_count], canvas) for i in range(chunk_count)]
+    exported = dict()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for job, job_paths in zip(jobs, executor.map(_export_layers_job, jobs)):
+            for (layer_index, _), png_path in zip(job[1], job_paths):
+                exported[layer_index] = png_path
+
+    return [exported[layer_index] for layer_index, _ in layer_paths if exported.get(layer_index)]
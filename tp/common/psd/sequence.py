@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 
 """
-Module that contains functions to work with image sequences inside Photoshop
+Module that contains functions to work with image sequences of Photoshop documents
 """
 
 from __future__ import print_function, division, absolute_import
@@ -12,12 +12,35 @@ import tempfile
 import shutil
 import subprocess
 
-import comtypes.client
+from tp.common.psd import document, reader
 
-from tpDcc.libs.psd.core import document
+
+def export_image_sequence_from_psd(psd_file, export_dir_path=None, processes=None):
+    """
+    Exports each layer of the given Photoshop document into a PNG file with the size of the document, without
+    Photoshop. Layers are decoded and exported in parallel processes.
+
+    :param str psd_file: path of the Photoshop document.
+    :param str export_dir_path: folder where PNG files are stored. If not given, a temporary folder is created.
+    :param int processes: number of processes. If not given, the number of CPUs is used.
+    :return: exported PNG files (from top to bottom layer) and export folder.
+    :rtype: tuple(list(str), str) or None
+    """
+
+    if not os.path.isfile(psd_file):
+        return None
+
+    export_dir_path = export_dir_path or tempfile.mkdtemp()
+    files_list = reader.export_layers(psd_file, export_dir_path, canvas=True, processes=processes)
+
+    return files_list, export_dir_path
 
 
 def load_image_sequence_from_psd(psd_file):
+
+    # import here because Photoshop COM interface is only available in Windows
+    import comtypes.client
+
     layers_list = list()
     files_list = list()
 
@@ -48,7 +71,7 @@ def load_image_sequence_from_psd(psd_file):
             layer_name = 'Layer_' + str(i)
             png_file = os.path.join(export_dir_path, layer_name + '.png')
             if os.path.isfile(png_file):
-                psd_time = os.state(psd_file)[8]
+                psd_time = os.stat(psd_file)[8]
                 png_time = os.stat(png_file)[8]
                 if psd_time > png_time:
                     os.remove(png_file)
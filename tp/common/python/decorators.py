@@ -9,11 +9,13 @@ from __future__ import print_function, division, absolute_import
 
 import os
 import time
+import weakref
 import inspect
 import logging
 import traceback
 import threading
 from functools import wraps, update_wrapper
+from collections import OrderedDict
 
 from tp.core import log
 from tp.common.python import helpers, debug
@@ -293,19 +295,273 @@ def repeater(interval, limit=-1):
     return actual_decorator
 
 
+class CacheStats(object):
+    """
+    Class that stores hit/miss/eviction statistics of a cache decorator
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return '<{}(hits={}, misses={}, evictions={})>'.format(
+            self.__class__.__name__, self.hits, self.misses, self.evictions)
+
+    def to_dict(self):
+        """
+        Returns statistics as a dictionary
+        :return: dict
+        """
+
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+            'hit_ratio': (float(self.hits) / total) if total else 0.0
+        }
+
+    def reset(self):
+        """
+        Resets all statistics
+        """
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+_KWARGS_MARK = object()
+
+
+def _make_cache_key(args, kwargs):
+    """
+    Internal function that returns a hashable key for the given function arguments
+    :param args: tuple
+    :param kwargs: dict
+    :return: tuple
+    """
+
+    if not kwargs:
+        return args
+    return args + (_KWARGS_MARK,) + tuple(sorted(kwargs.items()))
+
+
+class _LRUStore(object):
+    """
+    Internal bounded cache storage with least recently used eviction and optional time to live
+    """
+
+    def __init__(self, stats, maxsize=128, ttl=None):
+        self._stats = stats
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, signature=None):
+        """
+        Returns cached value for given key
+        :param key: hashable
+        :param signature: object, if given, cached value is only valid if it was stored with the same signature
+        :return: tuple(bool, object), whether the value was found and the cached value
+        """
+
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False, None
+        value, expire_time, entry_signature = entry
+        if (expire_time is not None and time.time() >= expire_time) or entry_signature != signature:
+            self._stats.evictions += 1
+            return False, None
+        self._data[key] = entry
+        return True, value
+
+    def set(self, key, value, signature=None):
+        """
+        Stores given value in cache
+        :param key: hashable
+        :param value: object
+        :param signature: object
+        """
+
+        expire_time = (time.time() + self._ttl) if self._ttl is not None else None
+        self._data.pop(key, None)
+        self._data[key] = (value, expire_time, signature)
+        if self._maxsize is not None:
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+                self._stats.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+
+
+def _setup_cache_wrapper(wrapper, stats, clear_fn):
+    """
+    Internal function that adds cache introspection functions to the given wrapper function
+    :param wrapper: fn
+    :param stats: CacheStats
+    :param clear_fn: fn
+    """
+
+    wrapper.cache_stats = lambda: stats.to_dict()
+    wrapper.cache_reset_stats = stats.reset
+    wrapper.cache_clear = clear_fn
+
+    return wrapper
+
+
+def lru_cache(maxsize=128, ttl=None):
+    """
+    Function decorator that caches the results of the decorated function. Cache is bounded to the given size, least
+    recently used results are evicted first. It is thread safe and positional and keyword arguments are taken into
+    account. Arguments must be hashable.
+    Decorated function exposes cache_stats(), cache_reset_stats() and cache_clear() functions.
+    :param maxsize: int or None, maximum number of cached results. If None, cache is unbounded.
+    :param ttl: float or None, time (in seconds) a cached result is valid for. If None, results never expire.
+    """
+
+    def decorator(fn):
+        lock = threading.RLock()
+        stats = CacheStats()
+        store = _LRUStore(stats, maxsize=maxsize, ttl=ttl)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = _make_cache_key(args, kwargs)
+            with lock:
+                found, value = store.get(key)
+                if found:
+                    stats.hits += 1
+                    return value
+                stats.misses += 1
+            value = fn(*args, **kwargs)
+            with lock:
+                store.set(key, value)
+            return value
+
+        def cache_clear():
+            with lock:
+                store.clear()
+
+        return _setup_cache_wrapper(wrapper, stats, cache_clear)
+
+    return decorator
+
+
+def ttl_cache(ttl, maxsize=128):
+    """
+    Function decorator that caches the results of the decorated function during the given amount of time
+    :param ttl: float, time (in seconds) a cached result is valid for
+    :param maxsize: int or None, maximum number of cached results
+    """
+
+    return lru_cache(maxsize=maxsize, ttl=ttl)
+
+
 def cached(fn):
-    cache = {}
+    """
+    Function decorator that caches the results of the decorated function forever
+    Use lru_cache if the number of different arguments the function is called with is not bounded
+    :param fn: fn
+    """
 
-    @wraps(fn)
-    def wrapper(*args):
+    return lru_cache(maxsize=None)(fn)
+
+
+def instance_cache(maxsize=128, ttl=None):
+    """
+    Method decorator that caches results per instance. Caches are stored in a weak key dictionary so they do not keep
+    instances alive. Instances must be hashable and weak referenceable.
+    :param maxsize: int or None, maximum number of cached results per instance
+    :param ttl: float or None, time (in seconds) a cached result is valid for
+    """
+
+    def decorator(fn):
+        lock = threading.RLock()
+        stats = CacheStats()
+        stores = weakref.WeakKeyDictionary()
+
+        @wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            key = _make_cache_key(args, kwargs)
+            with lock:
+                store = stores.get(self)
+                if store is None:
+                    store = stores[self] = _LRUStore(stats, maxsize=maxsize, ttl=ttl)
+                found, value = store.get(key)
+                if found:
+                    stats.hits += 1
+                    return value
+                stats.misses += 1
+            value = fn(self, *args, **kwargs)
+            with lock:
+                store.set(key, value)
+            return value
+
+        def cache_clear(instance=None):
+            with lock:
+                if instance is None:
+                    stores.clear()
+                else:
+                    stores.pop(instance, None)
+
+        return _setup_cache_wrapper(wrapper, stats, cache_clear)
+
+    return decorator
+
+
+def file_cache(path_arg=0, maxsize=128):
+    """
+    Function decorator that caches the results of functions that read data from disk. Cached results are invalidated
+    when the modification time or the size of the file changes.
+    :param path_arg: int or str, index of the positional argument or name of the keyword argument with the file path
+    :param maxsize: int or None, maximum number of cached results
+    """
+
+    def _file_signature(file_path):
         try:
-            return cache[args]
-        except KeyError:
-            rv = fn(*args)
-            cache[args] = rv
-            return rv
+            file_stat = os.stat(file_path)
+        except (OSError, TypeError, ValueError):
+            return None
+        return file_stat.st_mtime, file_stat.st_size
 
-    return wrapper
+    def decorator(fn):
+        lock = threading.RLock()
+        stats = CacheStats()
+        store = _LRUStore(stats, maxsize=maxsize)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if isinstance(path_arg, int):
+                file_path = args[path_arg] if len(args) > path_arg else None
+            else:
+                file_path = kwargs.get(path_arg)
+            signature = _file_signature(file_path)
+            if signature is None:
+                return fn(*args, **kwargs)
+            key = _make_cache_key(args, kwargs)
+            with lock:
+                found, value = store.get(key, signature=signature)
+                if found:
+                    stats.hits += 1
+                    return value
+                stats.misses += 1
+            value = fn(*args, **kwargs)
+            with lock:
+                store.set(key, value, signature=signature)
+            return value
+
+        def cache_clear():
+            with lock:
+                store.clear()
+
+        return _setup_cache_wrapper(wrapper, stats, cache_clear)
+
+    return decorator
 
 
 def add_method(cls):
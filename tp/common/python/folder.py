@@ -15,15 +15,53 @@ import time
 import errno
 import shutil
 import fnmatch
+import hashlib
 import tempfile
 import traceback
 import subprocess
 from distutils.dir_util import copy_tree
 
+# concurrent.futures is not available in Python 2 (unless futures backport is installed), in that case files are
+# copied serially
+FUTURES_AVAILABLE = True
+try:
+    from concurrent import futures
+except ImportError:
+    FUTURES_AVAILABLE = False
+
 from tp.core import log
 
 logger = log.tpLogger
 
+# os.scandir is not available in Python 2, in that case folders are listed with os.listdir
+SCANDIR_AVAILABLE = hasattr(os, 'scandir')
+
+
+class _FolderEntry(object):
+    """
+    Internal class that mimics os.DirEntry interface. Used to list folders when os.scandir is not available
+    """
+
+    def __init__(self, folder_path, name):
+        self.name = name
+        self.path = os.path.join(folder_path, name)
+
+    def is_dir(self, follow_symlinks=True):
+        if not follow_symlinks and os.path.islink(self.path):
+            return False
+        return os.path.isdir(self.path)
+
+    def is_file(self, follow_symlinks=True):
+        if not follow_symlinks and os.path.islink(self.path):
+            return False
+        return os.path.isfile(self.path)
+
+    def is_symlink(self):
+        return os.path.islink(self.path)
+
+    def stat(self, follow_symlinks=True):
+        return os.stat(self.path) if follow_symlinks else os.lstat(self.path)
+
 
 def create_folder(name, directory=None, make_unique=False):
     """
@@ -116,24 +154,12 @@ def copy_folder(directory, directory_destination, ignore_patterns=[]):
     :return: str, destination directory
     """
 
-    from tp.common.python import path, osplatform
+    from tp.common.python import path
 
     if not path.is_dir(directory=directory):
         return
     if not ignore_patterns:
-        cmd = None
-        if osplatform.is_linux():
-            cmd = ['rsync', directory, directory_destination, '-azr']
-        elif osplatform.is_windows():
-            cmd = [
-                'robocopy', directory.replace('/', '\\'), directory_destination.replace('/', '\\'), '/S', '/Z', '/MIR']
-        if cmd:
-            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-            out, err = proc.communicate()
-            if out:
-                logger.error(err)
-        else:
-            shutil.copytree(directory, directory_destination)
+        mirror_folder(directory, directory_destination)
     else:
         shutil.copytree(directory, directory_destination, ignore=shutil.ignore_patterns(ignore_patterns))
 
@@ -216,6 +242,178 @@ def copy_directory_contents_safe(source, target, skip_exists=True, overwrite_mod
                 shutil.copy2(s, d)
 
 
+def scandir(directory):
+    """
+    Returns the entries of the given directory. If available, os.scandir is used, so type and information of the
+    files are retrieved while listing the directory. Otherwise, entries with the same interface are returned
+    :param str directory: directory path.
+    :return: list of directory entries, with name and path attributes and is_dir, is_file, is_symlink and stat methods
+    :rtype: list(os.DirEntry)
+    """
+
+    if SCANDIR_AVAILABLE:
+        return list(os.scandir(directory))
+
+    return [_FolderEntry(directory, entry_name) for entry_name in os.listdir(directory)]
+
+
+def get_folder_manifest(directory, ignore_patterns=None):
+    """
+    Returns a manifest with the size and modification time of all the files within given directory
+    :param str directory: root directory.
+    :param list(str) ignore_patterns: list of glob patterns of file and folder names to skip.
+    :return: tuple containing a dictionary with relative file paths as keys and (size, modification time) tuples as
+        values and a set with all the relative folder paths
+    :rtype: tuple(dict(str, tuple(int, float)), set(str))
+    """
+
+    files = dict()
+    folders = set()
+    if not os.path.isdir(directory):
+        return files, folders
+
+    ignore_patterns = ignore_patterns or list()
+    pending = [('', directory)]
+    while pending:
+        relative_root, root = pending.pop()
+        try:
+            entries = scandir(root)
+        except OSError:
+            continue
+        for entry in entries:
+            if any(fnmatch.fnmatch(entry.name, pattern) for pattern in ignore_patterns):
+                continue
+            relative_path = os.path.join(relative_root, entry.name) if relative_root else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    folders.add(relative_path)
+                    pending.append((relative_path, entry.path))
+                elif entry.is_file():
+                    entry_stat = entry.stat()
+                    files[relative_path] = (entry_stat.st_size, entry_stat.st_mtime)
+            except OSError:
+                continue
+
+    return files, folders
+
+
+def _get_file_hash(file_path, block_size=1024 * 1024):
+    """
+    Internal function that returns the MD5 hash of given file contents
+    :param str file_path: file path.
+    :param int block_size: number of bytes to read each time.
+    :return: hexadecimal hash.
+    :rtype: str
+    """
+
+    file_hash = hashlib.md5()
+    with open(file_path, 'rb') as open_file:
+        for block in iter(lambda: open_file.read(block_size), b''):
+            file_hash.update(block)
+
+    return file_hash.hexdigest()
+
+
+def mirror_folder(source, target, delete=False, use_hash=False, ignore_patterns=None, threads=8, mtime_tolerance=1.0):
+    """
+    Incrementally mirrors the source directory into the target directory. Only the files that are new or that changed
+    (different size or modification time) are copied.
+
+    :param str source: source directory path.
+    :param str target: destination directory path. It will be created if it does not exist.
+    :param bool delete: whether to delete files and folders in target directory that do not exist in source directory.
+    :param bool use_hash: whether files with same size but different modification time should be compared by their
+        contents before copying them.
+    :param list(str) ignore_patterns: list of glob patterns of file and folder names to skip.
+    :param int threads: number of threads used to copy files.
+    :param float mtime_tolerance: modification time difference (in seconds) under which files are considered equal.
+    :return: dictionary with the sync report (copied, deleted, skipped, bytes, elapsed, bytes_per_second and
+        files_per_second).
+    :rtype: dict
+    """
+
+    start_time = time.time()
+    (source_files, source_folders), (target_files, target_folders) = get_folder_manifest(
+        source, ignore_patterns=ignore_patterns), get_folder_manifest(target, ignore_patterns=ignore_patterns)
+
+    to_copy = list()
+    skipped = 0
+    for relative_path, (size, mtime) in source_files.items():
+        target_data = target_files.get(relative_path)
+        if target_data is not None and target_data[0] == size:
+            if abs(target_data[1] - mtime) <= mtime_tolerance:
+                skipped += 1
+                continue
+            if use_hash and _get_file_hash(
+                    os.path.join(source, relative_path)) == _get_file_hash(os.path.join(target, relative_path)):
+                skipped += 1
+                continue
+        to_copy.append(relative_path)
+
+    ensure_folder_exists(target)
+    for relative_folder in sorted(source_folders - target_folders):
+        ensure_folder_exists(os.path.join(target, relative_folder))
+
+    def _copy(relative_file_path):
+        shutil.copy2(os.path.join(source, relative_file_path), os.path.join(target, relative_file_path))
+        return source_files[relative_file_path][0]
+
+    copied_bytes = 0
+    copied = 0
+    if to_copy:
+        if FUTURES_AVAILABLE:
+            with futures.ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+                results = list(executor.map(_copy_safe(_copy), to_copy))
+        else:
+            results = [_copy_safe(_copy)(relative_file_path) for relative_file_path in to_copy]
+        for result in results:
+            if result is None:
+                continue
+            copied_bytes += result
+            copied += 1
+
+    deleted = 0
+    if delete:
+        for relative_path in set(target_files) - set(source_files):
+            try:
+                os.remove(os.path.join(target, relative_path))
+                deleted += 1
+            except OSError:
+                logger.warning('Failed to delete extraneous file: {}'.format(os.path.join(target, relative_path)))
+        for relative_folder in sorted(target_folders - source_folders, key=len, reverse=True):
+            shutil.rmtree(os.path.join(target, relative_folder), ignore_errors=True)
+
+    elapsed = max(time.time() - start_time, 1e-6)
+
+    return {
+        'copied': copied,
+        'deleted': deleted,
+        'skipped': skipped,
+        'bytes': copied_bytes,
+        'elapsed': elapsed,
+        'bytes_per_second': copied_bytes / elapsed,
+        'files_per_second': copied / elapsed
+    }
+
+
+def _copy_safe(copy_fn):
+    """
+    Internal function that wraps given copy function so copy errors are logged instead of raised
+    :param callable copy_fn: copy function.
+    :return: wrapped function.
+    :rtype: callable
+    """
+
+    def _wrapper(relative_path):
+        try:
+            return copy_fn(relative_path)
+        except (IOError, OSError) as exc:
+            logger.warning('Failed to copy "{}": {}'.format(relative_path, exc))
+            return None
+
+    return _wrapper
+
+
 def delete_folder(folder_name, directory=None):
     """
     Deletes the folder by name in the given directory
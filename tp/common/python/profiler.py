@@ -7,13 +7,16 @@ Utility methods related to profile Python code
 
 from __future__ import print_function, division, absolute_import
 
+import os
 import sys
+import json
 import time
 import pstats
 import timeit
+import threading
 import cProfile as profile
 from functools import wraps
-from collections import defaultdict
+from collections import defaultdict, deque
 
 from tp.core import log
 
@@ -52,14 +55,13 @@ def fn_timer(fn):
 
 
 class LapCounter(object):
-    LapTimes = 0
-    LapList = list()
-
     def __init__(self):
         current_time = time.time()
         self._all_start = current_time
         self._start = current_time
         self._end = current_time
+        self.LapTimes = 0
+        self.LapList = list()
 
     def count(self, string=''):
         self._end = time.time()
@@ -86,6 +88,7 @@ class LapCounter(object):
     def reset(self):
         self._all_start = time.time()
         self._start = time.time()
+        self.LapTimes = 0
         self.LapList = list()
 
 
@@ -110,3 +113,415 @@ class IntegrationCounter(object):
         self._all_start = time.time()
         self._start = time.time()
         self._integration_dict = defaultdict(lambda: 0)
+
+
+# =====================================================================================================================
+# INSTRUMENTATION
+# =====================================================================================================================
+
+# Environment variable that can be used to enable instrumentation subsystems on startup. Subsystem names must be
+# separated with commas. Use "*" to enable all of them.
+PROFILE_ENV_VAR = 'TPDCC_PROFILE'
+
+ALL_SUBSYSTEMS = '*'
+
+
+class Histogram(object):
+    """
+    Class that aggregates timing samples (in seconds) in memory. Only a bounded amount of samples is kept to compute
+    percentiles, while count, total, min and max values take into account all recorded samples.
+    """
+
+    def __init__(self, name, max_samples=2048):
+        self._name = name
+        self._max_samples = max_samples
+        self._samples = deque(maxlen=max_samples)
+        self._count = 0
+        self._total = 0.0
+        self._min = None
+        self._max = None
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def total(self):
+        return self._total
+
+    def add(self, value):
+        """
+        Adds a new sample into the histogram
+        :param value: float
+        """
+
+        self._samples.append(value)
+        self._count += 1
+        self._total += value
+        if self._min is None or value < self._min:
+            self._min = value
+        if self._max is None or value > self._max:
+            self._max = value
+
+    def percentile(self, percent):
+        """
+        Returns the given percentile of the stored samples
+        :param percent: float, percentile between 0 and 100
+        :return: float
+        """
+
+        if not self._samples:
+            return 0.0
+        samples = sorted(self._samples)
+        index = int(round((percent / 100.0) * (len(samples) - 1)))
+        return samples[max(0, min(index, len(samples) - 1))]
+
+    def to_dict(self):
+        """
+        Returns a dictionary with the histogram aggregated data
+        :return: dict
+        """
+
+        return {
+            'count': self._count,
+            'total': self._total,
+            'mean': (self._total / self._count) if self._count else 0.0,
+            'min': self._min or 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'max': self._max or 0.0
+        }
+
+
+class _NullSpan(object):
+    """
+    Span used when instrumentation is disabled. Does nothing.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span(object):
+    """
+    Span that records the elapsed time of its context into an instrumentation registry
+    """
+
+    __slots__ = ('_registry', '_name', '_subsystem', '_start')
+
+    def __init__(self, registry, name, subsystem):
+        self._registry = registry
+        self._name = name
+        self._subsystem = subsystem
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = timeit.default_timer()
+        return self
+
+    def __exit__(self, *args):
+        self._registry.record(self._name, timeit.default_timer() - self._start, self._subsystem, start=self._start)
+        return False
+
+
+class Instrumentation(object):
+    """
+    Registry of named spans and counters. Instrumentation is enabled per subsystem and, when a subsystem is disabled,
+    its spans and counters are no-ops.
+    """
+
+    def __init__(self, max_samples=2048, max_events=100000):
+        self._lock = threading.Lock()
+        self._enabled = set()
+        self._max_samples = max_samples
+        self._histograms = dict()
+        self._counters = defaultdict(int)
+        self._trace = False
+        self._events = deque(maxlen=max_events)
+        self._origin = timeit.default_timer()
+
+    # =================================================================================================================
+    # BASE
+    # =================================================================================================================
+
+    def enable(self, subsystem=ALL_SUBSYSTEMS, trace=None):
+        """
+        Enables instrumentation for the given subsystem
+        :param subsystem: str, subsystem name to enable. If "*" all subsystems are enabled.
+        :param trace: bool or None, whether to record individual events so they can be exported as a trace
+        """
+
+        self._enabled.add(subsystem)
+        if trace is not None:
+            self._trace = bool(trace)
+
+    def disable(self, subsystem=ALL_SUBSYSTEMS):
+        """
+        Disables instrumentation for the given subsystem
+        :param subsystem: str, subsystem name to disable. If "*" all subsystems are disabled.
+        """
+
+        if subsystem == ALL_SUBSYSTEMS:
+            self._enabled.clear()
+        else:
+            self._enabled.discard(subsystem)
+
+    def is_enabled(self, subsystem):
+        """
+        Returns whether instrumentation for given subsystem is enabled
+        :param subsystem: str
+        :return: bool
+        """
+
+        return subsystem in self._enabled or ALL_SUBSYSTEMS in self._enabled
+
+    def reset(self):
+        """
+        Removes all recorded data
+        """
+
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._events.clear()
+            self._origin = timeit.default_timer()
+
+    def span(self, name, subsystem):
+        """
+        Returns a context that records the time spent inside it
+        :param name: str, span name
+        :param subsystem: str, subsystem the span belongs to
+        :return: context
+        """
+
+        if not self._enabled or not self.is_enabled(subsystem):
+            return _NULL_SPAN
+
+        return _Span(self, name, subsystem)
+
+    def count(self, name, subsystem, value=1):
+        """
+        Increases the counter with given name
+        :param name: str, counter name
+        :param subsystem: str, subsystem the counter belongs to
+        :param value: int, value to add to the counter
+        """
+
+        if not self._enabled or not self.is_enabled(subsystem):
+            return
+
+        key = '{}.{}'.format(subsystem, name)
+        with self._lock:
+            self._counters[key] += value
+
+    def record(self, name, elapsed, subsystem, start=None):
+        """
+        Records a new timing sample
+        :param name: str, span name
+        :param elapsed: float, elapsed time in seconds
+        :param subsystem: str, subsystem the span belongs to
+        :param start: float or None, start time of the span (used for trace events)
+        """
+
+        key = '{}.{}'.format(subsystem, name)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(key, max_samples=self._max_samples)
+            histogram.add(elapsed)
+            if self._trace:
+                start = (timeit.default_timer() - elapsed) if start is None else start
+                self._events.append((name, subsystem, start, elapsed, threading.current_thread().ident))
+
+    # =================================================================================================================
+    # EXPORT
+    # =================================================================================================================
+
+    def stats(self):
+        """
+        Returns all aggregated data
+        :return: dict
+        """
+
+        with self._lock:
+            return {
+                'spans': {key: histogram.to_dict() for key, histogram in self._histograms.items()},
+                'counters': dict(self._counters)
+            }
+
+    def export_json(self, file_path=None):
+        """
+        Exports aggregated data as JSON
+        :param file_path: str or None, if given, data is written into the given file
+        :return: str, JSON data
+        """
+
+        data = json.dumps(self.stats(), indent=2, sort_keys=True)
+        if file_path:
+            with open(file_path, 'w') as json_file:
+                json_file.write(data)
+
+        return data
+
+    def export_chrome_trace(self, file_path=None):
+        """
+        Exports recorded events using Chrome trace event format (chrome://tracing or Perfetto).
+        Events are only recorded when instrumentation is enabled with trace option.
+        :param file_path: str or None, if given, data is written into the given file
+        :return: str, JSON data
+        """
+
+        pid = os.getpid()
+        with self._lock:
+            trace_events = [{
+                'name': name, 'cat': subsystem, 'ph': 'X', 'pid': pid, 'tid': thread_id,
+                'ts': (start - self._origin) * 1000000.0, 'dur': elapsed * 1000000.0
+            } for name, subsystem, start, elapsed, thread_id in self._events]
+            for key, value in self._counters.items():
+                trace_events.append({
+                    'name': key, 'ph': 'C', 'pid': pid, 'tid': 0,
+                    'ts': (timeit.default_timer() - self._origin) * 1000000.0, 'args': {'value': value}})
+
+        data = json.dumps({'traceEvents': trace_events, 'displayTimeUnit': 'ms'})
+        if file_path:
+            with open(file_path, 'w') as json_file:
+                json_file.write(data)
+
+        return data
+
+    def log_stats(self):
+        """
+        Logs aggregated data
+        """
+
+        stats = self.stats()
+        for key, data in sorted(stats['spans'].items()):
+            logger.debug('{}: count={} p50={:.3f}ms p95={:.3f}ms max={:.3f}ms'.format(
+                key, data['count'], data['p50'] * 1000.0, data['p95'] * 1000.0, data['max'] * 1000.0))
+        for key, value in sorted(stats['counters'].items()):
+            logger.debug('{}: {}'.format(key, value))
+
+
+_INSTRUMENTATION = Instrumentation()
+for _subsystem in [item.strip() for item in os.environ.get(PROFILE_ENV_VAR, '').split(',') if item.strip()]:
+    _INSTRUMENTATION.enable(_subsystem)
+
+
+def instrumentation():
+    """
+    Returns global instrumentation registry
+    :return: Instrumentation
+    """
+
+    return _INSTRUMENTATION
+
+
+def enable(subsystem=ALL_SUBSYSTEMS, trace=None):
+    """
+    Enables instrumentation for the given subsystem
+    :param subsystem: str
+    :param trace: bool or None
+    """
+
+    _INSTRUMENTATION.enable(subsystem, trace=trace)
+
+
+def disable(subsystem=ALL_SUBSYSTEMS):
+    """
+    Disables instrumentation for the given subsystem
+    :param subsystem: str
+    """
+
+    _INSTRUMENTATION.disable(subsystem)
+
+
+def span(name, subsystem):
+    """
+    Returns a context that records the time spent inside it into the global instrumentation registry
+    :param name: str
+    :param subsystem: str
+    :return: context
+    """
+
+    return _INSTRUMENTATION.span(name, subsystem)
+
+
+def count(name, subsystem, value=1):
+    """
+    Increases a counter of the global instrumentation registry
+    :param name: str
+    :param subsystem: str
+    :param value: int
+    """
+
+    _INSTRUMENTATION.count(name, subsystem, value=value)
+
+
+def instrument(subsystem, name=None):
+    """
+    Function decorator that records the time spent in the decorated function into the global instrumentation registry
+    :param subsystem: str, subsystem the span belongs to
+    :param name: str or None, span name. If not given, function name is used
+    """
+
+    def decorator(fn):
+        span_name = name or _get_func_name(fn)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _INSTRUMENTATION.is_enabled(subsystem):
+                return fn(*args, **kwargs)
+            with _Span(_INSTRUMENTATION, span_name, subsystem):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def stats():
+    """
+    Returns aggregated data of the global instrumentation registry
+    :return: dict
+    """
+
+    return _INSTRUMENTATION.stats()
+
+
+def reset():
+    """
+    Removes all recorded data of the global instrumentation registry
+    """
+
+    _INSTRUMENTATION.reset()
+
+
+def export_json(file_path=None):
+    """
+    Exports global instrumentation registry aggregated data as JSON
+    :param file_path: str or None
+    :return: str
+    """
+
+    return _INSTRUMENTATION.export_json(file_path)
+
+
+def export_chrome_trace(file_path=None):
+    """
+    Exports global instrumentation registry recorded events using Chrome trace event format
+    :param file_path: str or None
+    :return: str
+    """
+
+    return _INSTRUMENTATION.export_chrome_trace(file_path)
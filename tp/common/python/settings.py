@@ -7,8 +7,16 @@ Module that contains different classes to handle settings
 
 from __future__ import print_function, division, absolute_import
 
+import os
+import copy
 import time
+import json
+import atexit
+import shutil
 import logging
+import tempfile
+import threading
+import contextlib
 from collections import OrderedDict
 
 from tp.core import log
@@ -17,7 +25,44 @@ from tp.common.python import helpers, fileio, path, jsonio
 logger = log.tpLogger
 
 
+def write_file_atomically(file_path, text):
+    """
+    Writes given text into a file atomically: text is written into a temporary file in the same folder that replaces
+    the original file once it is completely written, so readers never find a partially written file
+    :param file_path: str
+    :param text: str
+    """
+
+    directory = os.path.dirname(os.path.abspath(file_path))
+    handle, temp_path = tempfile.mkstemp(prefix='.{}.'.format(os.path.basename(file_path)), dir=directory)
+    try:
+        with os.fdopen(handle, 'w') as temp_file:
+            temp_file.write(text)
+        # temporary files are only accessible by the user, so the permissions of the original file are kept
+        if os.path.isfile(file_path):
+            shutil.copymode(file_path, temp_path)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_path, 0o666 & ~umask)
+        if hasattr(os, 'replace'):
+            os.replace(temp_path, file_path)
+        else:
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+            os.rename(temp_path, file_path)
+    except Exception:
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
+        raise
+
+
 class FileSettings(object):
+    """
+    Settings stored in a file. Parsed settings are cached and the file is only read again when its modification time
+    or size changes. Writes can be batched using transaction context or delayed using a write-behind delay.
+    """
+
     def __init__(self):
         self.directory = None
         self.file_path = None
@@ -25,6 +70,16 @@ class FileSettings(object):
         self.settings_dict = OrderedDict()
         self.write = None
 
+        self._lock = threading.RLock()
+        self._file_stamp = None
+        self._dirty = False
+        self._transaction_depth = 0
+        self._transaction_backup = None
+        self._write_delay = 0
+        self._write_timer = None
+        self._flush_at_exit = False
+        self._stats = {'reads': 0, 'writes': 0, 'cache_hits': 0}
+
     def data(self):
         """
         Return data dictonary contained in the settings
@@ -41,8 +96,7 @@ class FileSettings(object):
         :return: variant, None || str
         """
 
-        # Force settings reload
-        self.reload()
+        self._reload_if_changed()
 
         if name in self.settings_dict:
             return self.settings_dict[name]
@@ -58,8 +112,9 @@ class FileSettings(object):
         :param value: varinat, value of the setting
         """
 
-        self.settings_dict[name] = value
-        self._write()
+        with self._lock:
+            self.settings_dict[name] = value
+            self._request_write()
 
     def get_settings(self):
         """
@@ -119,18 +174,168 @@ class FileSettings(object):
         Forces the reading of the settings
         """
 
-        self._read()
+        with self._lock:
+            self._read()
+            self._update_file_stamp()
 
     def clear(self):
         """
         Cleans the stored settings
         """
 
-        self.settings_dict = OrderedDict()
-        self._write()
+        with self._lock:
+            self.settings_dict = OrderedDict()
+            self._request_write()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Context that batches all the settings changes done within it into a single file write. If an exception is
+        raised within the context, settings changes are discarded.
+
+        with settings.transaction():
+            settings.set('a', 1)
+            settings.set('b', 2)
+        """
+
+        with self._lock:
+            self._reload_if_changed()
+            if not self._transaction_depth:
+                # dirty flag is stored too, so changes pending to be written before the transaction are not lost
+                self._transaction_backup = (copy.deepcopy(self.settings_dict), self._dirty)
+            self._transaction_depth += 1
+        try:
+            yield self
+        except Exception:
+            with self._lock:
+                self._transaction_depth -= 1
+                if not self._transaction_depth:
+                    self.settings_dict, dirty = self._transaction_backup
+                    self._transaction_backup = None
+                    self._dirty = False
+                    if dirty:
+                        # writes deferred during the transaction are scheduled again
+                        self._request_write()
+            raise
+        with self._lock:
+            self._transaction_depth -= 1
+            if not self._transaction_depth:
+                self._transaction_backup = None
+                self._request_write()
+
+    def write_delay(self):
+        """
+        Returns the number of seconds settings writes are delayed
+        :return: float
+        """
+
+        return self._write_delay
+
+    def set_write_delay(self, seconds):
+        """
+        Sets the number of seconds settings writes are delayed. All the changes done during that time are written at
+        once. Pending changes are written when flush is called and on exit.
+        :param seconds: float, 0 writes settings each time they are changed
+        """
+
+        self._write_delay = max(0, seconds)
+        if self._write_delay and not self._flush_at_exit:
+            self._flush_at_exit = True
+            atexit.register(self.flush)
+        if not self._write_delay:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes pending settings changes into file. If a transaction is in progress, changes are written when the
+        transaction finishes.
+        """
+
+        with self._lock:
+            if self._write_timer is not None:
+                self._write_timer.cancel()
+                self._write_timer = None
+            if not self._dirty or self._transaction_depth:
+                return
+            self._dirty = False
+            self._write()
+            self._update_file_stamp()
+
+    def is_dirty(self):
+        """
+        Returns whether there are settings changes not written into file yet
+        :return: bool
+        """
+
+        return self._dirty
+
+    def stats(self):
+        """
+        Returns the number of times settings file was read and written and the number of times cached settings were
+        used instead of reading the file
+        :return: dict
+        """
+
+        return dict(self._stats)
     # endregion
 
     # region Private Functions
+    def _stat_file(self):
+        """
+        Internal function that returns the modification time and size of the settings file
+        :return: tuple(float, int) or None
+        """
+
+        if not self.file_path:
+            return None
+        try:
+            file_stat = os.stat(self.file_path)
+        except OSError:
+            return None
+
+        return file_stat.st_mtime, file_stat.st_size
+
+    def _update_file_stamp(self):
+        """
+        Internal function that stores the modification time and size of the settings file
+        """
+
+        self._file_stamp = self._stat_file()
+
+    def _reload_if_changed(self):
+        """
+        Internal function that reads the settings file only if it changed since the last time it was read or written.
+        Settings are not read while there are pending changes.
+        """
+
+        with self._lock:
+            if self._dirty or self._transaction_depth:
+                self._stats['cache_hits'] += 1
+                return
+            file_stamp = self._stat_file()
+            if file_stamp is not None and file_stamp == self._file_stamp:
+                self._stats['cache_hits'] += 1
+                return
+            self._read()
+            self._file_stamp = file_stamp
+
+    def _request_write(self):
+        """
+        Internal function that writes settings, or schedules their writing if writes are delayed or a transaction is
+        in progress
+        """
+
+        self._dirty = True
+        if self._transaction_depth:
+            return
+        if not self._write_delay:
+            self.flush()
+            return
+        if self._write_timer is None:
+            self._write_timer = threading.Timer(self._write_delay, self.flush)
+            self._write_timer.daemon = True
+            self._write_timer.start()
+
     def _read(self):
         """
         Internal function used to read settings from file
@@ -138,6 +343,7 @@ class FileSettings(object):
         if not self.file_path:
             return
 
+        self._stats['reads'] += 1
         lines = fileio.get_file_lines(self.file_path)
         if not lines:
             return
@@ -175,13 +381,17 @@ class FileSettings(object):
             line = '{0} = {1}'.format(key, str(value))
             lines.append(line)
 
-        write = fileio.FileWriter(file_path=self.file_path)
+        if not self.file_path:
+            return
+
+        self._stats['writes'] += 1
+        text = ''.join('{}\n'.format(line) for line in lines)
         try:
-            write.write(lines)
+            write_file_atomically(self.file_path, text)
         except Exception:
             logger.debug('Impossible to write in {}'.format(self.file_path))
             time.sleep(.1)
-            write.write(lines)
+            write_file_atomically(self.file_path, text)
 
 
 class JSONSettings(FileSettings, object):
@@ -216,8 +426,11 @@ class JSONSettings(FileSettings, object):
         if not file_path:
             return
 
-        writer = fileio.FileWriter(file_path)
-        writer.write_json(list(self.settings_dict.items()))
+        self._stats['writes'] += 1
+        try:
+            write_file_atomically(file_path, json.dumps(self.settings_dict, indent=4, sort_keys=False))
+        except Exception as exc:
+            logger.exception('Impossible to save JSON file: "{}"'.format(exc))
 
     def _read(self):
         """
@@ -233,8 +446,9 @@ class JSONSettings(FileSettings, object):
             return
         self.file_path = file_path
 
+        self._stats['reads'] += 1
         try:
-            data = OrderedDict(jsonio.read_file(file_path))
+            data = OrderedDict(jsonio.read_file(file_path, as_ordered_dict=True))
         except Exception:
             self.settings_dict = OrderedDict()
             return
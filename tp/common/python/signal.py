@@ -22,3 +22,7 @@ class Signal(object):
     def emit(self, *args, **kwargs):
         for item in self._callables:
             item(*args, **kwargs)
+
+    def disconnect(self, item):
+        if item in self._callables:
+            self._callables.remove(item)
@@ -6,11 +6,17 @@ Module that contains classes to handle version files
 """
 
 import os
+import json
+import zlib
+import shutil
 import getpass
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 
 from tp.core import log
-from tp.common.python import folder, path, fileio, jsonio, sort, name as name_utils
+from tp.common.python import folder, path, fileio, jsonio, name as name_utils
 
 logger = log.tpLogger
 
@@ -108,18 +114,338 @@ class SemanticVersion(object):
         return self._patch
 
 
+class VersionIndex(object):
+    """
+    Class that indexes all the versions stored within a version folder. Comments file is parsed only once and its
+    parsed contents are cached until the file modification time or size changes, so querying the data of all versions
+    only needs one folder scan and, at most, one JSON parse.
+    """
+
+    COMMENT_FILE_NAME = 'comments.json'
+
+    _CACHE = dict()
+    _CACHE_LOCK = threading.Lock()
+
+    def __init__(self, version_folder, comment_file_name=None):
+        self._version_folder = version_folder
+        self._comment_file_name = comment_file_name or self.COMMENT_FILE_NAME
+        self._versions = None
+
+    @property
+    def version_folder(self):
+        return self._version_folder
+
+    @property
+    def comment_path(self):
+        return path.join_path(self._version_folder, self._comment_file_name)
+
+    @classmethod
+    def clear_cache(cls):
+        """
+        Clears cached comments data of all indices
+        """
+
+        with cls._CACHE_LOCK:
+            cls._CACHE.clear()
+
+    def reload(self):
+        """
+        Forces the scan of the version folder the next time versions data is queried
+        """
+
+        self._versions = None
+
+    def comments(self):
+        """
+        Returns the comment and the user of all the versions stored in the comments file
+        :return: dict(str, tuple(str, str))
+        """
+
+        comment_path = self.comment_path
+        try:
+            comment_stat = os.stat(comment_path)
+        except OSError:
+            return dict()
+        signature = (comment_stat.st_mtime, comment_stat.st_size)
+
+        with self._CACHE_LOCK:
+            cached = self._CACHE.get(comment_path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        comments = dict()
+        version_data = jsonio.read_file(comment_path) if comment_stat.st_size else None
+        for version_dict in version_data or list():
+            comments[str(version_dict.get('version', None))] = (
+                version_dict.get('comment', ''), version_dict.get('user', ''))
+
+        with self._CACHE_LOCK:
+            self._CACHE[comment_path] = (signature, comments)
+
+        return comments
+
+    def versions(self):
+        """
+        Returns data of all versions sorted by version number:
+            {'version', 'name', 'path', 'comment', 'user', 'size', 'modified', 'is_folder'}
+        :return: list(dict)
+        """
+
+        if self._versions is not None:
+            return self._versions
+
+        comments = self.comments()
+        versions = list()
+        try:
+            entries = folder.scandir(self._version_folder)
+        except OSError:
+            entries = list()
+        for entry in entries:
+            split_name = entry.name.split('.')
+            if len(split_name) != 2 or split_name[0] != '' or not split_name[1].isdigit():
+                continue
+            try:
+                entry_stat = entry.stat()
+                is_folder = entry.is_dir()
+            except OSError:
+                continue
+            comment, user = comments.get(split_name[1], (None, None))
+            versions.append({
+                'version': int(split_name[1]),
+                'name': entry.name,
+                'path': path.clean_path(entry.path),
+                'comment': comment,
+                'user': user,
+                'size': None if is_folder else entry_stat.st_size,
+                'modified': entry_stat.st_mtime,
+                'is_folder': is_folder
+            })
+        versions.sort(key=lambda version_data: version_data['version'])
+        self._versions = versions
+
+        return versions
+
+    def version_numbers(self):
+        """
+        Returns all version numbers sorted
+        :return: list(int)
+        """
+
+        return [version_data['version'] for version_data in self.versions()]
+
+    def get(self, version_number):
+        """
+        Returns the data of the given version
+        :param version_number: int
+        :return: dict or None
+        """
+
+        version_number = int(version_number)
+        for version_data in self.versions():
+            if version_data['version'] == version_number:
+                return version_data
+
+        return None
+
+    def latest(self):
+        """
+        Returns the data of the latest version
+        :return: dict or None
+        """
+
+        versions = self.versions()
+
+        return versions[-1] if versions else None
+
+
+class BlobStore(object):
+    """
+    Content addressed storage. Each blob is stored only once, named after the SHA1 hash of its contents.
+    """
+
+    CHUNK_SIZE = 4 * 1024 * 1024
+    COMPRESSED_EXTENSION = '.z'
+
+    def __init__(self, root_path, compress=False):
+        self._root_path = root_path
+        self._compress = compress
+
+    @property
+    def root_path(self):
+        return self._root_path
+
+    def blob_path(self, blob_hash, compressed=False):
+        """
+        Returns the path where the blob with the given hash is stored
+        :param blob_hash: str
+        :param compressed: bool
+        :return: str
+        """
+
+        blob_path = os.path.join(self._root_path, blob_hash[:2], blob_hash)
+        return blob_path + self.COMPRESSED_EXTENSION if compressed else blob_path
+
+    def has(self, blob_hash):
+        """
+        Returns whether a blob with the given hash is stored
+        :param blob_hash: str
+        :return: bool
+        """
+
+        return os.path.isfile(self.blob_path(blob_hash)) or os.path.isfile(self.blob_path(blob_hash, compressed=True))
+
+    def put(self, data):
+        """
+        Stores given data if it is not already stored
+        :param data: bytes
+        :return: str, hash of the data
+        """
+
+        blob_hash = hashlib.sha1(data).hexdigest()
+        if self.has(blob_hash):
+            return blob_hash
+
+        blob_path = self.blob_path(blob_hash, compressed=self._compress)
+        blob_folder = os.path.dirname(blob_path)
+        if not os.path.isdir(blob_folder):
+            os.makedirs(blob_folder)
+
+        # Write into a temporary file first, so interrupted saves never leave corrupted blobs
+        temp_path = '{}.{}.tmp'.format(blob_path, os.getpid())
+        with open(temp_path, 'wb') as blob_file:
+            blob_file.write(zlib.compress(data) if self._compress else data)
+        try:
+            # blobs are content addressed, so replacing a blob stored by other process keeps the same data
+            os.replace(temp_path, blob_path)
+        except OSError:
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+            if not os.path.isfile(blob_path):
+                raise
+
+        return blob_hash
+
+    def get(self, blob_hash):
+        """
+        Returns the data of the blob with the given hash
+        :param blob_hash: str
+        :return: bytes
+        """
+
+        blob_path = self.blob_path(blob_hash)
+        if os.path.isfile(blob_path):
+            with open(blob_path, 'rb') as blob_file:
+                return blob_file.read()
+
+        with open(self.blob_path(blob_hash, compressed=True), 'rb') as blob_file:
+            return zlib.decompress(blob_file.read())
+
+    def put_file(self, file_path):
+        """
+        Stores given file splitting it in chunks
+        :param file_path: str
+        :return: list(str), hashes of the file chunks
+        """
+
+        chunks = list()
+        with open(file_path, 'rb') as source_file:
+            while True:
+                data = source_file.read(self.CHUNK_SIZE)
+                if not data:
+                    break
+                chunks.append(self.put(data))
+
+        return chunks
+
+    def get_file(self, chunks, file_path):
+        """
+        Reassembles a file from the given chunk hashes
+        :param chunks: list(str)
+        :param file_path: str
+        """
+
+        file_folder = os.path.dirname(file_path)
+        if file_folder and not os.path.isdir(file_folder):
+            os.makedirs(file_folder)
+        with open(file_path, 'wb') as target_file:
+            for blob_hash in chunks:
+                target_file.write(self.get(blob_hash))
+
+    def hashes(self):
+        """
+        Returns hashes of all stored blobs
+        :return: set(str)
+        """
+
+        blob_hashes = set()
+        if not os.path.isdir(self._root_path):
+            return blob_hashes
+
+        for root, _, files in os.walk(self._root_path):
+            for file_name in files:
+                if file_name.endswith('.tmp'):
+                    continue
+                if file_name.endswith(self.COMPRESSED_EXTENSION):
+                    file_name = file_name[:-len(self.COMPRESSED_EXTENSION)]
+                blob_hashes.add(file_name)
+
+        return blob_hashes
+
+    def remove(self, blob_hash):
+        """
+        Removes the blob with the given hash
+        :param blob_hash: str
+        """
+
+        for compressed in (False, True):
+            blob_path = self.blob_path(blob_hash, compressed=compressed)
+            if os.path.isfile(blob_path):
+                os.remove(blob_path)
+
+
+def is_version_manifest(file_path):
+    """
+    Returns whether given version file is a content addressed version manifest
+    :param file_path: str
+    :return: bool
+    """
+
+    if not os.path.isfile(file_path):
+        return False
+
+    with open(file_path, 'rb') as manifest_file:
+        return manifest_file.read(len(VersionFile.MANIFEST_HEADER)) == VersionFile.MANIFEST_HEADER
+
+
 class VersionFile(object):
     """
     Utility class to hold version for files and folders
     """
 
-    def __init__(self, file_path):
+    class StorageMode(object):
+        """
+        Class that contains variables used to define how new versions are stored
+        """
+
+        # Each version is a full copy of the versioned file or folder
+        COPY = 0
+
+        # Each version is a manifest of the hashes of the versioned file chunks. Chunks are stored only once
+        # in a blob folder shared by all the versions.
+        CONTENT_ADDRESSED = 1
+
+    BLOBS_FOLDER_NAME = '.blobs'
+    MANIFEST_HEADER = b'{"__manifest__": 1'
+
+    def __init__(self, file_path, storage_mode=StorageMode.COPY, compress=False):
         self._file_path = file_path
         self._path = path.dirname(file_path)
         self._version_folder_name = '__version__'
         self._version_folder = None
         self._comment_file = None
         self._updated_old = False
+        self._storage_mode = storage_mode
+        self._compress = compress
 
     @property
     def file_path(self):
@@ -172,6 +498,17 @@ class VersionFile(object):
 
         self._version_folder_name = folder_name
 
+    def set_storage_mode(self, storage_mode, compress=None):
+        """
+        Sets how new versions are stored
+        :param storage_mode: VersionFile.StorageMode
+        :param compress: bool or None, whether content addressed blobs should be compressed
+        """
+
+        self._storage_mode = storage_mode
+        if compress is not None:
+            self._compress = compress
+
     def has_default(self):
         file_name = self._default_version_file_name()
         if path.is_file(file_name):
@@ -269,8 +606,11 @@ class VersionFile(object):
         :return: str
         """
 
-        versions = self.get_versions()
-        latest_version = versions[list(versions.keys())[-1]]
+        latest_version = self.get_version_index().latest()
+        if not latest_version:
+            return None
+
+        latest_version = latest_version['name']
 
         return path.join_path(self._file_path, '{}/{}'.format(self._version_folder_name, latest_version))
 
@@ -281,37 +621,17 @@ class VersionFile(object):
         :return: variant, list<str> | list<str>, list<int>
         """
 
-        version_folder = self._get_version_folder()
-        version_files = folder.get_files_and_folders(version_folder)
-        if not version_files:
-            logger.warning('Impossible to get versions because no version exist!')
+        versions = self.get_version_index().versions()
+        if not versions:
+            logger.warning('No valid version files found in folder: {}'.format(self._get_version_folder()))
             return None
 
-        number_list = list()
-        pass_files = list()
-        for f in version_files:
-            split_name = f.split('.')
-            if not len(split_name) == 2 or split_name[0] != '':
-                continue
-
-            version_number = int(split_name[1])
-            number_list.append(version_number)
-            pass_files.append(f)
-
-        if not pass_files:
-            logger.warning('No valid version files found in folder: {}'.format(version_folder))
-            return
-
-        quick_sort = sort.QuickNumbersListSort(number_list)
-        quick_sort.set_follower_list(pass_files)
-        pass_files = quick_sort.run()
-
         pass_dict = dict()
-        for i in range(len(number_list)):
-            pass_dict[pass_files[0][i]] = pass_files[1][i]
+        for version_data in versions:
+            pass_dict[version_data['version']] = version_data['name']
 
         if return_version_numbers:
-            return pass_dict, pass_files[0]
+            return pass_dict, [version_data['version'] for version_data in versions]
         else:
             return pass_dict
 
@@ -321,25 +641,11 @@ class VersionFile(object):
         :return: list<int>
         """
 
-        version_folder = self._get_version_folder()
-        version_files = folder.get_files_and_folders(version_folder)
-        if not version_files:
+        number_list = self.get_version_index().version_numbers()
+        if not number_list:
             logger.warning('Impossible to get version numbers because no version exist!')
             return None
 
-        number_list = list()
-        for f in version_files:
-            if not f.startswith(self._version_name):
-                continue
-            split_name = f.split('.')
-            if split_name[1] == 'json' or split_name[1] == 'default' or not len(split_name) == 2:
-                continue
-
-            version_number = int(split_name[1])
-            number_list.append(version_number)
-
-        number_list.sort()
-
         return number_list
 
     def get_version_data(self, version_number):
@@ -353,23 +659,23 @@ class VersionFile(object):
         if not comment_path:
             return None, None
 
-        if not path.is_file(comment_path):
-            return None, None
-
-        version_data = jsonio.read_file(comment_path)
-        if not version_data:
-            return None, None
+        return self.get_version_index().comments().get(str(version_number), (None, None))
 
-        for version_dict in version_data:
+    def get_all_version_data(self):
+        """
+        Returns the data of all versions loading the comments file only once
+        :return: list(dict)
+        """
 
-            version = version_dict.get('version', None)
-            comment = version_dict.get('comment', '')
-            user = version_dict.get('user', '')
+        return self.get_version_index().versions()
 
-            if version == str(version_number):
-                return comment, user
+    def get_version_index(self):
+        """
+        Returns a new index of the versions stored in the version folder
+        :return: VersionIndex
+        """
 
-        return None, None
+        return VersionIndex(self._get_version_folder())
 
     def get_organized_version_data(self):
         """
@@ -378,59 +684,9 @@ class VersionFile(object):
         :return: list
         """
 
-        raise NotImplementedError
-
-        # versions = self.get_versions(return_version_numbers=True)
-        # if not versions:
-        #     return
-        #
-        # version_paths = versions[0]
-        # version_numbers = versions[1]
-        #
-        # comment_path = self._get_comment_path()
-        # if not comment_path:
-        #     return []
-        #
-        # datas = list()
-        # if path.is_file(comment_path):
-        #     read = fileio.FileReader(comment_path)
-        #     lines = read.read()
-        #     for line in lines:
-        #         line_info_dict = dict()
-        #         user = None
-        #         comment = None
-        #         split_line = line.split(';')
-        #         for sub_line in split_line:
-        #             assign = sub_line.split('=')
-        #             if assign and assign[0]:
-        #                 data_name = assign[0].strip()
-        #                 data_value = assign[1].strip()
-        #                 line_info_dict[data_name] = data_value
-        #
-        #         if 'version' not in line_info_dict:
-        #             continue
-        #
-        #         version = int(line_info_dict['version'])
-        #         if not int(line_info_dict['version']) in version_numbers:
-        #             continue
-        #
-        #         if 'comment' in line_info_dict:
-        #             comment = line_info_dict['comment']
-        #             comment = comment[1:-1]
-        #         if 'user' in line_info_dict:
-        #             user = line_info_dict['user']
-        #             user = user[1:-1]
-        #
-        #         version_file = version_paths[version]
-        #         version_file = path.join_path(self._file_path, '{}/{}'.format(
-        #         self._version_folder_name, version_file))
-        #
-        #         file_size = fileio.get_file_size(version_file)
-        #         modified = fileio.get_last_modified_date(version_file)
-        #
-        #         datas.append([version, comment, user, file_size, modified, version_file])
-        #
-        # return datas
+        return [[
+            version_data['version'], version_data['comment'], version_data['user'], version_data['size'],
+            version_data['modified'], version_data['path']] for version_data in self.get_all_version_data()]
 
     def _prepare_directories(self):
         """
@@ -488,11 +744,115 @@ class VersionFile(object):
 
     def _save(self, file_name):
         self._prepare_directories()
-        if path.is_dir(self._file_path):
+        if self._storage_mode == self.StorageMode.CONTENT_ADDRESSED:
+            self._save_manifest(file_name)
+        elif path.is_dir(self._file_path):
             folder.copy_folder(self._file_path, file_name)
         elif path.is_file(self._file_path):
             fileio.copy_file(self._file_path, file_name)
 
+    def _get_blob_store(self):
+        return BlobStore(
+            path.join_path(self._get_version_folder(), self.BLOBS_FOLDER_NAME), compress=self._compress)
+
+    def _save_manifest(self, file_name):
+        """
+        Internal function that stores current file or folder contents as blobs and writes the version manifest
+        :param file_name: str, version manifest file path
+        """
+
+        blob_store = self._get_blob_store()
+        files = list()
+        folders = list()
+        if path.is_dir(self._file_path):
+            source_type = 'folder'
+            for root, dir_names, file_names in os.walk(self._file_path):
+                dir_names[:] = [dir_name for dir_name in dir_names if dir_name != self._version_folder_name]
+                relative_root = os.path.relpath(root, self._file_path)
+                for dir_name in dir_names:
+                    folders.append(path.clean_path(os.path.normpath(os.path.join(relative_root, dir_name))))
+                for name in file_names:
+                    file_path = os.path.join(root, name)
+                    files.append({
+                        'path': path.clean_path(os.path.normpath(os.path.join(relative_root, name))),
+                        'size': os.path.getsize(file_path), 'chunks': blob_store.put_file(file_path)})
+        elif path.is_file(self._file_path):
+            source_type = 'file'
+            files.append({
+                'path': path.get_basename(self._file_path), 'size': os.path.getsize(self._file_path),
+                'chunks': blob_store.put_file(self._file_path)})
+        else:
+            return
+
+        manifest = OrderedDict()
+        manifest['__manifest__'] = 1
+        manifest['type'] = source_type
+        manifest['folders'] = folders
+        manifest['files'] = files
+        with open(file_name, 'wb') as manifest_file:
+            manifest_file.write(json.dumps(manifest).encode('utf-8'))
+
+    def _read_manifest(self, version_path):
+        with open(version_path, 'rb') as manifest_file:
+            return json.loads(manifest_file.read().decode('utf-8'))
+
+    def restore_version(self, version_number, target_path):
+        """
+        Restores given version into the given path. Works both with copied and content addressed versions.
+        :param version_number: int
+        :param target_path: str, file or folder path where the version will be restored
+        :return: str or None, restored path
+        """
+
+        version_data = self.get_version_index().get(version_number)
+        if not version_data:
+            logger.warning('Version {} does not exist!'.format(version_number))
+            return None
+
+        version_path = version_data['path']
+        if not is_version_manifest(version_path):
+            if version_data['is_folder']:
+                folder.copy_folder(version_path, target_path)
+            else:
+                shutil.copy2(version_path, target_path)
+            return target_path
+
+        manifest = self._read_manifest(version_path)
+        blob_store = self._get_blob_store()
+        if manifest.get('type') == 'file':
+            for file_data in manifest.get('files', list()):
+                blob_store.get_file(file_data['chunks'], target_path)
+            return target_path
+
+        for folder_path in manifest.get('folders', list()):
+            folder_path = os.path.join(target_path, folder_path)
+            if not os.path.isdir(folder_path):
+                os.makedirs(folder_path)
+        for file_data in manifest.get('files', list()):
+            blob_store.get_file(file_data['chunks'], os.path.join(target_path, file_data['path']))
+
+        return target_path
+
+    def clean_blobs(self):
+        """
+        Removes blobs that are not referenced by any version manifest
+        :return: int, number of removed blobs
+        """
+
+        blob_store = self._get_blob_store()
+        referenced = set()
+        for version_data in self.get_version_index().versions():
+            if not is_version_manifest(version_data['path']):
+                continue
+            for file_data in self._read_manifest(version_data['path']).get('files', list()):
+                referenced.update(file_data['chunks'])
+
+        unreferenced = blob_store.hashes() - referenced
+        for blob_hash in unreferenced:
+            blob_store.remove(blob_hash)
+
+        return len(unreferenced)
+
     def delete_version(self, version_number):
         """
         Deletes specific version file
@@ -503,7 +863,7 @@ class VersionFile(object):
         if path.is_file(version_path):
             fileio.delete_file(version_path)
         else:
-            folder.delete_folder(path)
+            folder.delete_folder(version_path)
 
 
 def delete_versions(folder, keep=1):
@@ -557,3 +917,13 @@ def get_comments(comment_directory, comment_filename=None):
         comments[file_name] = [comment, user]
 
     return comments
+
+
+def get_versions_data(version_folders):
+    """
+    Returns the data of all the versions stored in the given version folders
+    :param version_folders: list(str)
+    :return: dict(str, list(dict))
+    """
+
+    return {version_folder: VersionIndex(version_folder).versions() for version_folder in version_folders}
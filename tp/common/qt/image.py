@@ -11,18 +11,21 @@ import os
 import re
 import base64
 import logging
+import threading
 import traceback
+from collections import OrderedDict
 
 try:
     import urllib2 as urllib
 except ImportError:
     import urllib
 
-from Qt.QtCore import Qt, Signal, QByteArray, QRunnable, QObject, QTimer
-from Qt.QtGui import QImage, QPixmap, QBitmap, QIcon, QColor, QPainter
+from Qt.QtCore import Qt, Signal, QByteArray, QRunnable, QObject, QTimer, QSize
+from Qt.QtGui import QImage, QImageReader, QPixmap, QBitmap, QIcon, QColor, QPainter
 
 from tp.core import log
 from tp.common.python import helpers, path as path_utils
+from tp.common.qt import worker
 
 LOGGER = log.tpLogger
 
@@ -100,6 +103,25 @@ def create_empty_image(output=None, resolution_x=1920, resolution_y=1080, backgr
     return QImage(pixmap)
 
 
+def get_image_size(image_path):
+    """
+    Returns the size of the image stored in given file path. Only the image header is read, image is not decoded.
+    :param image_path: str
+    :return: QSize
+    """
+
+    if not image_path or not os.path.isfile(image_path):
+        return QSize()
+
+    size = QImageReader(image_path).size()
+    if not size.isValid():
+        # some image formats do not store their size in the header, so the image must be decoded
+        image = QImage(image_path)
+        size = QSize() if image.isNull() else image.size()
+
+    return size
+
+
 def get_image_width(image_path):
     """
     Returns the width of the image stored in given file path
@@ -107,14 +129,9 @@ def get_image_width(image_path):
     :return: float
     """
 
-    if not image_path or not os.path.isfile(image_path):
-        return 0
-
-    image = QImage(image_path)
-    if not image or image.isNull():
-        return 0
+    size = get_image_size(image_path)
 
-    return image.width()
+    return size.width() if size.isValid() else 0
 
 
 def get_image_height(image_path):
@@ -124,14 +141,45 @@ def get_image_height(image_path):
     :return: float
     """
 
+    size = get_image_size(image_path)
+
+    return size.height() if size.isValid() else 0
+
+
+def read_image(image_path, size=None):
+    """
+    Reads the image stored in given file path. If a size is given, image is decoded directly to that size keeping its
+    aspect ratio, which is much faster and uses less memory than decoding the full resolution image and scaling it.
+    :param image_path: str
+    :param size: QSize or int or None, maximum size of the returned image
+    :return: QImage
+    """
+
     if not image_path or not os.path.isfile(image_path):
-        return 0
+        return QImage()
+
+    reader = QImageReader(image_path)
+    if size is not None:
+        if not isinstance(size, QSize):
+            size = QSize(int(size), int(size))
+        image_size = reader.size()
+        if image_size.isValid() and (image_size.width() > size.width() or image_size.height() > size.height()):
+            reader.setScaledSize(image_size.scaled(size, Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        LOGGER.debug('Impossible to read image "{}": {}'.format(image_path, reader.errorString()))
+
+    return image
 
-    image = QImage(image_path)
-    if not image or image.isNull():
-        return 0
 
-    return image.height()
+def image_byte_size(image):
+    """
+    Returns the number of bytes used by the given image
+    :param image: QImage
+    :return: int
+    """
+
+    return image.bytesPerLine() * image.height()
 
 
 def paint_background(image, background_color=None):
@@ -228,6 +276,7 @@ class ImageWorker(QRunnable, object):
         super(ImageWorker, self).__init__(*args)
 
         self._path = None
+        self._size = None
         self.signals = ImageWorker.ImageWorkerSignals()
 
     def set_path(self, path):
@@ -238,6 +287,14 @@ class ImageWorker(QRunnable, object):
 
         self._path = path
 
+    def set_size(self, size):
+        """
+        Sets the maximum size of the image to load. Image is decoded directly to that size.
+        :param size: QSize or int or None
+        """
+
+        self._size = size
+
     def run(self):
         """
         Overrides base QRunnable run function
@@ -246,15 +303,349 @@ class ImageWorker(QRunnable, object):
 
         try:
             if self._path:
-                image = QImage(str(self._path))
+                image = read_image(str(self._path), size=self._size)
                 self.signals.triggered.emit(image)
         except Exception as e:
             LOGGER.error('Cannot load thumbnail image!')
 
 
+class ThumbnailCache(object):
+    """
+    Thread safe least recently used cache of decoded images bounded by the number of bytes used by the images
+    """
+
+    def __init__(self, max_bytes=128 * 1024 * 1024):
+        super(ThumbnailCache, self).__init__()
+
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._images = OrderedDict()
+
+    def __len__(self):
+        return len(self._images)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._images
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    def set_max_bytes(self, max_bytes):
+        """
+        Sets the maximum number of bytes used by cached images
+        :param max_bytes: int
+        """
+
+        with self._lock:
+            self._max_bytes = max_bytes
+            self._evict()
+
+    def get(self, key):
+        """
+        Returns cached image with the given key
+        :param key: tuple
+        :return: QImage or None
+        """
+
+        with self._lock:
+            image = self._images.pop(key, None)
+            if image is not None:
+                self._images[key] = image
+
+        return image
+
+    def add(self, key, image):
+        """
+        Adds given image into the cache. Images bigger than the cache are not stored.
+        :param key: tuple
+        :param image: QImage
+        """
+
+        if image is None or image.isNull():
+            return
+
+        image_bytes = image_byte_size(image)
+        if image_bytes > self._max_bytes:
+            return
+
+        with self._lock:
+            old_image = self._images.pop(key, None)
+            if old_image is not None:
+                self._bytes -= image_byte_size(old_image)
+            self._images[key] = image
+            self._bytes += image_bytes
+            self._evict()
+
+    def remove(self, key):
+        """
+        Removes cached image with the given key
+        :param key: tuple
+        """
+
+        with self._lock:
+            image = self._images.pop(key, None)
+            if image is not None:
+                self._bytes -= image_byte_size(image)
+
+    def clear(self):
+        """
+        Removes all cached images
+        """
+
+        with self._lock:
+            self._images.clear()
+            self._bytes = 0
+
+    def _evict(self):
+        """
+        Internal function that removes least recently used images until cache fits its maximum size.
+        Lock must be acquired before calling it.
+        """
+
+        while self._images and self._bytes > self._max_bytes:
+            _, image = self._images.popitem(last=False)
+            self._bytes -= image_byte_size(image)
+
+
+class ThumbnailLoader(QObject, object):
+    """
+    Service that decodes thumbnails in background threads. Images are decoded directly to the requested size and
+    decoded thumbnails are stored in a byte bounded cache. Visible thumbnails are decoded before the ones near the
+    viewport, and requests of thumbnails that are not visible anymore are cancelled. Requests are tracked per client
+    (for example, a view), so a client only cancels its own requests.
+    """
+
+    VISIBLE_PRIORITY = worker.WorkerPool.HIGH_PRIORITY
+    PREFETCH_PRIORITY = worker.WorkerPool.LOW_PRIORITY
+
+    thumbnailLoaded = Signal(str, object)
+
+    def __init__(self, max_threads=4, max_bytes=128 * 1024 * 1024, parent=None):
+        super(ThumbnailLoader, self).__init__(parent)
+
+        self._cache = ThumbnailCache(max_bytes=max_bytes)
+        self._requests = dict()
+        self._pool = worker.WorkerPool(max_threads=max_threads, parent=self)
+        self._pool.workCompleted.connect(self._on_work_completed)
+        self._pool.workFailure.connect(self._on_work_finished)
+        self._pool.workCancelled.connect(self._on_work_finished)
+
+    # =================================================================================================================
+    # PROPERTIES
+    # =================================================================================================================
+
+    @property
+    def cache(self):
+        return self._cache
+
+    # =================================================================================================================
+    # BASE
+    # =================================================================================================================
+
+    @staticmethod
+    def key(image_path, size=None):
+        """
+        Returns the key that identifies the thumbnail of the given image with the given size
+        :param image_path: str
+        :param size: QSize or int or None
+        :return: tuple
+        """
+
+        if isinstance(size, QSize):
+            size = (size.width(), size.height())
+        elif size is not None:
+            size = (int(size), int(size))
+
+        return os.path.normpath(image_path), size
+
+    def thumbnail(self, image_path, size=None):
+        """
+        Returns already decoded thumbnail of the given image
+        :param image_path: str
+        :param size: QSize or int or None
+        :return: QImage or None
+        """
+
+        return self._cache.get(self.key(image_path, size))
+
+    def request(self, image_path, size=None, priority=VISIBLE_PRIORITY, client=None):
+        """
+        Requests the decoding of the thumbnail of the given image. thumbnailLoaded signal is emitted once the
+        thumbnail is decoded. If the thumbnail is already decoded, it is returned and no signal is emitted.
+        :param image_path: str
+        :param size: QSize or int or None
+        :param priority: int
+        :param client: object or None, hashable object that identifies who requests the thumbnail
+        :return: QImage or None
+        """
+
+        key = self.key(image_path, size)
+        image = self._cache.get(key)
+        if image is not None:
+            return image
+
+        # requests of the same thumbnail are coalesced, so a task can be shared by multiple clients
+        task_id = self._pool.queue_work(self._load, (image_path, key), priority=priority, key=key)
+        self._requests.setdefault(task_id, (image_path, set()))[1].add(client)
+
+        return None
+
+    def prefetch(self, image_paths, size=None, client=None):
+        """
+        Requests the decoding of the thumbnails of the given images with low priority
+        :param image_paths: list(str)
+        :param size: QSize or int or None
+        :param client: object or None, hashable object that identifies who requests the thumbnails
+        """
+
+        for image_path in image_paths:
+            self.request(image_path, size=size, priority=self.PREFETCH_PRIORITY, client=client)
+
+    def cancel(self, client=None, keep=None):
+        """
+        Cancels the pending requests of the given client. Requests shared with other clients are not cancelled.
+        :param client: object or None, hashable object that identifies who requested the thumbnails
+        :param keep: set(str) or None, image paths which requests should not be cancelled
+        """
+
+        for task_id, (image_path, clients) in list(self._requests.items()):
+            if client not in clients or (keep and image_path in keep):
+                continue
+            clients.discard(client)
+            if not clients:
+                self._pool.cancel(task_id)
+
+    def update_viewport(self, image_paths, first, last, size=None, margin=10, client=None):
+        """
+        Requests the thumbnails of the visible items and prefetches the thumbnails of the items near the viewport.
+        Pending requests of the rest of items done by the same client are cancelled.
+        :param image_paths: list(str), image paths of all the items of the view, in view order
+        :param first: int, index of the first visible item
+        :param last: int, index of the last visible item
+        :param size: QSize or int or None
+        :param margin: int, number of items before and after the visible ones to prefetch
+        :param client: object or None, hashable object that identifies the view
+        :return: dict(str, QImage), already decoded thumbnails of the visible items
+        """
+
+        first = max(0, first)
+        last = min(len(image_paths) - 1, last)
+        visible_paths = image_paths[first:last + 1]
+        near_paths = image_paths[last + 1:last + 1 + margin] + image_paths[max(0, first - margin):first]
+        self.cancel(client=client, keep=set(visible_paths + near_paths))
+
+        thumbnails = dict()
+        for image_path in visible_paths:
+            image = self.request(image_path, size=size, priority=self.VISIBLE_PRIORITY, client=client)
+            if image is not None:
+                thumbnails[image_path] = image
+        self.prefetch(near_paths, size=size, client=client)
+
+        return thumbnails
+
+    def cancel_all(self):
+        """
+        Cancels all pending thumbnail requests
+        """
+
+        self._pool.clear()
+
+    def clear(self):
+        """
+        Cancels all pending thumbnail requests and removes all decoded thumbnails
+        """
+
+        self.cancel_all()
+        self._cache.clear()
+
+    def stop(self, wait_for_completion=True):
+        """
+        Stops thumbnail loader threads, run this before shutdown
+        :param wait_for_completion: bool
+        """
+
+        self._pool.stop(wait_for_completion=wait_for_completion)
+
+    def metrics(self):
+        """
+        Returns thumbnail loader metrics
+        :return: dict
+        """
+
+        metrics = self._pool.metrics()
+        metrics['cached'] = len(self._cache)
+        metrics['cached_bytes'] = self._cache.bytes
+
+        return metrics
+
+    # =================================================================================================================
+    # INTERNAL
+    # =================================================================================================================
+
+    def _load(self, params):
+        """
+        Internal function that decodes a thumbnail. It is executed in a worker thread.
+        :param params: tuple(str, tuple)
+        :return: QImage
+        """
+
+        image_path, key = params
+        size = QSize(*key[1]) if key[1] else None
+        image = read_image(image_path, size=size)
+        self._cache.add(key, image)
+
+        return image
+
+    def _on_work_completed(self, task_id, image):
+        """
+        Internal callback function that is called when a thumbnail is decoded
+        :param task_id: str
+        :param image: QImage
+        """
+
+        request = self._requests.pop(task_id, None)
+        if request is None:
+            return
+        if image is not None and not image.isNull():
+            self.thumbnailLoaded.emit(request[0], image)
+
+    def _on_work_finished(self, task_id, *args):
+        """
+        Internal callback function that is called when a thumbnail request fails or is cancelled
+        :param task_id: str
+        """
+
+        self._requests.pop(task_id, None)
+
+
+_THUMBNAIL_LOADER = None
+
+
+def get_thumbnail_loader():
+    """
+    Returns global thumbnail loader. It should be created the first time from the GUI thread.
+    :return: ThumbnailLoader
+    """
+
+    global _THUMBNAIL_LOADER
+
+    if _THUMBNAIL_LOADER is None:
+        _THUMBNAIL_LOADER = ThumbnailLoader()
+
+    return _THUMBNAIL_LOADER
+
+
 class ImageSequence(QObject, object):
 
     DEFAULT_FPS = 24
+    DEFAULT_PRELOAD_FRAMES = 8
 
     frameChanged = Signal(int)
 
@@ -267,6 +658,9 @@ class ImageSequence(QObject, object):
         self._frames = list()
         self._dirname = None
         self._paused = False
+        self._preload_frames = self.DEFAULT_PRELOAD_FRAMES
+        self._frame_size = None
+        self._loader = None
 
         if path:
             self.set_dirname(path)
@@ -318,6 +712,18 @@ class ImageSequence(QObject, object):
         if os.path.isdir(dirname):
             self._frames = [dirname + '/' + filename for filename in os.listdir(dirname)]
             natural_sort_items(self._frames)
+            self._update_frame_cache()
+
+    def set_preload_frames(self, count, size=None):
+        """
+        Sets the number of frames that are decoded in background before they are displayed
+        :param count: int, number of frames to decode ahead of the current one. 0 disables preloading
+        :param size: QSize or int or None, maximum size of the decoded frames. If not given, full size is used
+        """
+
+        self._preload_frames = max(0, count)
+        self._frame_size = size
+        self._update_frame_cache()
 
     def first_frame(self):
         """
@@ -365,6 +771,10 @@ class ImageSequence(QObject, object):
 
         if self._timer:
             self._timer.stop()
+        if self._loader is not None:
+            # pending preloads are discarded but threads are kept, they are shutdown with the loader when the
+            # sequence is destroyed
+            self._loader.cancel_all()
 
     def reset(self):
         """
@@ -434,7 +844,7 @@ class ImageSequence(QObject, object):
         :return: QIcon
         """
 
-        return QIcon(self.current_filename())
+        return QIcon(self.current_pixmap())
 
     def current_pixmap(self):
         """
@@ -442,7 +852,17 @@ class ImageSequence(QObject, object):
         :return: QPixmap
         """
 
-        return QPixmap(self.current_filename())
+        filename = self.current_filename()
+        if not self._preload_frames:
+            return QPixmap(filename)
+
+        loader = self._frame_loader()
+        image = loader.thumbnail(filename, size=self._frame_size)
+        if image is None:
+            image = read_image(filename, size=self._frame_size)
+            loader.cache.add(loader.key(filename, size=self._frame_size), image)
+
+        return QPixmap.fromImage(image)
 
     def jump_to_frame(self, frame):
         """
@@ -453,8 +873,66 @@ class ImageSequence(QObject, object):
         if frame >= self.frame_count():
             frame = 0
         self._frame = frame
+        self._preload(frame)
         self.frameChanged.emit(frame)
 
+    def _preload(self, frame):
+        """
+        Internal function that requests the decoding of the frames that follow the given one
+        :param frame: int
+        """
+
+        frame_count = self.frame_count()
+        if not self._preload_frames or frame_count <= 1:
+            return
+
+        loader = self._frame_loader()
+        for i in range(1, min(self._preload_frames, frame_count - 1) + 1):
+            loader.request(
+                self._frames[(frame + i) % frame_count], size=self._frame_size,
+                priority=ThumbnailLoader.VISIBLE_PRIORITY - i)
+
+    def _frame_loader(self):
+        """
+        Internal function that returns the loader used to preload frames. Each sequence has its own loader, so
+        preloaded frames are not evicted by other thumbnails (or other sequences) before they are displayed.
+        :return: ThumbnailLoader
+        """
+
+        if self._loader is None:
+            self._loader = ThumbnailLoader(max_threads=2, max_bytes=self._frame_cache_bytes(), parent=self)
+
+        return self._loader
+
+    def _frame_cache_bytes(self):
+        """
+        Internal function that returns the number of bytes needed to cache the current frame and the preloaded ones
+        :return: int
+        """
+
+        frame_size = get_image_size(self.first_frame())
+        if not frame_size.isValid():
+            return 128 * 1024 * 1024
+        if self._frame_size is not None:
+            max_size = self._frame_size if isinstance(self._frame_size, QSize) else QSize(
+                int(self._frame_size), int(self._frame_size))
+            if frame_size.width() > max_size.width() or frame_size.height() > max_size.height():
+                frame_size = frame_size.scaled(max_size, Qt.KeepAspectRatio)
+
+        # decoded frames use 4 bytes per pixel
+        return (self._preload_frames + 2) * frame_size.width() * frame_size.height() * 4
+
+    def _update_frame_cache(self):
+        """
+        Internal function that resizes frames cache to fit the current frame and the preloaded ones
+        """
+
+        if self._loader is None:
+            return
+
+        self._loader.clear()
+        self._loader.cache.set_max_bytes(self._frame_cache_bytes())
+
     def _on_frame_changed(self):
         """
         Internal callback function that is called when the current frame changes
@@ -19,6 +19,8 @@ from tpDcc.libs.qt.widgets import layouts, buttons, treewidgets
 class HistoryTreeWidget(treewidgets.FileTreeWidget):
 
     HEADER_LABELS = ['Version', 'Comment', 'Size MB', 'User', 'Time']
+    # versions are not listed from the file system, so they are loaded synchronously
+    ASYNC_LOADING = False
 
     def __init__(self):
         super(HistoryTreeWidget, self).__init__()
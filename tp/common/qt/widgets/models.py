@@ -7,12 +7,27 @@ Module that contains base classes for Qt models
 
 from __future__ import print_function, division, absolute_import
 
+import os
+import gc
+import time
+import difflib
+from collections import OrderedDict
+
 from Qt.QtCore import Qt, Signal, QObject, QModelIndex, QItemSelection, QAbstractListModel, QAbstractTableModel
 from Qt.QtCore import QAbstractItemModel
 
 import tpDcc as tp
 from tpDcc.libs.qt.core import qtutils
 
+from tp.common.python import folder
+from tp.common.qt import worker
+
+PSUTIL_AVAILABLE = True
+try:
+    import psutil
+except Exception:
+    PSUTIL_AVAILABLE = False
+
 
 class ItemSelection(QItemSelection):
     """
@@ -43,6 +58,139 @@ class ItemSelection(QItemSelection):
         return indexes
 
 
+def _contiguous_ranges(rows):
+    """
+    Internal function that groups given rows into contiguous ranges sorted from last to first
+    :param rows: list(int)
+    :return: list(tuple(int, int)), list of (first row, last row) ranges
+    """
+
+    ranges = list()
+    for row in sorted(set(rows), reverse=True):
+        if ranges and ranges[-1][0] == row + 1:
+            ranges[-1] = (row, ranges[-1][1])
+        else:
+            ranges.append((row, row))
+
+    return ranges
+
+
+def _remove_items(model, rows):
+    """
+    Internal function that removes the items at the given rows of a list or table model emitting a single remove
+    notification per contiguous range of rows
+    :param model: ListModel or TableModel
+    :param rows: list(int)
+    :return: int, number of removed rows
+    """
+
+    count = 0
+    for first, last in _contiguous_ranges([row for row in rows if 0 <= row < len(model._items)]):
+        model.beginRemoveRows(QModelIndex(), first, last)
+        del model._items[first:last + 1]
+        model.endRemoveRows()
+        count += last - first + 1
+
+    return count
+
+
+def _same_item(old_item, new_item):
+    """
+    Internal function that returns whether given items store the same data
+    :param old_item: object
+    :param new_item: object
+    :return: bool
+    """
+
+    if old_item is new_item:
+        return True
+    try:
+        return bool(old_item == new_item)
+    except Exception:
+        return False
+
+
+def _item_key(item):
+    """
+    Internal function that returns the default key used to compare list and table model items
+    :param item: object
+    :return: object
+    """
+
+    return tuple(item) if isinstance(item, list) else item
+
+
+def _update_items(model, items, key=None, max_changes_ratio=0.5):
+    """
+    Internal function that updates the items of a list or table model with the given ones, notifying only the ranges
+    of rows that changed. If most of the items changed, the model is reset.
+    :param model: ListModel or TableModel
+    :param items: list, new items
+    :param key: callable or None, function that returns a hashable key used to compare items
+    :param max_changes_ratio: float, if the ratio of changed rows is bigger than this one, model is reset
+    :return: bool, True if the model was updated incrementally; False if it was reset
+    """
+
+    items = list(items)
+    old_items = model._items
+    key = key or _item_key
+    try:
+        matcher = difflib.SequenceMatcher(
+            None, [key(item) for item in old_items], [key(item) for item in items], autojunk=False)
+        opcodes = matcher.get_opcodes()
+    except TypeError:
+        # items are not hashable
+        model.set_items(items)
+        return False
+
+    changes = sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in opcodes if tag != 'equal')
+    if changes > max_changes_ratio * max(len(old_items), len(items), 1):
+        model.set_items(items)
+        return False
+
+    # opcodes are applied from last to first so the rows of the pending opcodes are still valid
+    last_column = max(model.columnCount() - 1, 0)
+    for tag, i1, i2, j1, j2 in reversed(opcodes):
+        if tag == 'equal':
+            # items with the same key can still have different contents, so rows with changed items are updated
+            changed_rows = [
+                i1 + offset for offset in range(i2 - i1) if not _same_item(old_items[i1 + offset], items[j1 + offset])]
+            old_items[i1:i2] = items[j1:j2]
+            for first, last in _contiguous_ranges(changed_rows):
+                model.dataChanged.emit(model.index(first, 0), model.index(last, last_column))
+            continue
+        if tag == 'replace' and i2 - i1 == j2 - j1:
+            old_items[i1:i2] = items[j1:j2]
+            model.dataChanged.emit(model.index(i1, 0), model.index(i2 - 1, last_column))
+            continue
+        if i2 > i1:
+            model.beginRemoveRows(QModelIndex(), i1, i2 - 1)
+            del old_items[i1:i2]
+            model.endRemoveRows()
+        if j2 > j1:
+            model.beginInsertRows(QModelIndex(), i1, i1 + j2 - j1 - 1)
+            old_items[i1:i1] = items[j1:j2]
+            model.endInsertRows()
+
+    return True
+
+
+def _process_memory():
+    """
+    Internal function that returns the resident memory used by the current process
+    :return: int or None, memory in bytes or None if it cannot be retrieved
+    """
+
+    if PSUTIL_AVAILABLE:
+        return psutil.Process(os.getpid()).memory_info().rss
+
+    try:
+        with open('/proc/self/statm', 'r') as statm_file:
+            return int(statm_file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, AttributeError):
+        return None
+
+
 class ListModel(QAbstractListModel, object):
     def __init__(self, data=None, parent=None):
         """
@@ -124,10 +272,12 @@ class ListModel(QAbstractListModel, object):
         Clears all data model
         """
 
+        self.beginResetModel()
         try:
             self._items.clear()
         except Exception:
             del self._items[:]
+        self.endResetModel()
 
     def item(self, index):
         """
@@ -149,13 +299,52 @@ class ListModel(QAbstractListModel, object):
 
     def set_items(self, items):
         """
-        Clears current model items and adds new ones
+        Clears current model items and adds new ones. Views are notified with a single model reset.
         :param items: list<string>, items to add to the model
         """
 
-        self.clear()
-        for item in items:
-            self.append_item(item)
+        self.beginResetModel()
+        self._items = list(items)
+        self.endResetModel()
+
+    def extend(self, items):
+        """
+        Appends multiple items into the model. Views are notified with a single insert notification.
+        :param items: list, items to append
+        :return: bool
+        """
+
+        items = list(items)
+        if not items:
+            return False
+
+        next_index = self.rowCount()
+        self.beginInsertRows(QModelIndex(), next_index, next_index + len(items) - 1)
+        self._items.extend(items)
+        self.endInsertRows()
+
+        return True
+
+    def remove_many(self, rows):
+        """
+        Removes the items at the given rows. Views are notified once per contiguous range of rows.
+        :param rows: list(int)
+        :return: int, number of removed items
+        """
+
+        return _remove_items(self, rows)
+
+    def update_items(self, items, key=None, max_changes_ratio=0.5):
+        """
+        Updates model items with the given ones notifying views only about the rows that were inserted, removed or
+        changed. Useful when the new items mostly overlap the current ones (for example, when refreshing a list).
+        :param items: list, new items
+        :param key: callable or None, function that returns a hashable key used to compare items
+        :param max_changes_ratio: float, if the ratio of changed rows is bigger than this one, model is reset instead
+        :return: bool, True if the model was updated incrementally; False if it was reset
+        """
+
+        return _update_items(self, items, key=key, max_changes_ratio=max_changes_ratio)
 
     def append_item(self, item):
         """
@@ -298,10 +487,12 @@ class TableModel(QAbstractTableModel, object):
         Clears all data model
         """
 
+        self.beginResetModel()
         try:
             self._items.clear()
         except Exception:
             del self._items[:]
+        self.endResetModel()
 
     def item(self, index):
         """
@@ -324,13 +515,52 @@ class TableModel(QAbstractTableModel, object):
 
     def set_items(self, items):
         """
-        Clears current model items and adds new ones
-        :param items: list<list>, items to add to teh model
+        Clears current model items and adds new ones. Views are notified with a single model reset.
+        :param items: list<list>, items to add to the model
         """
 
-        self.clear()
-        for item in items:
-            self.append_item(item=item)
+        self.beginResetModel()
+        self._items = list(items)
+        self.endResetModel()
+
+    def extend(self, items):
+        """
+        Appends multiple items into the model. Views are notified with a single insert notification.
+        :param items: list, rows to append
+        :return: bool
+        """
+
+        items = list(items)
+        if not items:
+            return False
+
+        next_index = self.rowCount()
+        self.beginInsertRows(QModelIndex(), next_index, next_index + len(items) - 1)
+        self._items.extend(items)
+        self.endInsertRows()
+
+        return True
+
+    def remove_many(self, rows):
+        """
+        Removes the items at the given rows. Views are notified once per contiguous range of rows.
+        :param rows: list(int)
+        :return: int, number of removed items
+        """
+
+        return _remove_items(self, rows)
+
+    def update_items(self, items, key=None, max_changes_ratio=0.5):
+        """
+        Updates model items with the given ones notifying views only about the rows that were inserted, removed or
+        changed. Useful when the new items mostly overlap the current ones (for example, when refreshing a list).
+        :param items: list, new items
+        :param key: callable or None, function that returns a hashable key used to compare items
+        :param max_changes_ratio: float, if the ratio of changed rows is bigger than this one, model is reset instead
+        :return: bool, True if the model was updated incrementally; False if it was reset
+        """
+
+        return _update_items(self, items, key=key, max_changes_ratio=max_changes_ratio)
 
     def append_item(self, item):
         """
@@ -517,6 +747,19 @@ class BaseTreeItem(QObject):
 
         return self.remove_index(self.child_index(item))
 
+    def remove_index(self, position):
+        """
+        Removes the child item at the given position from the children list
+        :param position: int, position of the item to remove
+        :return: BaseTreeItem, removed item
+        """
+
+        item = self._child_items.pop(position)
+        item.setParent(None)
+        self.childRemoved.emit(item)
+
+        return item
+
     def remove(self):
         """
         Removes current item from its parent
@@ -537,11 +780,263 @@ class BaseTreeItem(QObject):
         self.clear()
 
 
+class TreeItem(object):
+    """
+    Lightweight tree item that can be used instead of BaseTreeItem to store large trees in a TreeModel.
+    Items are not QObjects and do not emit signals: data changes must be done through the model (setData) or
+    notified through TreeModel.item_changed. Row of each item within its parent is cached, so looking up the row of an
+    item (and the parent index of an index) does not depend on the number of siblings.
+    """
+
+    __slots__ = ('_item_data', '_child_items', '_parent', '_row')
+
+    def __init__(self, data, parent=None):
+        self._item_data = data or list()
+        self._child_items = list()
+        self._parent = None
+        self._row = 0
+        if parent is not None:
+            parent.append_child(self)
+
+    def parent(self):
+        """
+        Returns the parent item of this item
+        :return: TreeItem or None
+        """
+
+        return self._parent
+
+    def data(self, column):
+        """
+        Gets the data in the given column
+        :param column: int
+        :return: variant
+        """
+
+        return self._item_data[column]
+
+    def set_data(self, column, value):
+        """
+        Sets the data in the given column
+        :param column: int
+        :param value: variant
+        :return: bool
+        """
+
+        if column < 0 or column >= len(self._item_data):
+            return False
+
+        self._item_data[column] = value
+
+        return True
+
+    def row(self):
+        """
+        Returns the row index of this item within the parent's child collection
+        :return: int, the respective index if parent is valid; 0 otherwise
+        """
+
+        return self._row
+
+    def column(self):
+        """
+        Returns the column index of this item within the parent's child collection
+        :return: int
+        """
+
+        return 0
+
+    def flags(self, column):
+        """
+        Get the Qt.ItemFlags for the model data at a given index
+        :return: A valid combination of the QtCore.Qt.QFlags enum.
+        """
+
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def column_count(self):
+        """
+        Returns number of columns stored at this item
+        :return: int, number of columns at this item
+        """
+
+        return len(self._item_data)
+
+    def row_count(self):
+        """
+        Returns number of rows stored at this item
+        :return: int, number of rows at this item
+        """
+
+        return len(self._child_items)
+
+    def child(self, row):
+        """
+        Returns the child item at the given row index
+        :param row: int, index into the list of children
+        :return: TreeItem, respective item if row is valid; None otherwise
+        """
+
+        return self._child_items[row] if 0 <= row < len(self._child_items) else None
+
+    def children(self):
+        """
+        Returns the children of this item
+        :return: list(TreeItem)
+        """
+
+        return list(self._child_items)
+
+    def has_children(self):
+        """
+        Returns whether or not this item has children
+        :return: bool
+        """
+
+        return bool(self._child_items)
+
+    def child_count(self):
+        """
+        Returns the number of children this item has
+        :return: int, number of children this item has
+        """
+
+        return len(self._child_items)
+
+    def child_index(self, child):
+        """
+        Returns the index of the given item in the internal list of children of this item
+        :param child: TreeItem, item in the list of children
+        :return: int
+        """
+
+        if child._parent is not self:
+            raise ValueError('{} is not a child of {}'.format(child, self))
+
+        return child._row
+
+    def is_root(self):
+        """
+        Returns whether or not current node is a root one (has no parents)
+        :return: bool
+        """
+
+        return self._parent is None
+
+    def append_child(self, item):
+        """
+        Appends a child item to the internal collection of children
+        :param item: TreeItem, item to append
+        """
+
+        item._parent = self
+        item._row = len(self._child_items)
+        self._child_items.append(item)
+
+    def append_children(self, items):
+        """
+        Appends multiple child items to the internal collection of children
+        :param items: list(TreeItem), items to append
+        """
+
+        row = len(self._child_items)
+        for i, item in enumerate(items):
+            item._parent = self
+            item._row = row + i
+        self._child_items.extend(items)
+
+    def insert_child(self, position, item):
+        """
+        Inserts a child item into the internal collection of children
+        :param position: int, position to insert item into
+        :param item: TreeItem, item to insert
+        :return: bool
+        """
+
+        if position < 0 or position > len(self._child_items):
+            return False
+
+        item._parent = self
+        self._child_items.insert(position, item)
+        self._update_rows(position)
+
+        return True
+
+    def remove_child(self, item):
+        """
+        Removes an item from the children list
+        :param item: TreeItem, item to remove
+        :return: TreeItem, removed item
+        """
+
+        return self.remove_index(self.child_index(item))
+
+    def remove_index(self, position):
+        """
+        Removes the child item at the given position from the children list
+        :param position: int, position of the item to remove
+        :return: TreeItem, removed item
+        """
+
+        item = self._child_items.pop(position)
+        item._parent = None
+        item._row = 0
+        self._update_rows(position)
+
+        return item
+
+    def remove(self):
+        """
+        Removes current item from its parent
+        """
+
+        if self._parent is not None:
+            self._parent.remove_child(self)
+
+    def clear(self):
+        """
+        Clears all data from the item (and its children)
+        """
+
+        for child in self._child_items:
+            child.clear()
+            child._parent = None
+        self._child_items = list()
+
+    def _update_rows(self, position):
+        """
+        Internal function that updates the cached rows of the children starting from the given position
+        :param position: int
+        """
+
+        child_items = self._child_items
+        for row in range(position, len(child_items)):
+            child_items[row]._row = row
+
+
 class TreeModel(QAbstractItemModel, object):
-    def __init__(self, header_data=['']):
+
+    # class used to store the items of the tree. TreeItem can be used to store big trees
+    ITEM_CLASS = BaseTreeItem
+
+    def __init__(self, header_data=[''], item_class=None):
+        self._item_class = item_class or self.ITEM_CLASS
         self._root = self._create_root(header_data)
         super(TreeModel, self).__init__()
 
+        # lazy population
+        self._child_provider = None
+        self._nodes = dict()
+        self._fetched = OrderedDict()
+        self._pending_rows = dict()
+        self._fetching = dict()
+        self._expanded = set()
+        self._background_fetch = False
+        self._fetch_batch_size = 0
+        self._max_nodes = 0
+        self._node_count = 0
+        self._fetch_pool = None
+
     # =================================================================================================================
     # OVERRIDES
     # =================================================================================================================
@@ -568,6 +1063,69 @@ class TreeModel(QAbstractItemModel, object):
         parent_item = self.item(parent)
         return parent_item.row_count()
 
+    def hasChildren(self, parent=QModelIndex()):
+        """
+        Overrides hasChildren base function
+        Returns whether the item of the given index has children. Children of lazy items that were not fetched yet
+        are checked through the child provider.
+        :param parent: QModelIndex
+        :return: bool
+        """
+
+        parent_item = self.item(parent)
+        if parent_item.child_count():
+            return True
+        node = self._nodes.get(parent_item)
+        if node is not None and parent_item not in self._fetched:
+            return self._child_provider.has_children(node)
+
+        return parent_item in self._pending_rows
+
+    def canFetchMore(self, parent):
+        """
+        Overrides canFetchMore base function
+        Returns whether children of the given index can be fetched from the child provider
+        :param parent: QModelIndex
+        :return: bool
+        """
+
+        parent_item = self.item(parent)
+        if parent_item in self._pending_rows:
+            return True
+        if parent_item not in self._nodes or parent_item in self._fetched:
+            return False
+
+        return parent_item not in self._fetching.values()
+
+    def fetchMore(self, parent):
+        """
+        Overrides fetchMore base function
+        Fetches children of the given index from the child provider
+        :param parent: QModelIndex
+        """
+
+        parent_item = self.item(parent)
+        if parent_item in self._pending_rows:
+            self._insert_fetched_rows(parent_item)
+            return
+
+        node = self._nodes.get(parent_item)
+        if node is None or parent_item in self._fetched or parent_item in self._fetching.values():
+            return
+
+        if self._background_fetch:
+            if self._fetch_pool is None:
+                self._fetch_pool = worker.WorkerPool(max_threads=2, parent=self)
+                self._fetch_pool.workCompleted.connect(self._on_fetch_completed)
+                self._fetch_pool.workFailure.connect(self._on_fetch_failed)
+                self._fetch_pool.workCancelled.connect(self._on_fetch_failed)
+            task_id = self._fetch_pool.queue_work(
+                self._fetch_children, node, priority=worker.WorkerPool.HIGH_PRIORITY)
+            self._fetching[task_id] = parent_item
+            return
+
+        self._set_fetched_rows(parent_item, self._fetch_children(node))
+
     def data(self, index, role):
         """
         Overrides base data function
@@ -672,7 +1230,7 @@ class TreeModel(QAbstractItemModel, object):
         last_index = end_index - 1
         self.beginInsertRows(parent, next_index, last_index)
         for i in range(next_index, end_index):
-            self._item_insert(parent_item, self.create_item(parent_item), i)
+            self._item_insert(parent_item, self.create_item([None] * parent_item.column_count()), i)
         self.endInsertRows()
 
         return True
@@ -726,6 +1284,100 @@ class TreeModel(QAbstractItemModel, object):
 
         return self._root
 
+    def item_class(self):
+        """
+        Returns the class used to store the items of the tree
+        :return: type
+        """
+
+        return self._item_class
+
+    def item_changed(self, item, column=0):
+        """
+        Notifies views that the data of the given item changed. Must be called when the data of a TreeItem is
+        modified without using setData, because TreeItem instances do not emit signals.
+        :param item: BaseTreeItem or TreeItem
+        :param column: int
+        """
+
+        index = self.createIndex(item.row(), column, item)
+        self.dataChanged.emit(index, index)
+
+    def child_provider(self):
+        """
+        Returns the provider used to fetch the children of the items lazily
+        :return: TreeChildProvider or None
+        """
+
+        return self._child_provider
+
+    def set_child_provider(self, provider, root_node=None, background=False, batch_size=0, max_nodes=0):
+        """
+        Resets the model so the items are populated lazily, when views request them, using the given child provider.
+        :param provider: TreeChildProvider or None, provider used to fetch children. If None, lazy population is
+            disabled
+        :param root_node: object, provider node of the root item
+        :param background: bool, whether children are fetched in a background thread
+        :param batch_size: int, maximum number of children inserted each time a view requests more items. 0 means all.
+        :param max_nodes: int, maximum number of fetched items. When exceeded, fetched children of collapsed items
+            are evicted and fetched again when needed. 0 means no limit. Views must be attached using attach_view
+            so the model knows which items are expanded.
+        """
+
+        if self._fetch_pool is not None:
+            self._fetch_pool.clear()
+
+        self.beginResetModel()
+        for row in reversed(range(self._root.child_count())):
+            self._item_remove_position(self._root, row)
+        self._nodes.clear()
+        self._fetched.clear()
+        self._pending_rows.clear()
+        self._fetching.clear()
+        self._expanded.clear()
+        self._node_count = 0
+        self._child_provider = provider
+        self._background_fetch = background
+        self._fetch_batch_size = batch_size
+        self._max_nodes = max_nodes
+        if provider is not None:
+            self._nodes[self._root] = root_node
+        self.endResetModel()
+
+    def node(self, item):
+        """
+        Returns the child provider node of the given lazy item
+        :param item: BaseTreeItem or TreeItem
+        :return: object or None
+        """
+
+        return self._nodes.get(item)
+
+    def attach_view(self, view):
+        """
+        Tracks items expanded in the given view, so fetched children of collapsed items can be evicted
+        :param view: QTreeView
+        """
+
+        view.expanded.connect(lambda index: self.set_expanded(index, True))
+        view.collapsed.connect(lambda index: self.set_expanded(index, False))
+
+    def set_expanded(self, index, expanded):
+        """
+        Sets whether the item of the given index is expanded in a view
+        :param index: QModelIndex
+        :param expanded: bool
+        """
+
+        item = self.item(index)
+        if expanded:
+            self._expanded.add(item)
+            if item in self._fetched:
+                self._fetched.pop(item)
+                self._fetched[item] = True
+        else:
+            self._expanded.discard(item)
+
     def create_item(self, *args):
         """
         Generates a new instance of the internal data root item wit the given arguments
@@ -733,7 +1385,7 @@ class TreeModel(QAbstractItemModel, object):
         :return: BaseTreeItem, root item created
         """
 
-        return BaseTreeItem(*args)
+        return self._item_class(*args)
 
     def item(self, index):
         """
@@ -756,7 +1408,7 @@ class TreeModel(QAbstractItemModel, object):
         :return: QModelIndex, lookup operation
         """
 
-        if not item or item == self._root:
+        if not item or item is self._root:
             return QModelIndex()
 
         return self.createIndex(item.row(), item.column(), item)
@@ -773,7 +1425,7 @@ class TreeModel(QAbstractItemModel, object):
 
         child_item = index.internalPointer()
         parent_item = child_item.parent()
-        if parent_item is None or parent_item == self._root:
+        if parent_item is None or parent_item is self._root:
             return QModelIndex()
 
         return self.createIndex(parent_item.row(), parent_item.column(), parent_item)
@@ -813,7 +1465,7 @@ class TreeModel(QAbstractItemModel, object):
         Clears the model data
         """
 
-        if self.hasChildren():
+        if self.rowCount():
             self.removeRows(0, self.rowCount())
 
     def delete(self):
@@ -835,7 +1487,117 @@ class TreeModel(QAbstractItemModel, object):
         :return: BaseTreeItem
         """
 
-        return BaseTreeItem(*args)
+        return self._item_class(*args)
+
+    def _fetch_children(self, node):
+        """
+        Internal function that fetches the children of the given node from the child provider
+        :param node: object
+        :return: list(tuple(object, list)), list of (child node, child column data)
+        """
+
+        return list(self._child_provider.children(node))
+
+    def _set_fetched_rows(self, item, rows):
+        """
+        Internal function that stores the fetched children of the given item and inserts them into the model
+        :param item: BaseTreeItem or TreeItem
+        :param rows: list(tuple(object, list))
+        """
+
+        self._fetched[item] = True
+        if rows:
+            self._pending_rows[item] = rows
+            self._insert_fetched_rows(item)
+
+    def _insert_fetched_rows(self, item):
+        """
+        Internal function that inserts the next batch of fetched children of the given item
+        :param item: BaseTreeItem or TreeItem
+        """
+
+        rows = self._pending_rows.pop(item, None)
+        if not rows:
+            return
+        if self._fetch_batch_size and len(rows) > self._fetch_batch_size:
+            rows, remaining_rows = rows[:self._fetch_batch_size], rows[self._fetch_batch_size:]
+            self._pending_rows[item] = remaining_rows
+
+        first = item.child_count()
+        self.beginInsertRows(self.item_index(item), first, first + len(rows) - 1)
+        for node, data in rows:
+            child = self.create_item(list(data))
+            self._item_append(item, child)
+            self._nodes[child] = node
+        self.endInsertRows()
+        self._node_count += len(rows)
+
+        if self._max_nodes and self._node_count > self._max_nodes:
+            self._evict_nodes(item)
+
+    def _evict_nodes(self, keep_item):
+        """
+        Internal function that removes the children of least recently fetched collapsed items until the number of
+        fetched items does not exceed the maximum one
+        :param keep_item: BaseTreeItem or TreeItem, item which children were just fetched and must not be evicted
+        """
+
+        keep = set([self._root])
+        parent = keep_item
+        while parent is not None:
+            keep.add(parent)
+            parent = parent.parent()
+
+        for item in list(self._fetched.keys()):
+            if self._node_count <= self._max_nodes:
+                break
+            if item in keep or item in self._expanded or item not in self._fetched:
+                continue
+            child_count = item.child_count()
+            if child_count:
+                self.beginRemoveRows(self.item_index(item), 0, child_count - 1)
+                for row in reversed(range(child_count)):
+                    self._forget_item(self._item_remove_position(item, row))
+                self.endRemoveRows()
+            self._fetched.pop(item, None)
+            self._pending_rows.pop(item, None)
+
+    def _forget_item(self, item):
+        """
+        Internal function that removes all the lazy population data of the given evicted item and its children
+        :param item: BaseTreeItem or TreeItem
+        """
+
+        for row in range(item.child_count()):
+            self._forget_item(item.child(row))
+        self._nodes.pop(item, None)
+        self._fetched.pop(item, None)
+        self._pending_rows.pop(item, None)
+        self._expanded.discard(item)
+        self._node_count -= 1
+
+    def _on_fetch_completed(self, task_id, rows):
+        """
+        Internal callback function that is called when the children of an item are fetched in background
+        :param task_id: str
+        :param rows: list(tuple(object, list))
+        """
+
+        item = self._fetching.pop(task_id, None)
+        if item is None or item not in self._nodes:
+            return
+
+        self._set_fetched_rows(item, rows)
+
+    def _on_fetch_failed(self, task_id, *args):
+        """
+        Internal callback function that is called when fetching the children of an item fails or is cancelled
+        :param task_id: str
+        """
+
+        item = self._fetching.pop(task_id, None)
+        if item is not None and args:
+            tp.logger.warning('Impossible to fetch children of {}: {}'.format(self._nodes.get(item), args[0]))
 
     def _item_changing(self, id, role):
         """
@@ -867,7 +1629,6 @@ class TreeModel(QAbstractItemModel, object):
         """
 
         parent.append_child(item)
-        item.setParent(parent)
         self._item_connect(item)
 
     def _item_insert(self, parent, item, position):
@@ -879,7 +1640,6 @@ class TreeModel(QAbstractItemModel, object):
         """
 
         parent.insert_child(position, item)
-        item.setParent(parent)
         self._item_connect(item)
 
     def _item_remove(self, parent, item):
@@ -890,7 +1650,6 @@ class TreeModel(QAbstractItemModel, object):
         """
 
         parent.remove_child(item)
-        item.setParent(None)
         self._item_disconnect(item)
 
     def _item_remove_position(self, parent, index):
@@ -898,18 +1657,23 @@ class TreeModel(QAbstractItemModel, object):
         Internal item removal at position function
         :param parent: AbstractDataTreeItem, parent from we want to remove item
         :param index: int, index of the chld we want to remove from parent's internal collection
+        :return: AbstractDataTreeItem, removed item
         """
 
         item = parent.remove_index(index)
-        item.setParent(None)
         self._item_disconnect(item)
 
+        return item
+
     def _item_connect(self, item):
         """
         Internal item signal connection
         :param item: AbstractDataTreeItem, item we want to connect signals to
         """
 
+        if not isinstance(item, QObject):
+            return
+
         item.dataChanging.connect(self._item_changing)
         item.dataChanged.connect(self._item_changed)
 
@@ -919,5 +1683,157 @@ class TreeModel(QAbstractItemModel, object):
         :param item: AbstractDataTreeItem, item we want to disconnect signals from
         """
 
+        if not isinstance(item, QObject):
+            return
+
         item.dataChanging.disconnect()
         item.dataChanged.disconnect()
+
+
+class TreeChildProvider(object):
+    """
+    Base class for providers used by TreeModel to fetch children of items lazily. Each item is associated to a node
+    (a path, a DataLibrary identifier, a DCC scene node name, ...) and the provider returns the child nodes of a node.
+    When children are fetched in background, children function is called from a worker thread.
+    """
+
+    def has_children(self, node):
+        """
+        Returns whether the given node may have children. It should be cheap, it is called for each displayed item.
+        :param node: object
+        :return: bool
+        """
+
+        return True
+
+    def children(self, node):
+        """
+        Returns the children of the given node
+        :param node: object
+        :return: list(tuple(object, list)), list of (child node, child column data)
+        """
+
+        raise NotImplementedError('children function not implemented in {}'.format(self.__class__.__name__))
+
+
+class CallableTreeChildProvider(TreeChildProvider):
+    """
+    Child provider that fetches children using the given functions. Useful to fetch children from DataLibrary queries
+    or from DCC scenes without subclassing TreeChildProvider.
+    """
+
+    def __init__(self, children_fn, has_children_fn=None):
+        super(CallableTreeChildProvider, self).__init__()
+
+        self._children_fn = children_fn
+        self._has_children_fn = has_children_fn
+
+    def has_children(self, node):
+        return self._has_children_fn(node) if self._has_children_fn else True
+
+    def children(self, node):
+        return self._children_fn(node)
+
+
+class FileSystemTreeChildProvider(TreeChildProvider):
+    """
+    Child provider that fetches the contents of folders. Nodes are paths.
+    """
+
+    def __init__(self, folders_only=False, show_hidden=False):
+        super(FileSystemTreeChildProvider, self).__init__()
+
+        self._folders_only = folders_only
+        self._show_hidden = show_hidden
+
+    def has_children(self, node):
+        return os.path.isdir(node)
+
+    def children(self, node):
+        folders = list()
+        files = list()
+        try:
+            entries = folder.scandir(node)
+        except OSError:
+            return list()
+
+        for entry in entries:
+            if not self._show_hidden and entry.name.startswith('.'):
+                continue
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                folders.append(entry)
+            elif not self._folders_only:
+                files.append(entry)
+
+        return [(entry.path, [entry.name]) for entry in sorted(
+            folders, key=lambda e: e.name.lower()) + sorted(files, key=lambda e: e.name.lower())]
+
+
+def benchmark_tree_items(node_counts=(10000, 100000, 1000000), branching=10, item_classes=None):
+    """
+    Compares tree item classes when used to store the items of a TreeModel: tree build time, memory used by the items
+    and index() and parent() throughput of the model. Memory is measured as the growth of the process resident memory
+    while the tree is built, so memory allocated by Qt for QObject based items is included. It is None if process
+    memory cannot be retrieved
+    :param node_counts: tuple(int), number of nodes of the benchmarked trees
+    :param branching: int, number of children of each node
+    :param item_classes: list(type) or None, tree item classes to benchmark. By default, BaseTreeItem and TreeItem
+    :return: list(dict)
+    """
+
+    item_classes = item_classes or [BaseTreeItem, TreeItem]
+    results = list()
+    for item_class in item_classes:
+        for node_count in node_counts:
+            model = parents = indices = None
+            gc.collect()
+            start_memory = _process_memory()
+            start = time.perf_counter()
+            model = TreeModel(header_data=['name'], item_class=item_class)
+            parents = [model.root()]
+            created = 0
+            while created < node_count:
+                next_parents = list()
+                for parent in parents:
+                    children = [item_class(['item{}'.format(created + i)]) for i in range(branching)]
+                    for child in children:
+                        parent.append_child(child)
+                    created += branching
+                    next_parents.extend(children)
+                    if created >= node_count:
+                        break
+                parents = next_parents
+            build_time = time.perf_counter() - start
+            end_memory = _process_memory()
+            memory = end_memory - start_memory if start_memory is not None and end_memory is not None else None
+
+            indices = list()
+            pending = [QModelIndex()]
+            start = time.perf_counter()
+            while pending:
+                parent_index = pending.pop()
+                for row in range(model.rowCount(parent_index)):
+                    index = model.index(row, 0, parent_index)
+                    indices.append(index)
+                    pending.append(index)
+            index_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for index in indices:
+                model.parent(index)
+            parent_time = time.perf_counter() - start
+
+            results.append({
+                'item_class': item_class.__name__,
+                'nodes': len(indices),
+                'build_time': build_time,
+                'memory': memory,
+                'index_per_second': len(indices) / index_time if index_time else None,
+                'parent_per_second': len(indices) / parent_time if parent_time else None
+            })
+
+    return results
@@ -7,7 +7,11 @@ Module that contains custom Qt tree widgets
 
 from __future__ import print_function, division, absolute_import
 
-from Qt.QtCore import Qt, Signal, QRect, QSize, QModelIndex
+import os
+import sys
+import datetime
+
+from Qt.QtCore import Qt, Signal, QRect, QSize, QModelIndex, QTimer, QFileSystemWatcher
 from Qt.QtWidgets import QApplication, QSizePolicy, QTreeWidget, QTreeWidgetItem, QAbstractItemView, QStyleOption
 from Qt.QtWidgets import QWhatsThis
 from Qt.QtGui import QColor, QPalette, QPen, QBrush, QPainter
@@ -18,6 +22,9 @@ from tpDcc.libs.python import path, fileio, folder
 from tpDcc.libs.qt.core import base
 from tpDcc.libs.qt.widgets import layouts, buttons, search, lineedit
 
+from tp.common.python import folder as folder_utils
+from tp.common.qt import worker
+
 
 class TreeWidget(QTreeWidget, object):
 
@@ -38,6 +45,13 @@ class TreeWidget(QTreeWidget, object):
         self._drop_indicator_rect = QRect()
         self._drop_indicator_position = None
         self._name_filter = None
+        self._filter_index = None
+        self._filter_tokens = None
+        self._filter_matches = None
+        self._filter_visible = None
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.timeout.connect(self._on_filter_timeout)
 
         self.setIndentation(25)
         self.setExpandsOnDoubleClick(False)
@@ -58,6 +72,12 @@ class TreeWidget(QTreeWidget, object):
         self.itemExpanded.connect(self._on_item_expanded)
         self.itemCollapsed.connect(self._on_item_collapsed)
 
+        # filter index is rebuilt lazily the next time the filter is applied after items change
+        self.model().rowsInserted.connect(self._on_items_inserted)
+        self.model().rowsRemoved.connect(self._on_items_changed)
+        self.model().modelReset.connect(self._on_items_changed)
+        self.model().dataChanged.connect(self._on_items_changed)
+
     # ============================================================================================================
     # PROPERTIES
     # ============================================================================================================
@@ -185,28 +205,74 @@ class TreeWidget(QTreeWidget, object):
         Unhide all tree items
         """
 
-        for i in range(self.topLevelItemCount()):
-            item = self.topLevelItem(i)
-            self.setItemHidden(item, False)
+        for item in self._get_all_items():
+            if item.isHidden():
+                item.setHidden(False)
+
+        self._filter_tokens = None
+        self._filter_matches = None
+        self._filter_visible = None
 
     def filter_names(self, filter_text):
         """
-        Hides all tree items with the given text
+        Hides all tree items whose names do not contain the given text. Filter is not case sensitive and, if the text
+        contains multiple words, items whose names contain all of them are shown. Parents of shown items are also shown.
+        Only items whose visibility changes are updated.
         :param filter_text: str, text used to filter tree items
         """
 
-        self._name_filter = filter_text.strip(' ')
+        self._filter_timer.stop()
+        self._name_filter = str(filter_text).strip(' ')
+        tokens = tuple(self._name_filter.lower().split())
+        if tokens == self._filter_tokens and self._filter_index is not None:
+            return
 
-        self.unhide_items()
+        index = self._get_filter_index()
+        if not tokens:
+            if self._filter_tokens:
+                for item in set(index) - self._filter_visible:
+                    item.setHidden(False)
+            self._filter_tokens = None
+            self._filter_matches = None
+            self._filter_visible = None
+            return
 
-        for i in range(self.topLevelItemCount()):
-            item = self.topLevelItem(i)
-            text = str(item.text(self._title_text_index))
-            filter_text = str(filter_text).strip(' ')
+        # if every previous word is contained in a new word, only previous matches can match the new filter
+        previous_tokens = self._filter_tokens
+        if previous_tokens and self._filter_matches is not None and all(
+                any(previous_token in token for token in tokens) for previous_token in previous_tokens):
+            candidates = self._filter_matches
+        else:
+            candidates = index
+
+        matches = [item for item in candidates if all(token in index[item] for token in tokens)]
+        visible = set(matches)
+        for item in matches:
+            parent = item.parent()
+            while parent is not None and parent not in visible:
+                visible.add(parent)
+                parent = parent.parent()
+
+        previous_visible = self._filter_visible if self._filter_visible is not None else set(index)
+        for item in previous_visible - visible:
+            item.setHidden(True)
+        for item in visible - previous_visible:
+            item.setHidden(False)
+
+        self._filter_tokens = tokens
+        self._filter_matches = matches
+        self._filter_visible = visible
+
+    def filter_names_delayed(self, filter_text, delay=250):
+        """
+        Filters tree items with the given text once no other filter is requested for the given time. Useful to filter
+        items while the user is typing the filter text.
+        :param filter_text: str, text used to filter tree items
+        :param delay: int, time in milliseconds to wait before applying the filter
+        """
 
-            # If the filter text is not found on the item text, we hide the item
-            if text.find(filter_text) == -1:
-                self.setItemHidden(item, True)
+        self._name_filter = str(filter_text).strip(' ')
+        self._filter_timer.start(delay)
 
     def get_tree_item_name(self, tree_item):
         """
@@ -573,14 +639,12 @@ class TreeWidget(QTreeWidget, object):
         :return: list<QTreeWidgetItem>
         """
 
-        child_count = item.childCount()
         items = list()
-        for i in range(child_count):
-            child = item.child(i)
-            children = self._get_ancestors(child)
+        pending = [item.child(i) for i in range(item.childCount() - 1, -1, -1)]
+        while pending:
+            child = pending.pop()
             items.append(child)
-            if children:
-                items += children
+            pending.extend(child.child(i) for i in range(child.childCount() - 1, -1, -1))
 
         return items
 
@@ -590,16 +654,26 @@ class TreeWidget(QTreeWidget, object):
         :return: list(QTreeWidgetItem)
         """
 
-        item_count = self.topLevelItemCount()
-        items = list()
-        for i in range(item_count):
-            item = self.topLevelItem(i)
-            ancestors = self._get_ancestors(item)
-            items.append(item)
-            if ancestors:
-                items += ancestors
+        return self._get_ancestors(self.invisibleRootItem())
 
-        return items
+    def _get_filter_index(self):
+        """
+        Internal function that returns the index used to filter items by name, building it if necessary
+        :return: dict(QTreeWidgetItem, str), lowercase names of all the items in the tree
+        """
+
+        if self._filter_index is not None:
+            return self._filter_index
+
+        text_index = self._title_text_index
+        self._filter_index = dict((item, str(item.text(text_index)).lower()) for item in self._get_all_items())
+        if self._filter_tokens:
+            # items were added or removed, so visible items are checked again
+            self._filter_visible = set(item for item in self._filter_index if not item.isHidden())
+            self._filter_matches = None
+            self._filter_tokens = ('',)
+
+        return self._filter_index
 
     def _add_sub_items(self, tree_item):
         """
@@ -631,6 +705,30 @@ class TreeWidget(QTreeWidget, object):
     # CALLBACKS
     # ============================================================================================================
 
+    def _on_items_inserted(self, *args):
+        """
+        Internal callback function that is called when items are added to the tree
+        New items are filtered using current name filter
+        """
+
+        self._filter_index = None
+        if self._filter_tokens and not self._filter_timer.isActive():
+            self._filter_timer.start(0)
+
+    def _on_items_changed(self, *args):
+        """
+        Internal callback function that is called when items of the tree are removed or changed
+        """
+
+        self._filter_index = None
+
+    def _on_filter_timeout(self):
+        """
+        Internal callback function that is called when a delayed filter must be applied
+        """
+
+        self.filter_names(self._name_filter or '')
+
     def _on_item_expanded(self, item):
         """
         Internal function that is called anytime the user expands an item of the tree
@@ -722,6 +820,9 @@ class FilterTreeWidget(base.DirectoryWidget, object):
 
     subPathChanged = Signal(str)
 
+    # time in milliseconds to wait after the user stops typing before filtering tree items
+    FILTER_DELAY = 250
+
     def __init__(self, parent=None):
         self._tree_widget = None
         self._emit_changes = True
@@ -857,7 +958,7 @@ class FilterTreeWidget(base.DirectoryWidget, object):
         """
 
         if self._update_tree:
-            self._tree_widget.filter_names(text)
+            self._tree_widget.filter_names_delayed(text, delay=self.FILTER_DELAY)
 
     def _on_sub_path_filter_changed(self):
         """
@@ -877,7 +978,7 @@ class FilterTreeWidget(base.DirectoryWidget, object):
             self.set_directory(self._directory)
             if self._update_tree:
                 self._tree_widget.set_directory(self._directory)
-            text = self._filter_names.text
+            text = self._filter_names.text()
             self._on_filter_names(text)
             return
 
@@ -888,7 +989,7 @@ class FilterTreeWidget(base.DirectoryWidget, object):
         if path.is_dir(sub_dir):
             if self._update_tree:
                 self._tree_widget.set_directory(self._directory)
-            text = self._filter_names.text
+            text = self._filter_names.text()
             self._on_filter_names(text)
 
         if self._emit_changes:
@@ -896,6 +997,10 @@ class FilterTreeWidget(base.DirectoryWidget, object):
 
 
 class FileTreeWidget(TreeWidget, object):
+    """
+    Tree widget that displays the contents of a directory. By default, folders are listed in a background thread,
+    children items are inserted in batches and listed folders are updated incrementally when their contents change.
+    """
 
     refreshed = Signal()
 
@@ -904,10 +1009,34 @@ class FileTreeWidget(TreeWidget, object):
     ITEM_WIDGET = QTreeWidgetItem
     EXCLUDE_EXTENSIONS = list()
 
+    # whether folders are listed in a background thread. Subclasses that do not display folder contents (overriding
+    # _get_files) should disable it
+    ASYNC_LOADING = True
+    # number of items inserted into the tree at once
+    BATCH_SIZE = 200
+    # interval in milliseconds used to check changes in listed folders. File system watcher notifications are not
+    # reliable for network folders in Linux, so folders are polled there
+    POLL_INTERVAL = 3000 if sys.platform.startswith('linux') else 0
+
     def __init__(self, parent=None):
         self._directory = None
         super(FileTreeWidget, self).__init__(parent)
 
+        self._items_by_name = dict()
+        self._listed_keys = set()
+        self._folder_stamps = dict()
+        self._tasks = dict()
+        self._relist_keys = set()
+        self._pending_entries = list()
+        self._pending_refresh = False
+        self._batch_scheduled = False
+        self._pool = None
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.timeout.connect(self._on_poll)
+
         self.setHeaderLabels(self.HEADER_LABELS)
 
     # ============================================================================================================
@@ -930,46 +1059,46 @@ class FileTreeWidget(TreeWidget, object):
             if item_full_path and path.is_dir(item_full_path):
                 super(FileTreeWidget, self).dropEvent(event)
 
-    def _add_item(self, file_name, parent=None):
+    def closeEvent(self, event):
+        self._poll_timer.stop()
+        if self._pool is not None:
+            self._pool.stop(wait_for_completion=False)
+        super(FileTreeWidget, self).closeEvent(event)
+
+    def clear(self):
+        """
+        Overrides base QTreeWidget clear function to clear also internal caches
+        """
+
+        super(FileTreeWidget, self).clear()
+        self._reset_state()
+
+    def _add_item(self, file_name, parent=None, entry=None):
         """
         Function that adds given file into the tree
         :param file_name: str, name of the file new item will store
         :param parent: QTreeWidgetItem, parent item to append new item into
+        :param entry: tuple(str, bool, float, float) or None, name, whether is a folder, size and modification time of
+            the file. If not given, file is checked in disk
         :return: QTreeWidet, new item added
         """
 
-        try:
-            self.blockSignals(True)
-            self.clearSelection()
-        finally:
-            self.blockSignals(False)
+        if entry is None:
+            try:
+                self.blockSignals(True)
+                self.clearSelection()
+            finally:
+                self.blockSignals(False)
 
-        path_name = file_name
-        found = False
+        # Check if the item should be excluded or not from the tree
+        if self._is_excluded(file_name):
+            return
 
         # Check if item exists
-        if parent:
-            parent_path = self.get_tree_item_path_string(parent)
-            path_name = '{}/{}'.format(parent_path, file_name)
-            for i in range(parent.childCount()):
-                item = parent.child(i)
-                if item.text(0) == file_name:
-                    found = item
-        else:
-            for i in range(self.topLevelItemCount()):
-                item = self.topLevelItem(i)
-                if item.text(0) == file_name:
-                    found = item
-
-        # Check if the item should be excluded or not from the tree
-        exclude = self.EXCLUDE_EXTENSIONS
-        if exclude:
-            split_name = file_name.split('.')
-            extension = split_name[-1]
-            if extension in exclude:
-                return
+        items = self._get_child_items(parent)
+        found = items.get(file_name)
 
-        if found:
+        if found is not None:
             item = found
         else:
             item = self.create_item_widget(file_name)
@@ -981,44 +1110,35 @@ class FileTreeWidget(TreeWidget, object):
             item.setSizeHint(self._title_text_index, size)
 
         # Set item text
-        item_path = path.join_path(self._directory, path_name)
-        sub_files = folder.get_files_and_folders(item_path)
         item.setText(self._title_text_index, file_name)
+        if entry is None:
+            parent_path = self.get_tree_item_path_string(parent) if parent else None
+            path_name = '{}/{}'.format(parent_path, file_name) if parent_path else file_name
+            entry = self._file_entry(path.join_path(self._directory, path_name), self.header().count() > 1)
 
         # Retrieve file properties
-        if self.header().count() > 1:
-            if path.is_file(item_path):
-                size = fileio.get_file_size(item_path)
-                date = fileio.get_last_modified_date(item_path)
-                item.setText(self._title_text_index + 1, str(size))
-                item.setText(self._title_text_index + 2, str(date))
-
-        # Update valid sub files
-        # NOTE: Sub files are added dynamically when the user expands an item
-        if sub_files:
-            self._delete_children(item)
-            exclude_extensions = self.EXCLUDE_EXTENSIONS
-            exclude_count = 0
-            if exclude_extensions:
-                for f in sub_files:
-                    for exclude in exclude_extensions:
-                        if f.endswith(exclude):
-                            exclude_count += 1
-                            break
-
-            if exclude_count != len(sub_files):
-                QTreeWidgetItem(item)
+        _, is_dir, file_size, file_time = entry
+        if self.header().count() > 1 and not is_dir and file_time is not None:
+            item.setText(self._title_text_index + 1, str(file_size))
+            item.setText(self._title_text_index + 2, self._format_time(file_time))
+
+        # NOTE: Sub files are added dynamically when the user expands an item, so folders always show expand indicator
+        item.setChildIndicatorPolicy(
+            QTreeWidgetItem.ShowIndicator if is_dir else QTreeWidgetItem.DontShowIndicatorWhenChildless)
 
         # Add item to tree hierarchy
-        if parent:
-            parent.addChild(item)
+        if found is None:
+            if parent:
+                parent.addChild(item)
+            else:
+                self.addTopLevelItem(item)
+            items[file_name] = item
+        if parent and entry is None:
             try:
                 self.blockSignals(True)
                 self.setCurrentItem(item)
             finally:
                 self.blockSignals(False)
-        else:
-            self.addTopLevelItem(item)
 
         return item
 
@@ -1045,6 +1165,11 @@ class FileTreeWidget(TreeWidget, object):
         :param tree_item: QTreeWidgetItem
         """
 
+        if self.ASYNC_LOADING:
+            self.delete_empty_children(tree_item)
+            self._request_listing(self._item_key(tree_item))
+            return
+
         # Clean item hierarchy first
         self.delete_empty_children(tree_item)
         self._delete_children(tree_item)
@@ -1055,6 +1180,21 @@ class FileTreeWidget(TreeWidget, object):
 
         self._add_items(files, tree_item)
 
+    def _on_item_collapsed(self, item):
+        """
+        Overrides base _on_item_collapsed function to stop checking changes of the collapsed folder
+        :param item: QTreeWidgetItem
+        """
+
+        super(FileTreeWidget, self)._on_item_collapsed(item)
+
+        key = self._item_key(item)
+        self._listed_keys.discard(key)
+        self._folder_stamps.pop(key, None)
+        folder_path = self._key_path(key)
+        if folder_path in self._watcher.directories():
+            self._watcher.removePath(folder_path)
+
     # ============================================================================================================
     # BASE
     # ============================================================================================================
@@ -1066,6 +1206,8 @@ class FileTreeWidget(TreeWidget, object):
         :param refresh: bool, Whether to refresh QTreeWidget items after setting working directory
         """
 
+        if directory != self._directory:
+            self.clear()
         self._directory = directory
         self._name_filter = name_filter
         if refresh:
@@ -1134,12 +1276,7 @@ class FileTreeWidget(TreeWidget, object):
             if item_path.endswith('.py'):
                 fileio.delete_file(name + '.c', item_directory)
 
-        parent = item.parent()
-        if parent:
-            parent.removeChild(item)
-        else:
-            index = self.indexOfTopLevelItem(item)
-            self.takeTopLevelItem(index)
+        self._remove_item(item)
 
     def refresh(self):
         """
@@ -1150,6 +1287,14 @@ class FileTreeWidget(TreeWidget, object):
             self.clear()
             return
 
+        if self.ASYNC_LOADING:
+            self._pending_refresh = True
+            self._request_listing('')
+            for key in list(self._listed_keys):
+                if key:
+                    self._request_listing(key)
+            return
+
         files = self._get_files()
         if not files:
             self.clear()
@@ -1183,6 +1328,357 @@ class FileTreeWidget(TreeWidget, object):
         self.clear()
         self._add_items(files)
 
+    def _reset_state(self):
+        """
+        Internal function that resets the internal caches and cancels pending folder listings
+        """
+
+        self._items_by_name.clear()
+        self._listed_keys.clear()
+        self._folder_stamps.clear()
+        self._tasks.clear()
+        self._relist_keys.clear()
+        self._pending_entries = list()
+        self._pending_refresh = False
+        if self._pool is not None:
+            self._pool.clear()
+        self._poll_timer.stop()
+        directories = self._watcher.directories()
+        if directories:
+            self._watcher.removePaths(directories)
+
+    def _is_excluded(self, file_name):
+        """
+        Internal function that returns whether given file should not be displayed
+        :param file_name: str
+        :return: bool
+        """
+
+        exclude = self.EXCLUDE_EXTENSIONS
+        if not exclude:
+            return False
+
+        return file_name.split('.')[-1] in exclude
+
+    def _item_key(self, tree_item):
+        """
+        Internal function that returns the key that identifies the given item: its path relative to the directory
+        :param tree_item: QTreeWidgetItem or None
+        :return: str
+        """
+
+        if not tree_item:
+            return ''
+
+        return self.get_tree_item_path_string(tree_item) or ''
+
+    def _key_path(self, key):
+        """
+        Internal function that returns the full path of the given item key
+        :param key: str
+        :return: str
+        """
+
+        return path.join_path(self._directory, key) if key else self._directory
+
+    def _get_child_items(self, parent):
+        """
+        Internal function that returns a dictionary with the children of the given item by their names
+        :param parent: QTreeWidgetItem or None
+        :return: dict(str, QTreeWidgetItem)
+        """
+
+        key = self._item_key(parent)
+        parent_item = parent or self.invisibleRootItem()
+        items = self._items_by_name.get(key)
+        if items is None or len(items) != parent_item.childCount():
+            # children were added or removed without using _add_item, so the index is rebuilt
+            items = dict()
+            for i in range(parent_item.childCount()):
+                child = parent_item.child(i)
+                child_name = child.text(self._title_text_index)
+                if child_name:
+                    items[child_name] = child
+            self._items_by_name[key] = items
+
+        return items
+
+    def _find_item(self, key):
+        """
+        Internal function that returns the item with the given key
+        :param key: str
+        :return: QTreeWidgetItem or None, None if the key is the key of the directory or the item does not exist
+        """
+
+        item = None
+        for name in key.split('/') if key else list():
+            item = self._get_child_items(item).get(name)
+            if item is None:
+                return None
+
+        return item
+
+    def _remove_item(self, tree_item):
+        """
+        Internal function that removes given item from the tree
+        :param tree_item: QTreeWidgetItem
+        """
+
+        key = self._item_key(tree_item)
+        parent = tree_item.parent()
+        self._get_child_items(parent).pop(tree_item.text(self._title_text_index), None)
+        for cached_key in list(self._items_by_name.keys()):
+            if cached_key == key or cached_key.startswith(key + '/'):
+                self._items_by_name.pop(cached_key, None)
+                self._listed_keys.discard(cached_key)
+                self._folder_stamps.pop(cached_key, None)
+        if parent:
+            parent.removeChild(tree_item)
+        else:
+            self.takeTopLevelItem(self.indexOfTopLevelItem(tree_item))
+
+    def _get_pool(self):
+        """
+        Internal function that returns the pool used to list folders. Pool is only created when folders are listed in
+        a background thread and, as it is a child of the tree, its threads are shutdown when the tree is destroyed
+        :return: WorkerPool
+        """
+
+        if self._pool is None:
+            self._pool = worker.WorkerPool(max_threads=2, parent=self)
+            self._pool.workCompleted.connect(self._on_work_completed)
+            self._pool.workFailure.connect(self._on_work_failed)
+            self._pool.workCancelled.connect(self._on_work_failed)
+
+        return self._pool
+
+    def _request_listing(self, key):
+        """
+        Internal function that lists the contents of the folder with the given key in a background thread
+        :param key: str
+        """
+
+        folder_path = self._key_path(key)
+        self._listed_keys.add(key)
+        if folder_path not in self._watcher.directories() and os.path.isdir(folder_path):
+            self._watcher.addPath(folder_path)
+        if self.POLL_INTERVAL and not self._poll_timer.isActive():
+            self._poll_timer.start(self.POLL_INTERVAL)
+
+        pool = self._get_pool()
+        task_id = pool.queue_work(
+            self._scan_folder, (folder_path, self.header().count() > 1),
+            priority=worker.WorkerPool.HIGH_PRIORITY, key=('list', folder_path))
+        if task_id in self._tasks:
+            # request was coalesced with a listing that may have already read the folder, so it is listed again
+            # once that listing finishes
+            task = pool.task(task_id)
+            if task is None or task.state != worker.WorkerTask.QUEUED:
+                self._relist_keys.add(key)
+        self._tasks[task_id] = ('list', key, self._directory)
+
+    def _scan_folder(self, params):
+        """
+        Internal function that lists the contents of a folder. It is executed in a worker thread.
+        :param params: tuple(str, bool), folder path and whether to retrieve files size and modification time
+        :return: tuple(float, list(tuple(str, bool, float, float))), folder modification time and folder entries
+        """
+
+        folder_path, file_info = params
+        try:
+            folder_time = os.stat(folder_path).st_mtime
+            scan_entries = folder_utils.scandir(folder_path)
+        except OSError:
+            return None, list()
+
+        entries = list()
+        for scan_entry in scan_entries:
+            if self._is_excluded(scan_entry.name):
+                continue
+            try:
+                is_dir = scan_entry.is_dir()
+                file_size = file_time = None
+                if file_info and not is_dir:
+                    stat = scan_entry.stat()
+                    file_size, file_time = round(stat.st_size * 0.000001, 2), stat.st_mtime
+            except OSError:
+                continue
+            entries.append((scan_entry.name, is_dir, file_size, file_time))
+
+        return folder_time, entries
+
+    def _file_entry(self, file_path, file_info):
+        """
+        Internal function that returns the entry of a single file
+        :param file_path: str
+        :param file_info: bool, whether to retrieve file size and modification time
+        :return: tuple(str, bool, float, float)
+        """
+
+        is_dir = os.path.isdir(file_path)
+        file_size = file_time = None
+        if file_info and not is_dir and os.path.isfile(file_path):
+            stat = os.stat(file_path)
+            file_size, file_time = round(stat.st_size * 0.000001, 2), stat.st_mtime
+
+        return os.path.basename(file_path), is_dir, file_size, file_time
+
+    def _poll_folders(self, folder_paths):
+        """
+        Internal function that returns the modification time of the given folders. It is executed in a worker thread.
+        :param folder_paths: dict(str, str), folder paths by their item keys
+        :return: dict(str, float)
+        """
+
+        folder_times = dict()
+        for key, folder_path in folder_paths.items():
+            try:
+                folder_times[key] = os.stat(folder_path).st_mtime
+            except OSError:
+                folder_times[key] = None
+
+        return folder_times
+
+    def _apply_listing(self, key, folder_time, entries):
+        """
+        Internal function that updates the children of the folder with the given key with the given entries. Removed
+        files are removed at once and new or changed files are inserted in batches.
+        :param key: str
+        :param folder_time: float
+        :param entries: list(tuple(str, bool, float, float))
+        """
+
+        parent = self._find_item(key)
+        if key and parent is None:
+            return
+
+        self._folder_stamps[key] = folder_time
+        names = set(entry[0] for entry in entries)
+        for name, item in list(self._get_child_items(parent).items()):
+            if name not in names:
+                self._remove_item(item)
+
+        self._pending_entries.extend((key, entry) for entry in entries)
+        self._schedule_batch()
+
+    def _schedule_batch(self):
+        """
+        Internal function that schedules the insertion of the next batch of items
+        """
+
+        if self._batch_scheduled:
+            return
+        self._batch_scheduled = True
+        QTimer.singleShot(0, self._process_batch)
+
+    def _process_batch(self):
+        """
+        Internal function that inserts the next batch of pending items into the tree
+        """
+
+        self._batch_scheduled = False
+        if not self._pending_entries:
+            return
+
+        batch = self._pending_entries[:self.BATCH_SIZE]
+        self._pending_entries = self._pending_entries[self.BATCH_SIZE:]
+
+        sorting_enabled = self.isSortingEnabled()
+        self.setSortingEnabled(False)
+        try:
+            parents = dict()
+            for key, entry in batch:
+                if key not in parents:
+                    parents[key] = self._find_item(key)
+                parent = parents[key]
+                if key and parent is None:
+                    continue
+                self._add_item(entry[0], parent, entry=entry)
+        finally:
+            self.setSortingEnabled(sorting_enabled)
+
+        if self._pending_entries:
+            self._schedule_batch()
+        elif self._pending_refresh and not any(task[0] == 'list' for task in self._tasks.values()):
+            self._pending_refresh = False
+            self.refreshed.emit()
+
+    def _on_work_completed(self, task_id, result):
+        """
+        Internal callback function that is called when a background folder listing or folder polling finishes
+        :param task_id: str
+        :param result: object
+        """
+
+        task = self._tasks.pop(task_id, None)
+        if not task or task[2] != self._directory:
+            return
+
+        if task[0] == 'list':
+            folder_time, entries = result
+            self._apply_listing(task[1], folder_time, entries)
+            if task[1] in self._relist_keys:
+                self._relist_keys.discard(task[1])
+                self._request_listing(task[1])
+            if self._pending_refresh and not self._pending_entries and not any(
+                    other_task[0] == 'list' for other_task in self._tasks.values()):
+                self._pending_refresh = False
+                self.refreshed.emit()
+        elif task[0] == 'poll':
+            for key, folder_time in result.items():
+                if key in self._listed_keys and folder_time != self._folder_stamps.get(key):
+                    self._request_listing(key)
+
+    def _on_work_failed(self, task_id, *args):
+        """
+        Internal callback function that is called when a background folder listing fails or is cancelled
+        :param task_id: str
+        """
+
+        self._tasks.pop(task_id, None)
+
+    def _on_directory_changed(self, folder_path):
+        """
+        Internal callback function that is called when the file system watcher detects changes in a listed folder
+        :param folder_path: str
+        """
+
+        if not self._directory:
+            return
+
+        key = os.path.relpath(folder_path, self._directory).replace('\\', '/')
+        key = '' if key == '.' else key
+        if key in self._listed_keys:
+            self._request_listing(key)
+
+    def _on_poll(self):
+        """
+        Internal callback function that is called periodically to check changes in listed folders
+        """
+
+        if not self._directory or not self._listed_keys:
+            self._poll_timer.stop()
+            return
+        if any(task[0] == 'poll' for task in self._tasks.values()):
+            return
+
+        folder_paths = dict((key, self._key_path(key)) for key in self._listed_keys)
+        task_id = self._get_pool().queue_work(self._poll_folders, folder_paths, priority=worker.WorkerPool.LOW_PRIORITY)
+        self._tasks[task_id] = ('poll', None, self._directory)
+
+    @staticmethod
+    def _format_time(file_time):
+        """
+        Internal function that returns the text used to display the given modification time
+        :param file_time: float
+        :return: str
+        """
+
+        date_value = datetime.datetime.fromtimestamp(file_time)
+
+        return '{0}-{1}-{2}  {3:02d}:{4:02d}:{5:02d}'.format(
+            date_value.day, date_value.month, date_value.year, date_value.hour, date_value.minute, date_value.second)
+
 
 class EditFileTreeWidget(base.DirectoryWidget, object):
 
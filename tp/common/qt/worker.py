@@ -7,13 +7,31 @@ Module to define background workers
 
 from __future__ import print_function, division, absolute_import
 
+import time
 import uuid
-from threading import Lock, Condition
+import heapq
+import weakref
+import itertools
+import functools
+import traceback
+from threading import Lock, Condition, Thread, Event
 
-from Qt.QtCore import Signal, QThread
+from Qt.QtCore import Signal, QThread, QObject
+
+from tp.core import log
+from tp.common.python import profiler
+
+logger = log.tpLogger
 
 
 class Worker(QThread, object):
+    """
+    Single thread worker that processes queued work in order.
+
+    ..note:: WorkerPool should be used instead, it processes work in multiple threads with priorities, cancellation
+        and coalescing of duplicated work.
+    """
+
     workCompleted = Signal(str, object)
     workFailure = Signal(str, str)
 
@@ -78,16 +96,401 @@ class Worker(QThread, object):
                     self._wait_condition.wait()
                     if len(self._queue) == 0:
                         continue
-                item_to_process = self._queue.pop()
+                item_to_process = self._queue.pop(0)
 
             if not self._execute_tasks:
                 break
 
-            data = None
             try:
                 data = item_to_process['fn'](item_to_process['params'])
             except Exception as e:
                 if self._execute_tasks:
                     self.workFailure.emit(item_to_process['id'], 'An error ocurred: {}'.format(str(e)))
-                else:
+            else:
+                if self._execute_tasks:
                     self.workCompleted.emit(item_to_process['id'], data)
+
+
+class CancellationToken(object):
+    """
+    Token that allows to cancel a task. Long running work functions should check is_cancelled periodically and
+    return as soon as possible when the task is cancelled.
+    """
+
+    def __init__(self):
+        super(CancellationToken, self).__init__()
+
+        self._event = Event()
+
+    @property
+    def is_cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        """
+        Cancels the task that owns this token
+        """
+
+        self._event.set()
+
+
+class WorkerTask(object):
+    """
+    Class that stores the information of a work queued into a worker pool
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, worker_fn, params, priority=0, key=None, pass_token=False):
+        super(WorkerTask, self).__init__()
+
+        self.id = uuid.uuid4().hex
+        self.fn = worker_fn
+        self.params = params
+        self.priority = priority
+        self.key = key
+        self.pass_token = pass_token
+        self.token = CancellationToken()
+        self.state = self.QUEUED
+        self.submitted_time = time.time()
+        self.started_time = None
+        self.finished_time = None
+
+    def __repr__(self):
+        return '<{} {} ({}, priority: {})>'.format(self.__class__.__name__, self.id, self.state, self.priority)
+
+    def run(self):
+        """
+        Executes work function of the task
+        :return: object, work result
+        """
+
+        if self.pass_token:
+            return self.fn(self.params, cancel_token=self.token)
+
+        return self.fn(self.params)
+
+
+class WorkerPool(QObject, object):
+    """
+    Pool of worker threads that process queued work by priority.
+        - Higher priority work is processed first. Work with the same priority is processed in order.
+        - Each task has a cancellation token. Queued tasks are discarded when cancelled, running tasks are notified.
+        - Work queued with a key is coalesced with the queued or running work with the same key.
+        - Results are delivered through signals, which are queued into the thread the pool lives in (GUI thread).
+        - Queue depth, wait latency and run time metrics are collected.
+    """
+
+    LOW_PRIORITY = -10
+    NORMAL_PRIORITY = 0
+    HIGH_PRIORITY = 10
+    ASAP_PRIORITY = 100
+
+    workCompleted = Signal(str, object)
+    workFailure = Signal(str, str)
+    workCancelled = Signal(str)
+
+    def __init__(self, max_threads=4, parent=None):
+        super(WorkerPool, self).__init__(parent)
+
+        self._max_threads = max(1, max_threads)
+        self._lock = Lock()
+        self._condition = Condition(self._lock)
+        self._heap = list()
+        self._counter = itertools.count()
+        self._tasks = dict()
+        self._keys = dict()
+        self._threads = list()
+        self._running = False
+        self._running_count = 0
+        self._generation = 0
+        self._is_shutdown = False
+
+        self._wait_times = profiler.Histogram('wait')
+        self._run_times = profiler.Histogram('run')
+        self._counters = {'submitted': 0, 'coalesced': 0, 'completed': 0, 'failed': 0, 'cancelled': 0}
+        self._max_queue_depth = 0
+
+        # pool threads must not outlive the pool when its parent destroys it. A weak reference is used so the
+        # connection does not keep the pool alive
+        self.destroyed.connect(functools.partial(_shutdown_pool, weakref.ref(self)))
+
+    # =================================================================================================================
+    # BASE
+    # =================================================================================================================
+
+    def start(self):
+        """
+        Starts worker threads. Threads are also started automatically when work is queued.
+        """
+
+        with self._lock:
+            if self._running or self._is_shutdown:
+                return
+            self._running = True
+            # threads of a previous run may still be finishing their work, they exit once they see a newer generation
+            self._generation += 1
+            self._threads = list()
+            for i in range(self._max_threads):
+                thread = Thread(target=self._run, args=(self._generation,), name='WorkerPool-{}'.format(i))
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, wait_for_completion=True):
+        """
+        Stops worker threads, run this before shutdown. Queued work is cancelled and running work is notified.
+        :param wait_for_completion: bool, whether to wait until running work finishes
+        """
+
+        cancelled, threads = self._stop()
+        for task_id in cancelled:
+            self.workCancelled.emit(task_id)
+
+        if wait_for_completion:
+            for thread in threads:
+                thread.join()
+
+    def shutdown(self):
+        """
+        Stops worker threads without emitting any signal, queued and running work is cancelled. Once shutdown, the
+        pool does not process any more work. Called automatically when the pool is destroyed.
+        """
+
+        with self._lock:
+            self._is_shutdown = True
+
+        self._stop()
+
+    def queue_work(self, worker_fn, params=None, asap=False, priority=NORMAL_PRIORITY, key=None, pass_token=False):
+        """
+        Queues up some work returning a unique id to identify it. Work function is called with the given params.
+        :param worker_fn: callable
+        :param params: object, parameter passed to the work function
+        :param asap: bool, whether work should be processed before any other queued work
+        :param priority: int, work with higher priority is processed first
+        :param key: str or None, if given and there is queued or running work with the same key, no new work is queued
+            and the id of the existing work is returned. Queued work priority is raised if the new priority is higher.
+        :param pass_token: bool, whether to pass the cancellation token to the work function as cancel_token argument
+        :return: str, work id
+        """
+
+        if asap:
+            priority = max(priority, self.ASAP_PRIORITY)
+
+        with self._lock:
+            existing_task = self._tasks.get(self._keys.get(key)) if key is not None else None
+            if existing_task is not None and not existing_task.token.is_cancelled:
+                self._counters['coalesced'] += 1
+                if existing_task.state == WorkerTask.QUEUED and priority > existing_task.priority:
+                    # old heap entry becomes stale and is skipped when popped
+                    existing_task.priority = priority
+                    heapq.heappush(self._heap, (-priority, next(self._counter), existing_task))
+                    self._condition.notify()
+                return existing_task.id
+
+            task = WorkerTask(worker_fn, params, priority=priority, key=key, pass_token=pass_token)
+            self._tasks[task.id] = task
+            if key is not None:
+                self._keys[key] = task.id
+            heapq.heappush(self._heap, (-priority, next(self._counter), task))
+            self._counters['submitted'] += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queue_depth())
+            self._condition.notify()
+            running = self._running or self._is_shutdown
+
+        if not running:
+            self.start()
+
+        return task.id
+
+    def cancel(self, task_id):
+        """
+        Cancels the work with the given id
+        :param task_id: str
+        :return: bool, True if the work was queued or running; False otherwise
+        """
+
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None or task.token.is_cancelled:
+                return False
+            task.token.cancel()
+            was_queued = task.state == WorkerTask.QUEUED
+            if was_queued:
+                self._finish_task(task, WorkerTask.CANCELLED)
+
+        if was_queued:
+            self.workCancelled.emit(task_id)
+
+        return True
+
+    def clear(self):
+        """
+        Cancels all queued work. Running work is not cancelled.
+        """
+
+        with self._lock:
+            cancelled = list()
+            for task in list(self._tasks.values()):
+                if task.state == WorkerTask.QUEUED:
+                    task.token.cancel()
+                    self._finish_task(task, WorkerTask.CANCELLED)
+                    cancelled.append(task.id)
+            self._heap = list()
+
+        for task_id in cancelled:
+            self.workCancelled.emit(task_id)
+
+    def task(self, task_id):
+        """
+        Returns the queued or running task with the given id
+        :param task_id: str
+        :return: WorkerTask or None
+        """
+
+        with self._lock:
+            return self._tasks.get(task_id)
+
+    def metrics(self):
+        """
+        Returns pool metrics: queue depth, running work, work counters and wait and run time statistics (in seconds)
+        :return: dict
+        """
+
+        with self._lock:
+            metrics = {
+                'threads': self._max_threads,
+                'queue_depth': self._queue_depth(),
+                'max_queue_depth': self._max_queue_depth,
+                'running': self._running_count,
+                'wait_time': self._wait_times.to_dict(),
+                'run_time': self._run_times.to_dict()
+            }
+            metrics.update(self._counters)
+
+        return metrics
+
+    # =================================================================================================================
+    # INTERNAL
+    # =================================================================================================================
+
+    def _queue_depth(self):
+        """
+        Internal function that returns the number of queued tasks. Lock must be acquired before calling it.
+        :return: int
+        """
+
+        return len(self._tasks) - self._running_count
+
+    def _stop(self):
+        """
+        Internal function that stops worker threads. Queued work is cancelled and running work is notified.
+        :return: tuple(list(str), list(Thread)), ids of the cancelled queued work and stopped threads
+        """
+
+        with self._lock:
+            self._running = False
+            self._generation += 1
+            cancelled = list()
+            for task in list(self._tasks.values()):
+                task.token.cancel()
+                if task.state == WorkerTask.QUEUED:
+                    self._finish_task(task, WorkerTask.CANCELLED)
+                    cancelled.append(task.id)
+            self._heap = list()
+            self._condition.notify_all()
+            threads = self._threads
+            self._threads = list()
+
+        return cancelled, threads
+
+    def _finish_task(self, task, state):
+        """
+        Internal function that removes finished task from pool. Lock must be acquired before calling it.
+        :param task: WorkerTask
+        :param state: str
+        """
+
+        task.state = state
+        task.finished_time = time.time()
+        self._tasks.pop(task.id, None)
+        if task.key is not None and self._keys.get(task.key) == task.id:
+            self._keys.pop(task.key, None)
+        self._counters[state] += 1
+
+    def _next_task(self, generation):
+        """
+        Internal function that waits until there is work to process and returns it
+        :param generation: int, run generation of the thread asking for work
+        :return: WorkerTask or None, None if the pool was stopped or restarted after the thread was started
+        """
+
+        with self._lock:
+            while True:
+                if not self._running or generation != self._generation:
+                    return None
+                while self._heap:
+                    neg_priority, _, task = heapq.heappop(self._heap)
+                    # skip cancelled tasks and stale entries of tasks which priority was raised
+                    if task.state != WorkerTask.QUEUED or -neg_priority != task.priority:
+                        continue
+                    task.state = WorkerTask.RUNNING
+                    task.started_time = time.time()
+                    self._running_count += 1
+                    self._wait_times.add(task.started_time - task.submitted_time)
+                    return task
+                self._condition.wait()
+
+    def _run(self, generation):
+        """
+        Internal function executed by each worker thread
+        :param generation: int, run generation the thread belongs to
+        """
+
+        while True:
+            task = self._next_task(generation)
+            if task is None:
+                break
+
+            state = WorkerTask.COMPLETED
+            result = error = None
+            try:
+                result = task.run()
+            except Exception as exc:
+                state = WorkerTask.FAILED
+                error = 'An error ocurred: {}'.format(str(exc))
+                logger.debug(traceback.format_exc())
+            if task.token.is_cancelled:
+                state = WorkerTask.CANCELLED
+
+            with self._lock:
+                self._running_count -= 1
+                self._run_times.add(time.time() - task.started_time)
+                self._finish_task(task, state)
+                is_shutdown = self._is_shutdown
+
+            # pool can already be destroyed, so no signals are emitted after shutdown
+            if is_shutdown:
+                continue
+            if state == WorkerTask.COMPLETED:
+                self.workCompleted.emit(task.id, result)
+            elif state == WorkerTask.FAILED:
+                self.workFailure.emit(task.id, error)
+            else:
+                self.workCancelled.emit(task.id)
+
+
+def _shutdown_pool(pool_ref, *args):
+    """
+    Internal function that shutdowns a destroyed worker pool
+    :param pool_ref: weakref.ref, reference to the WorkerPool
+    """
+
+    pool = pool_ref()
+    if pool is not None:
+        pool.shutdown()
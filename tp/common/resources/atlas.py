@@ -0,0 +1,386 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module that contains functions and classes to pack icon themes into a single atlas image and to serve icons from it
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from Qt.QtCore import Qt, QRect
+from Qt.QtGui import QImage, QPixmap, QPainter, QIcon
+
+from tp.core import log
+
+logger = log.tpLogger
+
+ATLAS_VERSION = 2
+ATLAS_EXTENSION = '.atlas.png'
+INDEX_EXTENSION = '.atlas.json'
+
+
+def atlas_paths(theme_folder):
+    """
+    Returns the atlas image and atlas index paths of the given icon theme folder
+    :param theme_folder: str
+    :return: tuple(str, str)
+    """
+
+    theme_folder = os.path.normpath(theme_folder)
+
+    return theme_folder + ATLAS_EXTENSION, theme_folder + INDEX_EXTENSION
+
+
+def file_hash(file_path):
+    """
+    Returns the hash of the contents of the given file
+    :param file_path: str
+    :return: str
+    """
+
+    with open(file_path, 'rb') as open_file:
+        return hashlib.sha1(open_file.read()).hexdigest()
+
+
+def content_signature(files):
+    """
+    Returns a signature of the contents of an icon theme folder
+    :param files: dict(str, list), size, modification time and hash of the icon files by their names
+    :return: str
+    """
+
+    signature = hashlib.sha1()
+    for file_name in sorted(files):
+        signature.update('{}:{}:{};'.format(file_name, files[file_name][0], files[file_name][2]).encode('utf-8'))
+
+    return signature.hexdigest()
+
+
+def _theme_files(theme_folder, extensions):
+    """
+    Internal function that returns the names of the icon files of the given theme folder
+    :param theme_folder: str
+    :param extensions: tuple(str)
+    :return: list(str)
+    """
+
+    return [file_name for file_name in sorted(os.listdir(theme_folder))
+            if os.path.splitext(file_name)[-1].lower() in extensions]
+
+
+def build_atlas(theme_folder, max_width=2048, padding=1, extensions=('.png',)):
+    """
+    Packs all the icons of the given theme folder into a single atlas image and stores an index with the rectangle of
+    each icon within the atlas. Icons are packed in shelves sorted by height.
+    :param theme_folder: str, icon theme folder (for example, icons/default)
+    :param max_width: int, maximum width of the atlas image
+    :param padding: int, space in pixels between icons
+    :param extensions: tuple(str), extensions of the icon files to pack
+    :return: tuple(str, str) or None, atlas image and atlas index paths
+    """
+
+    if not os.path.isdir(theme_folder):
+        logger.warning('Impossible to build atlas because icon theme folder does not exist: {}'.format(theme_folder))
+        return None
+
+    images = list()
+    files = dict()
+    for file_name in _theme_files(theme_folder, extensions):
+        name = os.path.splitext(file_name)[0]
+        file_path = os.path.join(theme_folder, file_name)
+        file_stat = os.stat(file_path)
+        files[file_name] = [file_stat.st_size, file_stat.st_mtime, file_hash(file_path)]
+        image = QImage(file_path)
+        if image.isNull():
+            logger.warning('Impossible to pack icon into atlas: {}'.format(file_name))
+            continue
+        images.append((name, image))
+    if not images:
+        return None
+
+    # Shelf packing: icons sorted by height are placed from left to right, opening a new shelf when full
+    images.sort(key=lambda item: (-item[1].height(), item[0]))
+    rects = dict()
+    x = y = shelf_height = atlas_width = 0
+    for name, image in images:
+        width, height = image.width(), image.height()
+        if x and x + width > max_width:
+            x = 0
+            y += shelf_height + padding
+            shelf_height = 0
+        rects[name] = (x, y, width, height)
+        x += width + padding
+        shelf_height = max(shelf_height, height)
+        atlas_width = max(atlas_width, x - padding)
+    atlas_height = y + shelf_height
+
+    atlas = QImage(atlas_width, atlas_height, QImage.Format_ARGB32_Premultiplied)
+    atlas.fill(Qt.transparent)
+    painter = QPainter(atlas)
+    for name, image in images:
+        painter.drawImage(rects[name][0], rects[name][1], image)
+    painter.end()
+
+    atlas_path, index_path = atlas_paths(theme_folder)
+    if not atlas.save(atlas_path, 'PNG'):
+        logger.warning('Impossible to save atlas image: {}'.format(atlas_path))
+        return None
+
+    index = {
+        'version': ATLAS_VERSION,
+        'extensions': list(extensions),
+        'files': files,
+        'signature': content_signature(files),
+        'icons': rects
+    }
+    with open(index_path, 'w') as index_file:
+        json.dump(index, index_file, sort_keys=True)
+
+    return atlas_path, index_path
+
+
+def build_atlases(icons_folder, **kwargs):
+    """
+    Builds an atlas for each one of the icon themes within the given icons folder
+    :param icons_folder: str, folder containing icon theme folders
+    :param kwargs: dict, extra arguments passed to build_atlas
+    :return: list(tuple(str, str)), atlas image and atlas index paths of all built atlases
+    """
+
+    built = list()
+    for theme_name in sorted(os.listdir(icons_folder)):
+        theme_folder = os.path.join(icons_folder, theme_name)
+        if not os.path.isdir(theme_folder):
+            continue
+        result = build_atlas(theme_folder, **kwargs)
+        if result:
+            built.append(result)
+
+    return built
+
+
+class IconAtlas(object):
+    """
+    Class that serves icons from an atlas image. Atlas image is loaded only once, the first time an icon is requested,
+    and extracted pixmaps are cached.
+    """
+
+    def __init__(self, atlas_path, index_path):
+        super(IconAtlas, self).__init__()
+
+        self._atlas_path = atlas_path
+        self._index_path = index_path
+        self._lock = threading.Lock()
+        self._index = None
+        self._image = None
+        self._pixmaps = dict()
+
+        with open(index_path, 'r') as index_file:
+            self._index = json.load(index_file)
+
+    @classmethod
+    def from_theme_folder(cls, theme_folder):
+        """
+        Returns the atlas of the given icon theme folder. If the atlas does not exist, or it is outdated because
+        icons of the theme folder were added, removed or modified, None is returned.
+        :param theme_folder: str
+        :return: IconAtlas or None
+        """
+
+        atlas_path, index_path = atlas_paths(theme_folder)
+        if not os.path.isfile(atlas_path) or not os.path.isfile(index_path):
+            return None
+
+        try:
+            atlas = cls(atlas_path, index_path)
+        except (IOError, OSError, ValueError):
+            logger.warning('Impossible to read atlas index: {}'.format(index_path))
+            return None
+
+        if atlas.version != ATLAS_VERSION or not atlas.is_up_to_date(theme_folder):
+            return None
+
+        return atlas
+
+    @property
+    def version(self):
+        return self._index.get('version')
+
+    def is_up_to_date(self, theme_folder):
+        """
+        Returns whether the atlas contains the current icons of the given theme folder. Only icons which size or
+        modification time changed since the atlas was built are hashed, so copying or checking out the theme folder
+        does not outdate the atlas if icons contents did not change.
+        :param theme_folder: str
+        :return: bool
+        """
+
+        files = self._index.get('files')
+        if not files:
+            return False
+
+        try:
+            file_names = _theme_files(theme_folder, tuple(self._index.get('extensions', ('.png',))))
+            if set(file_names) != set(files):
+                return False
+            touched = False
+            for file_name in file_names:
+                file_path = os.path.join(theme_folder, file_name)
+                file_stat = os.stat(file_path)
+                size, mtime, stored_hash = files[file_name]
+                if file_stat.st_size != size:
+                    return False
+                if file_stat.st_mtime != mtime:
+                    if file_hash(file_path) != stored_hash:
+                        return False
+                    files[file_name] = [size, file_stat.st_mtime, stored_hash]
+                    touched = True
+        except (IOError, OSError):
+            return False
+
+        if self._index.get('signature') != content_signature(files):
+            return False
+
+        if touched:
+            # stores new modification times, so files are not hashed again the next time
+            try:
+                with open(self._index_path, 'w') as index_file:
+                    json.dump(self._index, index_file, sort_keys=True)
+            except (IOError, OSError):
+                logger.debug('Impossible to update atlas index: {}'.format(self._index_path))
+
+        return True
+
+    def names(self):
+        """
+        Returns the names of all the icons stored in the atlas
+        :return: list(str)
+        """
+
+        return list(self._index.get('icons', dict()).keys())
+
+    def has(self, name):
+        """
+        Returns whether an icon with the given name is stored in the atlas
+        :param name: str
+        :return: bool
+        """
+
+        return name in self._index.get('icons', dict())
+
+    def image(self):
+        """
+        Returns atlas image. It is loaded the first time it is requested.
+        :return: QImage
+        """
+
+        if self._image is None:
+            with self._lock:
+                if self._image is None:
+                    self._image = QImage(self._atlas_path)
+
+        return self._image
+
+    def pixmap(self, name):
+        """
+        Returns the pixmap of the icon with the given name
+        :param name: str
+        :return: QPixmap or None
+        """
+
+        pixmap = self._pixmaps.get(name)
+        if pixmap is not None:
+            return pixmap
+
+        rect = self._index.get('icons', dict()).get(name)
+        if not rect:
+            return None
+        image = self.image()
+        if image.isNull():
+            return None
+
+        pixmap = QPixmap.fromImage(image.copy(QRect(*rect)))
+        self._pixmaps[name] = pixmap
+
+        return pixmap
+
+    def icon(self, name):
+        """
+        Returns the icon with the given name
+        :param name: str
+        :return: QIcon or None
+        """
+
+        pixmap = self.pixmap(name)
+
+        return QIcon(pixmap) if pixmap is not None else None
+
+
+_ATLASES = dict()
+_ATLASES_LOCK = threading.Lock()
+
+
+def get_atlas(theme_folder):
+    """
+    Returns the cached atlas of the given icon theme folder
+    :param theme_folder: str
+    :return: IconAtlas or None
+    """
+
+    theme_folder = os.path.normpath(theme_folder)
+    with _ATLASES_LOCK:
+        if theme_folder not in _ATLASES:
+            _ATLASES[theme_folder] = IconAtlas.from_theme_folder(theme_folder)
+
+        return _ATLASES[theme_folder]
+
+
+def clear_atlases():
+    """
+    Clears all cached atlases
+    """
+
+    with _ATLASES_LOCK:
+        _ATLASES.clear()
+
+
+def benchmark(theme_folder, names=None):
+    """
+    Compares the cost of loading the given icons the first time a tool window is opened (for example, the icons
+    displayed by that window) from loose files and from the atlas of the given theme folder. Loose files cost includes
+    looking for each icon file. Atlas cost includes checking that the atlas is up to date and loading the atlas image.
+    :param theme_folder: str
+    :param names: list(str) or None, names of the icons to load. If not given, all theme icons are loaded
+    :return: dict, times in seconds
+    """
+
+    if names is None:
+        names = [os.path.splitext(file_name)[0] for file_name in _theme_files(theme_folder, ('.png',))]
+
+    start = time.perf_counter()
+    for name in names:
+        icon_path = os.path.join(theme_folder, '{}.png'.format(name))
+        if os.path.isfile(icon_path):
+            QIcon(QPixmap(icon_path))
+    loose_time = time.perf_counter() - start
+
+    check_time = atlas_time = None
+    start = time.perf_counter()
+    atlas = IconAtlas.from_theme_folder(theme_folder)
+    if atlas is not None:
+        check_time = time.perf_counter() - start
+        for name in names:
+            atlas.icon(name)
+        atlas_time = time.perf_counter() - start
+
+    return {'icons': len(names), 'loose': loose_time, 'atlas': atlas_time, 'atlas_check': check_time}
+
+
+if __name__ == '__main__':
+    build_atlases(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'icons'))
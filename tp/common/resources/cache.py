@@ -8,63 +8,290 @@ Module that defines a base class to cache resources
 from __future__ import print_function, division, absolute_import
 
 import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
 
-from Qt.QtCore import Qt, QByteArray
-from Qt.QtGui import QPixmap, QIcon, QPainter
-from Qt.QtSvg import QSvgRenderer
+from Qt.QtGui import QPixmap, QIcon, QColor
+
+from tp.common.svg import rasterizer
+
+# Environment variable that can be used to define the folder where rasterized SVG icons are stored
+DISK_CACHE_ENV_VAR = 'TPDCC_ICON_CACHE'
+
+# Environment variable that can be used to disable the disk cache
+DISK_CACHE_DISABLED_ENV_VAR = 'TPDCC_ICON_CACHE_DISABLED'
+
+
+def default_disk_cache_folder():
+    """
+    Returns default folder where rasterized SVG icons are stored
+    :return: str
+    """
+
+    return os.environ.get(DISK_CACHE_ENV_VAR, '') or os.path.join(tempfile.gettempdir(), 'tpdcc', 'icon_cache')
+
+
+class DiskCache(object):
+    """
+    Persistent cache of rasterized images stored as PNG files. Entries are keyed by the hash of the source file
+    contents and the rasterization options, so they are automatically invalidated when the source file changes.
+    """
+
+    def __init__(self, folder=None):
+        super(DiskCache, self).__init__()
+
+        self._folder = folder or default_disk_cache_folder()
+        self._lock = threading.Lock()
+        self._source_hashes = dict()
+
+    @property
+    def folder(self):
+        return self._folder
+
+    def source_hash(self, file_path):
+        """
+        Returns the hash of the contents of the given file. Hashes are cached in memory by file modification time
+        and size.
+        :param file_path: str
+        :return: str or None
+        """
+
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            return None
+        signature = (file_stat.st_mtime, file_stat.st_size)
+
+        with self._lock:
+            cached = self._source_hashes.get(file_path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        with open(file_path, 'rb') as source_file:
+            file_hash = hashlib.sha1(source_file.read()).hexdigest()
+        with self._lock:
+            self._source_hashes[file_path] = (signature, file_hash)
+
+        return file_hash
+
+    def entry_path(self, file_path, *options):
+        """
+        Returns path of the cache entry for the given file and rasterization options
+        :param file_path: str
+        :param options: list, rasterization options
+        :return: str or None
+        """
+
+        source_hash = self.source_hash(file_path)
+        if not source_hash:
+            return None
+
+        entry_hash = hashlib.sha1('{}:{}'.format(source_hash, options).encode('utf-8')).hexdigest()
+
+        return os.path.join(self._folder, entry_hash[:2], '{}.png'.format(entry_hash))
+
+    def load(self, entry_path):
+        """
+        Loads the pixmap stored in the given cache entry
+        :param entry_path: str
+        :return: QPixmap or None
+        """
+
+        if not entry_path or not os.path.isfile(entry_path):
+            return None
+
+        pixmap = QPixmap(entry_path)
+
+        return None if pixmap.isNull() else pixmap
+
+    def save(self, entry_path, pixmap):
+        """
+        Stores given pixmap in the given cache entry
+        :param entry_path: str
+        :param pixmap: QPixmap
+        :return: bool
+        """
+
+        if not entry_path or pixmap is None or pixmap.isNull():
+            return False
+
+        entry_folder = os.path.dirname(entry_path)
+        try:
+            if not os.path.isdir(entry_folder):
+                os.makedirs(entry_folder)
+        except OSError:
+            return False
+
+        # Write into a temporary file first, so concurrent DCC sessions never read half written entries
+        temp_path = '{}.{}.tmp.png'.format(entry_path, os.getpid())
+        if not pixmap.save(temp_path, 'PNG'):
+            return False
+        try:
+            os.replace(temp_path, entry_path)
+        except OSError:
+            # Other session is reading or storing the entry
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+
+        return True
+
+    def clear(self):
+        """
+        Removes all stored entries
+        """
+
+        for root, _, files in os.walk(self._folder):
+            for file_name in files:
+                if file_name.endswith('.png'):
+                    try:
+                        os.remove(os.path.join(root, file_name))
+                    except OSError:
+                        pass
+        with self._lock:
+            self._source_hashes.clear()
 
 
 class CacheResource(object):
+    """
+    Two level resources cache: a bounded least recently used memory cache keyed by (path, color, size, dpi, opacity)
+    backed, for rasterized SVG resources, by a persistent disk cache of PNG files.
+    """
 
-    _render = QSvgRenderer()
+    DEFAULT_SVG_SIZE = 128
 
-    def __init__(self, cls):
+    def __init__(self, cls, max_size=512, disk_cache=None):
         super(CacheResource, self).__init__()
 
         self._cls = cls
-        self._resources_path_cache = dict()
+        self._max_size = max_size
+        self._lock = threading.RLock()
+        self._resources_path_cache = OrderedDict()
         self._resources_keys_cache = dict()
-        self._resources_names_cache = dict()
-        self._resources_names_keys_mapping = dict()
+        self._hits = 0
+        self._misses = 0
+        self._disk_hits = 0
+
+        if disk_cache is None:
+            disk_cache = issubclass(cls, (QPixmap, QIcon)) and not os.environ.get(DISK_CACHE_DISABLED_ENV_VAR)
+        if disk_cache is True:
+            disk_cache = DiskCache()
+        self._disk_cache = disk_cache or None
 
-    def __call__(self, path, color=None, skip_cache=False):
+    def __call__(self, path, color=None, skip_cache=False, size=None, dpi=None, opacity=1.0):
         if not path or not os.path.isfile(path):
             return None
 
-        key = '{}{}'.format(path.lower(), color or '')
-        resource = self._resources_path_cache.get(key, None)
-        if not resource:
-            if path.endswith('svg'):
-                resource = self._render_svg(path, color)
-            else:
-                resource = self._cls(path)
-                if color:
-                    resource.set_color(color)
-
-            if not skip_cache:
-                self._resources_path_cache.update({key: resource})
-                self._resources_names_cache.update({os.path.basename(path): resource})
-                if hasattr(resource, 'cacheKey'):
-                    self._resources_keys_cache.update({resource.cacheKey(): resource})
-                    self._resources_names_keys_mapping.update({resource.cacheKey(): os.path.basename(path)})
+        color_name = self._color_name(color)
+        key = (os.path.normcase(os.path.normpath(path)), color_name, size, dpi, opacity)
+        if not skip_cache:
+            with self._lock:
+                resource = self._resources_path_cache.pop(key, None)
+                if resource is not None:
+                    self._resources_path_cache[key] = resource
+                    self._hits += 1
+                    return resource
+                self._misses += 1
+
+        if path.lower().endswith('svg'):
+            resource = self._render_svg(path, color_name, size=size, dpi=dpi, opacity=opacity)
+        else:
+            resource = self._cls(path)
+            if color:
+                resource.set_color(color)
+
+        if not skip_cache and resource is not None:
+            self._store(key, resource)
 
         return resource
 
-    def _render_svg(self, svg_path, replace_color=None):
-        if issubclass(self._cls, QIcon) and not replace_color:
+    @property
+    def disk_cache(self):
+        return self._disk_cache
+
+    def resource_from_cache_key(self, cache_key):
+        """
+        Returns the cached resource with the given Qt cache key
+        :param cache_key: int
+        :return: object or None
+        """
+
+        with self._lock:
+            return self._resources_keys_cache.get(cache_key)
+
+    def stats(self):
+        """
+        Returns cache statistics
+        :return: dict
+        """
+
+        with self._lock:
+            return {
+                'size': len(self._resources_path_cache), 'max_size': self._max_size, 'hits': self._hits,
+                'misses': self._misses, 'disk_hits': self._disk_hits
+            }
+
+    def clear(self, disk=False):
+        """
+        Removes all cached resources
+        :param disk: bool, whether to also clear disk cache
+        """
+
+        with self._lock:
+            self._resources_path_cache.clear()
+            self._resources_keys_cache.clear()
+        if disk and self._disk_cache:
+            self._disk_cache.clear()
+
+    def _store(self, key, resource):
+        with self._lock:
+            self._resources_path_cache[key] = resource
+            if hasattr(resource, 'cacheKey'):
+                self._resources_keys_cache[resource.cacheKey()] = resource
+            while self._max_size is not None and len(self._resources_path_cache) > self._max_size:
+                _, evicted = self._resources_path_cache.popitem(last=False)
+                if hasattr(evicted, 'cacheKey'):
+                    self._resources_keys_cache.pop(evicted.cacheKey(), None)
+
+    def _color_name(self, color):
+        if color is None:
+            return None
+        if isinstance(color, QColor):
+            return color.name()
+        if isinstance(color, (list, tuple)):
+            return QColor(*color).name()
+
+        return str(color)
+
+    def _render_svg(self, svg_path, replace_color=None, size=None, dpi=None, opacity=1.0):
+        if issubclass(self._cls, QIcon) and not replace_color and not size and opacity >= 1.0:
             return QIcon(svg_path)
 
-        with open(svg_path, 'r+') as f:
-            data_content = f.read()
-            if replace_color is not None:
-                data_content = data_content.replace('#555555', replace_color)
-                self._render.load(QByteArray(data_content))
-                pix = QPixmap(128, 128)
-                pix.fill(Qt.transparent)
-                painter = QPainter(pix)
-                self._render.render(painter)
-                painter.end()
-                if issubclass(self._cls, QPixmap):
-                    return pix
-                else:
-                    return self._cls(pix)
+        size = size or self.DEFAULT_SVG_SIZE
+        dpi = dpi or 1.0
+
+        entry_path = None
+        if self._disk_cache:
+            entry_path = self._disk_cache.entry_path(svg_path, replace_color, size, dpi, opacity)
+            pix = self._disk_cache.load(entry_path)
+            if pix is not None:
+                with self._lock:
+                    self._disk_hits += 1
+                pix.setDevicePixelRatio(dpi)
+                return pix if issubclass(self._cls, QPixmap) else self._cls(pix)
+
+        # rasterizer creates its own renderer per call, so resources can be rendered from different threads
+        pixel_size = int(round(size * dpi))
+        image = rasterizer.render_svg_image(
+            svg_path, width=pixel_size, height=pixel_size, replace_color=replace_color, opacity=opacity)
+        pix = QPixmap.fromImage(image)
+
+        if self._disk_cache:
+            self._disk_cache.save(entry_path, pix)
+
+        pix.setDevicePixelRatio(dpi)
+        if issubclass(self._cls, QPixmap):
+            return pix
+        else:
+            return self._cls(pix)
@@ -10,10 +10,10 @@ from __future__ import print_function, division, absolute_import
 import copy
 
 from Qt.QtCore import Qt, QSize
-from Qt.QtGui import QIcon, QColor, QPainter, QPen
+from Qt.QtGui import QIcon, QColor, QPainter, QPen, QPixmap
 
 from tp.common.python import helpers
-from tp.common.resources import utils, color, cache, pixmap as px
+from tp.common.resources import utils, color, cache, imageops, pixmap as px
 
 
 class Icon(QIcon, object):
@@ -123,26 +123,13 @@ class Icon(QIcon, object):
         :param size: QSize, size of the icon
         """
 
-        if isinstance(new_color, str):
-            new_color = color.Color.from_string(new_color)
-        elif isinstance(new_color, (list, tuple)):
-            new_color = color.Color(*new_color)
-
         if self.isNull():
             return
 
-        icon = self
-        size = size or icon.availableSizes()[0]
-        pixmap = icon.pixmap(size)
-
-        painter = QPainter(pixmap)
-        painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
-        painter.setBrush(new_color)
-        painter.setPen(new_color)
-        painter.drawRect(pixmap.rect())
-        painter.end()
+        size = size or self.availableSizes()[0]
+        image = imageops.ImagePipeline().colorize(new_color).apply(self, size=size)
 
-        icon = Icon(pixmap)
+        icon = Icon(QPixmap.fromImage(image))
         self.swap(icon)
 
     def set_badge(self, x, y, w, h, color=None):
@@ -306,25 +293,21 @@ def colorize_layered_icon(
     col = colors.pop(0)
     scale = icon_scaling.pop(0)
 
-    if col is not None:
-        icon_pixmap = px.colorize_pixmap(icon_largest.pixmap(orig_size * scale), col)
-    else:
-        icon_pixmap = icon_largest.pixmap(orig_size * scale)
-
+    # all layers are processed as images in a single pipeline, which results are cached by operation chain
+    pipeline = imageops.ImagePipeline().colorize(col)
     for i, _icon in enumerate(icons):
         if _icon is None:
             continue
-        overlay_pixmap = icons[i].pixmap(orig_size * icon_scaling[i])
-        px.overlay_pixmap(icon_pixmap, overlay_pixmap, colors[i])
-
+        pipeline.overlay(icons[i], colors[i], size=orig_size * icon_scaling[i])
     if tint_color is not None:
-        px.tint_pixmap(icon_pixmap, tint_color, composition_mode=composition)
+        pipeline.tint(tint_color, composition_mode=composition)
+    pipeline.scale(QSize(size, size))
 
-    icon_pixmap = icon_pixmap.scaled(QSize(size, size), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    icon_pixmap = QPixmap.fromImage(pipeline.apply(icon_largest, size=orig_size * scale))
 
     icon = Icon(icon_pixmap)
     if grayscale:
-        icon_pixmap = px.grayscale_pixmap(icon_pixmap)
+        icon_pixmap = QPixmap.fromImage(pipeline.grayscale().apply(icon_largest, size=orig_size * scale))
         icon = Icon(icon_pixmap)
         icon.addPixmap(icon.pixmap(size, QIcon.Disabled))   # TODO: Use tint instead
 
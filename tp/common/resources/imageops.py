@@ -0,0 +1,664 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module that contains functions and classes to process images (colorize, tint, grayscale, overlay, ...) in batches.
+Operations work on QImage buffers, so they can be executed outside of the GUI thread, and NumPy is used to process
+the raw image bits when available.
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from Qt.QtCore import Qt, QSize
+from Qt.QtGui import QImage, QPixmap, QIcon, QColor, QPainter
+
+# concurrent.futures is not available in Python 2 (unless futures backport is installed), in that case images are
+# processed serially
+FUTURES_AVAILABLE = True
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    FUTURES_AVAILABLE = False
+
+try:
+    import numpy
+    NUMPY_AVAILABLE = True
+except ImportError:
+    numpy = None
+    NUMPY_AVAILABLE = False
+
+from tp.common.python import helpers
+from tp.common.resources import color
+
+IMAGE_FORMAT = QImage.Format_ARGB32_Premultiplied
+
+# channel indices of the ARGB32 pixels in memory
+if sys.byteorder == 'little':
+    _RED, _GREEN, _BLUE, _ALPHA = 2, 1, 0, 3
+else:
+    _RED, _GREEN, _BLUE, _ALPHA = 1, 2, 3, 0
+
+
+def color_tuple(new_color):
+    """
+    Returns given color as a RGBA tuple. Tuples are hashable, so they can be used as cache keys.
+
+    :param tuple(int, int, int) or tuple(int, int, int, int) or str or QColor new_color: color to convert.
+    :return: color in tuple format (255, 255, 255, 255).
+    :rtype: tuple(int, int, int, int) or None
+    """
+
+    if new_color is None:
+        return None
+    if helpers.is_string(new_color):
+        new_color = color.Color.from_string(new_color)
+    elif isinstance(new_color, (tuple, list)):
+        new_color = QColor(*new_color)
+    if not isinstance(new_color, QColor):
+        return None
+
+    return new_color.red(), new_color.green(), new_color.blue(), new_color.alpha()
+
+
+def to_image(source, size=None):
+    """
+    Returns a premultiplied ARGB32 image from the given source.
+
+    ..note:: QPixmap and QIcon sources can only be converted in the GUI thread.
+
+    :param QImage or QPixmap or QIcon or str source: source image, pixmap, icon or image file path.
+    :param QSize or int size: size used to retrieve icon pixmaps. If not given, icon largest size is used.
+    :return: image.
+    :rtype: QImage
+    """
+
+    if isinstance(source, QImage):
+        image = source
+    elif isinstance(source, QPixmap):
+        image = source.toImage()
+    elif isinstance(source, QIcon):
+        if size is None:
+            sizes = source.availableSizes()
+            size = max(sizes, key=lambda s: s.width() * s.height()) if sizes else QSize(16, 16)
+        elif isinstance(size, (int, float)):
+            size = QSize(int(size), int(size))
+        image = source.pixmap(size).toImage()
+    elif helpers.is_string(source):
+        image = QImage(source)
+    else:
+        image = QImage()
+
+    if image.isNull() or image.format() == IMAGE_FORMAT:
+        return image
+
+    return image.convertToFormat(IMAGE_FORMAT)
+
+
+def source_key(source, size=None):
+    """
+    Returns a hashable key that identifies the given image source.
+
+    :param QImage or QPixmap or QIcon or str source: source image, pixmap, icon or image file path.
+    :param QSize or int size: size used to retrieve icon pixmaps.
+    :return: source key.
+    :rtype: tuple or None
+    """
+
+    if isinstance(size, QSize):
+        size = (size.width(), size.height())
+    if helpers.is_string(source):
+        return 'path', os.path.normcase(os.path.normpath(source)), size
+    elif isinstance(source, (QImage, QPixmap, QIcon)):
+        return source.__class__.__name__, source.cacheKey(), size
+
+    return None
+
+
+def numpy_view(image):
+    """
+    Returns a NumPy array with shape (height, width, 4) that shares memory with the given image. Modifying the array
+    modifies the image.
+
+    :param QImage image: 32 bits image.
+    :return: image view or None if NumPy is not available or image bits cannot be accessed.
+    :rtype: numpy.ndarray or None
+    """
+
+    if not NUMPY_AVAILABLE or image.isNull() or image.depth() != 32:
+        return None
+
+    try:
+        bits = image.bits()
+        byte_count = image.bytesPerLine() * image.height()
+        if hasattr(bits, 'setsize'):
+            # PyQt returns a sip.voidptr
+            bits.setsize(byte_count)
+        buffer = numpy.frombuffer(bits, dtype=numpy.uint8, count=byte_count)
+    except (TypeError, ValueError):
+        return None
+    if not buffer.flags.writeable:
+        return None
+
+    return buffer.reshape(image.height(), image.bytesPerLine())[:, :image.width() * 4].reshape(
+        image.height(), image.width(), 4)
+
+
+def colorize_image(image, new_color):
+    """
+    Colorizes the given image with a new color based on its alpha channel.
+
+    :param QImage image: premultiplied ARGB32 image to colorize.
+    :param tuple(int, int, int) or str or QColor new_color: new color in tuple format (255, 255, 255).
+    :return: colorized image.
+    :rtype: QImage
+
+    .. note:: no new image is generated, source image is modified
+    """
+
+    rgba = color_tuple(new_color)
+    if not rgba or image.isNull():
+        return image
+
+    view = numpy_view(image)
+    if view is not None:
+        alpha = view[..., _ALPHA].astype(numpy.uint16)
+        if rgba[3] < 255:
+            alpha = alpha * rgba[3] // 255
+            view[..., _ALPHA] = alpha
+        for channel, value in ((_RED, rgba[0]), (_GREEN, rgba[1]), (_BLUE, rgba[2])):
+            view[..., channel] = alpha * value // 255
+        return image
+
+    painter = QPainter(image)
+    painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
+    painter.fillRect(image.rect(), QColor(*rgba))
+    painter.end()
+
+    return image
+
+
+def tint_image(image, tint_color=(255, 255, 255, 100), composition_mode=QPainter.CompositionMode_Plus):
+    """
+    Tints given image with different composition modes. Tint is only applied on the visible pixels of the image.
+
+    :param QImage image: premultiplied ARGB32 image to tint.
+    :param tuple(int, int, int) or str or QColor tint_color: tint color in tuple format (255, 255, 255).
+    :param QPainter.CompositionMode composition_mode: composition mode used to tint the image.
+    :return: tinted image.
+    :rtype: QImage
+
+    .. note:: no new image is generated, source image is modified
+    """
+
+    rgba = color_tuple(tint_color)
+    if not rgba or image.isNull():
+        return image
+    composition_mode = QPainter.CompositionMode_Plus if composition_mode is None else composition_mode
+
+    view = numpy_view(image) if composition_mode == QPainter.CompositionMode_Plus else None
+    if view is not None:
+        # tint color is masked by the alpha of the image, so antialiased edges are tinted proportionally
+        alpha = view[..., _ALPHA].astype(numpy.uint16)
+        for channel, value in ((_RED, rgba[0]), (_GREEN, rgba[1]), (_BLUE, rgba[2]), (_ALPHA, 255)):
+            tint = alpha * (value * rgba[3] // 255) // 255
+            view[..., channel] = numpy.minimum(view[..., channel].astype(numpy.uint16) + tint, 255)
+        return image
+
+    over_image = QImage(image.size(), IMAGE_FORMAT)
+    over_image.fill(QColor(*rgba))
+    painter = QPainter(over_image)
+    painter.setCompositionMode(QPainter.CompositionMode_DestinationIn)
+    painter.drawImage(0, 0, image)
+    painter.end()
+
+    painter = QPainter(image)
+    painter.setCompositionMode(composition_mode)
+    painter.drawImage(0, 0, over_image)
+    painter.end()
+
+    return image
+
+
+def grayscale_image(image):
+    """
+    Grayscales given image keeping its alpha channel.
+
+    :param QImage image: premultiplied ARGB32 image to grayscale.
+    :return: grayscale image.
+    :rtype: QImage
+
+    .. note:: no new image is generated, source image is modified
+    """
+
+    if image.isNull():
+        return image
+
+    view = numpy_view(image)
+    if view is not None:
+        # same weights used by qGray
+        gray = (view[..., _RED].astype(numpy.uint16) * 11 + view[..., _GREEN].astype(numpy.uint16) * 16 +
+                view[..., _BLUE].astype(numpy.uint16) * 5) // 32
+        for channel in (_RED, _GREEN, _BLUE):
+            view[..., channel] = gray
+        return image
+
+    alpha = image.alphaChannel()
+    try:
+        gray = image.convertToFormat(QImage.Format_Grayscale8)
+    except AttributeError:
+        return image
+    gray = gray.convertToFormat(IMAGE_FORMAT)
+    gray.setAlphaChannel(alpha)
+
+    # copy grayscale pixels into the source image, so it is modified in place as done by the NumPy path
+    painter = QPainter(image)
+    painter.setCompositionMode(QPainter.CompositionMode_Source)
+    painter.drawImage(0, 0, gray)
+    painter.end()
+
+    return image
+
+
+def overlay_image(image, over_image, overlay_color=None, align=Qt.AlignCenter):
+    """
+    Overlays one image over the other.
+
+    :param QImage image: base image to overlay over_image on top.
+    :param QImage over_image: image to overlay on top of image.
+    :param tuple(int, int, int) or str or QColor overlay_color: overlay color in tuple format (255, 255, 255).
+    :param Qt.Alignment align: overlay alignment mode.
+    :return: image with the overlay.
+    :rtype: QImage
+
+    .. note:: no new image is generated, source image is modified
+    """
+
+    if image.isNull() or over_image.isNull():
+        return image
+
+    if overlay_color is not None:
+        over_image = colorize_image(QImage(over_image), overlay_color)
+
+    x = y = 0
+    if align == Qt.AlignCenter:
+        x = (image.width() - over_image.width()) // 2
+        y = (image.height() - over_image.height()) // 2
+
+    painter = QPainter(image)
+    painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+    painter.drawImage(x, y, over_image)
+    painter.end()
+
+    return image
+
+
+def opacity_image(image, opacity):
+    """
+    Changes the opacity of the given image.
+
+    :param QImage image: premultiplied ARGB32 image.
+    :param float opacity: opacity value between 0.0 and 1.0.
+    :return: image with new opacity.
+    :rtype: QImage
+
+    .. note:: no new image is generated, source image is modified
+    """
+
+    if image.isNull() or opacity >= 1.0:
+        return image
+
+    view = numpy_view(image)
+    if view is not None:
+        view[...] = (view.astype(numpy.float32) * max(0.0, opacity)).astype(numpy.uint8)
+        return image
+
+    painter = QPainter(image)
+    painter.setCompositionMode(QPainter.CompositionMode_DestinationIn)
+    painter.fillRect(image.rect(), QColor(0, 0, 0, int(255 * max(0.0, opacity))))
+    painter.end()
+
+    return image
+
+
+def scale_image(image, size):
+    """
+    Scales given image keeping its aspect ratio using smooth transformation.
+
+    :param QImage image: image to scale.
+    :param QSize or int size: size to scale to.
+    :return: scaled image.
+    :rtype: QImage
+
+    .. note:: new image is generated and returned
+    """
+
+    if image.isNull():
+        return image
+    if not isinstance(size, QSize):
+        size = QSize(int(size), int(size))
+
+    return image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+class ImagePipeline(object):
+    """
+    Chain of image operations that can be applied to many images in one pass. Operations are stored as hashable
+    tuples, so the results of the pipeline are cached by source and operation chain.
+
+    pipeline = ImagePipeline().colorize((255, 0, 0)).tint((255, 255, 255, 50)).scale(32)
+    images = pipeline.apply_many(['icon1.png', 'icon2.png'], threads=4)
+    """
+
+    OPERATIONS = {
+        'colorize': colorize_image,
+        'tint': tint_image,
+        'grayscale': grayscale_image,
+        'overlay': overlay_image,
+        'opacity': opacity_image,
+        'scale': scale_image
+    }
+
+    def __init__(self, operations=None, cache=True):
+        super(ImagePipeline, self).__init__()
+
+        self._operations = list(operations or list())
+        self._overlays = dict()             # stores overlay images by their source key
+        self._cache = cache
+
+    def __len__(self):
+        return len(self._operations)
+
+    # =================================================================================================================
+    # PROPERTIES
+    # =================================================================================================================
+
+    @property
+    def key(self):
+        return tuple(self._operations)
+
+    # =================================================================================================================
+    # OPERATIONS
+    # =================================================================================================================
+
+    def colorize(self, new_color):
+        """
+        Adds a colorize operation into the pipeline.
+
+        :param tuple(int, int, int) or str or QColor new_color: new color in tuple format (255, 255, 255).
+        :return: pipeline.
+        :rtype: ImagePipeline
+        """
+
+        rgba = color_tuple(new_color)
+        if rgba:
+            self._operations.append(('colorize', rgba))
+
+        return self
+
+    def tint(self, tint_color=(255, 255, 255, 100), composition_mode=QPainter.CompositionMode_Plus):
+        """
+        Adds a tint operation into the pipeline.
+
+        :param tuple(int, int, int) or str or QColor tint_color: tint color in tuple format (255, 255, 255).
+        :param QPainter.CompositionMode composition_mode: composition mode used to tint the image.
+        :return: pipeline.
+        :rtype: ImagePipeline
+        """
+
+        rgba = color_tuple(tint_color)
+        if rgba:
+            self._operations.append(('tint', rgba, composition_mode))
+
+        return self
+
+    def grayscale(self):
+        """
+        Adds a grayscale operation into the pipeline.
+
+        :return: pipeline.
+        :rtype: ImagePipeline
+        """
+
+        self._operations.append(('grayscale',))
+
+        return self
+
+    def overlay(self, over_source, overlay_color=None, align=Qt.AlignCenter, size=None):
+        """
+        Adds an overlay operation into the pipeline.
+
+        :param QImage or QPixmap or QIcon or str over_source: image to overlay on top.
+        :param tuple(int, int, int) or str or QColor overlay_color: overlay color in tuple format (255, 255, 255).
+        :param Qt.Alignment align: overlay alignment mode.
+        :param QSize or int size: size used to retrieve icon pixmaps.
+        :return: pipeline.
+        :rtype: ImagePipeline
+        """
+
+        over_key = source_key(over_source, size)
+        if over_key is None:
+            return self
+
+        # overlays are converted into images here, so pipeline can be applied outside the GUI thread
+        self._overlays[over_key] = to_image(over_source, size)
+        self._operations.append(('overlay', over_key, color_tuple(overlay_color), int(align) if align else align))
+
+        return self
+
+    def opacity(self, opacity):
+        """
+        Adds an opacity operation into the pipeline.
+
+        :param float opacity: opacity value between 0.0 and 1.0.
+        :return: pipeline.
+        :rtype: ImagePipeline
+        """
+
+        if opacity < 1.0:
+            self._operations.append(('opacity', float(opacity)))
+
+        return self
+
+    def scale(self, size):
+        """
+        Adds a scale operation into the pipeline.
+
+        :param QSize or int size: size to scale to.
+        :return: pipeline.
+        :rtype: ImagePipeline
+        """
+
+        if isinstance(size, QSize):
+            size = (size.width(), size.height())
+        else:
+            size = (int(size), int(size))
+        self._operations.append(('scale', size))
+
+        return self
+
+    # =================================================================================================================
+    # BASE
+    # =================================================================================================================
+
+    def apply(self, source, size=None):
+        """
+        Applies all the operations of the pipeline to the given source.
+
+        :param QImage or QPixmap or QIcon or str source: source image, pixmap, icon or image file path.
+        :param QSize or int size: size used to retrieve icon pixmaps.
+        :return: processed image.
+        :rtype: QImage
+        """
+
+        return self._apply(source, source_key(source, size), size=size)
+
+    def apply_many(self, sources, size=None, threads=None):
+        """
+        Applies all the operations of the pipeline to the given sources.
+
+        :param list(QImage or QPixmap or QIcon or str) sources: source images, pixmaps, icons or image file paths.
+        :param QSize or int size: size used to retrieve icon pixmaps.
+        :param int or None threads: number of threads used to process the images. If not given, images are processed
+            in the current thread.
+        :return: processed images, in the same order as sources.
+        :rtype: list(QImage)
+        """
+
+        if not threads:
+            return [self.apply(source, size=size) for source in sources]
+
+        return self._apply_jobs(self._prepare_jobs(sources, size), threads)
+
+    def apply_async(self, sources, callback=None, size=None, threads=4):
+        """
+        Applies all the operations of the pipeline to the given sources in background threads.
+
+        :param list(QImage or QPixmap or QIcon or str) sources: source images, pixmaps, icons or image file paths.
+        :param callable callback: function called with the list of processed images once all images are processed.
+            It is called from a background thread, so it should emit a Qt signal if GUI needs to be updated.
+        :param QSize or int size: size used to retrieve icon pixmaps.
+        :param int threads: number of threads used to process the images.
+        :return: thread that processes the images.
+        :rtype: threading.Thread
+        """
+
+        jobs = self._prepare_jobs(sources, size)
+
+        def _run():
+            images = self._apply_jobs(jobs, threads)
+            if callback:
+                callback(images)
+
+        thread = threading.Thread(target=_run)
+        thread.daemon = True
+        thread.start()
+
+        return thread
+
+    # =================================================================================================================
+    # INTERNAL
+    # =================================================================================================================
+
+    def _prepare_jobs(self, sources, size):
+        """
+        Internal function that returns the source and cache key of each one of the given sources. Pixmaps and icons
+        are converted into images, because they can only be converted in the GUI thread.
+
+        :param list(QImage or QPixmap or QIcon or str) sources: source images, pixmaps, icons or image file paths.
+        :param QSize or int size: size used to retrieve icon pixmaps.
+        :return: list of sources and their cache keys.
+        :rtype: list(tuple(QImage or str, tuple))
+        """
+
+        jobs = list()
+        for source in sources:
+            key = source_key(source, size)
+            if not helpers.is_string(source) and not isinstance(source, QImage):
+                source = to_image(source, size)
+            jobs.append((source, key))
+
+        return jobs
+
+    def _apply_jobs(self, jobs, threads):
+        """
+        Internal function that applies all the operations of the pipeline to the sources of the given jobs.
+
+        :param list(tuple(QImage or str, tuple)) jobs: list of sources and their cache keys.
+        :param int threads: number of threads used to process the images.
+        :return: processed images, in the same order as jobs.
+        :rtype: list(QImage)
+        """
+
+        if not FUTURES_AVAILABLE:
+            return [self._apply(*job) for job in jobs]
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(lambda job: self._apply(*job), jobs))
+
+    def _apply(self, source, key, size=None):
+        """
+        Internal function that applies all the operations of the pipeline to the given source.
+
+        :param QImage or QPixmap or QIcon or str source: source image, pixmap, icon or image file path.
+        :param tuple or None key: key that identifies the source.
+        :param QSize or int size: size used to retrieve icon pixmaps.
+        :return: processed image.
+        :rtype: QImage
+        """
+
+        cache_key = (key, self.key) if self._cache and key is not None else None
+        if cache_key is not None:
+            image = ImageOpsCache.get(cache_key)
+            if image is not None:
+                return image
+
+        image = to_image(source, size)
+        if not image.isNull():
+            # copy source image, so original one is never modified
+            image = image.copy()
+            for operation in self._operations:
+                image = self._apply_operation(image, operation)
+
+        if cache_key is not None and not image.isNull():
+            ImageOpsCache.put(cache_key, image)
+
+        return image
+
+    def _apply_operation(self, image, operation):
+        """
+        Internal function that applies given operation to the given image.
+
+        :param QImage image: image to process.
+        :param tuple operation: operation name and its arguments.
+        :return: processed image.
+        :rtype: QImage
+        """
+
+        name, args = operation[0], operation[1:]
+        if name == 'overlay':
+            args = (self._overlays[args[0]],) + args[1:]
+        elif name == 'scale':
+            args = (QSize(*args[0]),)
+
+        return self.OPERATIONS[name](image, *args)
+
+
+class _ImageOpsCache(object):
+    """
+    Bounded least recently used cache of processed images keyed by source and operation chain.
+    """
+
+    def __init__(self, max_size=512):
+        super(_ImageOpsCache, self).__init__()
+
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._images = OrderedDict()
+
+    def __len__(self):
+        return len(self._images)
+
+    def get(self, key):
+        with self._lock:
+            image = self._images.pop(key, None)
+            if image is not None:
+                self._images[key] = image
+            return image
+
+    def put(self, key, image):
+        with self._lock:
+            self._images[key] = image
+            while len(self._images) > self._max_size:
+                self._images.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+
+
+ImageOpsCache = _ImageOpsCache()
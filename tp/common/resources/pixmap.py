@@ -8,7 +8,7 @@ Module that contains base class for Qt pixmaps
 from __future__ import print_function, division, absolute_import
 
 from Qt.QtCore import Qt, QByteArray, QFileInfo
-from Qt.QtGui import QPixmap, QImage, QColor, QPainter, QBrush, QIcon
+from Qt.QtGui import QPixmap, QImage, QPainter, QBrush, QIcon
 
 # some PySide implementations (such as MoBu 2018) does not support QSvgRenderer
 SVG_RENDERER_AVAILABLE = True
@@ -18,7 +18,8 @@ except ImportError:
     SVG_RENDERER_AVAILABLE = False
 
 from tp.common.python import helpers
-from tp.common.resources import cache, color
+from tp.common.svg import rasterizer
+from tp.common.resources import cache, color, imageops
 
 
 def colorize_pixmap(pixmap, new_color):
@@ -30,16 +31,12 @@ def colorize_pixmap(pixmap, new_color):
     :return: colorized pixmap.
     :rtype: QPixmap
     """
-    if isinstance(new_color, str):
-        new_color = color.Color.from_string(new_color)
-    elif isinstance(new_color, (tuple, list)):
-        new_color = color.Color(*new_color)
-    if not new_color:
+
+    if not new_color or pixmap.isNull():
         return pixmap
 
-    mask = pixmap.mask()
-    pixmap.fill(new_color)
-    pixmap.setMask(mask)
+    image = imageops.colorize_image(imageops.to_image(pixmap), new_color)
+    pixmap.convertFromImage(image)
 
     return pixmap
 
@@ -89,14 +86,11 @@ def tint_pixmap(pixmap, tint_color=(255, 255, 255, 100), composition_mode=QPaint
     .. note:: no new pixmap is generated, source pixmap is modified
     """
 
-    tint_color = QColor(*tint_color)
-    over_pixmap = QPixmap(pixmap.width(), pixmap.height())
-    over_pixmap.fill(tint_color)
-    over_pixmap.setMask(pixmap.mask())
-    painter = QPainter(pixmap)
-    painter.setCompositionMode(composition_mode)
-    painter.drawPixmap(0, 0, over_pixmap.width(), over_pixmap.height(), over_pixmap)
-    painter.end()
+    if pixmap.isNull():
+        return
+
+    image = imageops.tint_image(imageops.to_image(pixmap), tint_color, composition_mode=composition_mode)
+    pixmap.convertFromImage(image)
 
 
 def grayscale_pixmap(pixmap):
@@ -110,16 +104,9 @@ def grayscale_pixmap(pixmap):
     .. note:: new pixmap is generated and returned
     """
 
-    image = pixmap.toImage()
-    alpha = image.alphaChannel()
-    try:
-        gray = image.convertToFormat(QImage.Format_Grayscale8)
-    except AttributeError:
-        gray = image
-    image = gray.convertToFormat(QImage.Format_ARGB32)
-    image.setAlphaChannel(alpha)
+    image = imageops.grayscale_image(imageops.to_image(pixmap).copy())
 
-    return QPixmap(image)
+    return QPixmap.fromImage(image)
 
 
 def load_svg_pixmap(pixmap_path, size=(20, 20)):
@@ -134,10 +121,7 @@ def load_svg_pixmap(pixmap_path, size=(20, 20)):
     if not SVG_RENDERER_AVAILABLE:
         return None
 
-    svg_renderer = QSvgRenderer(pixmap_path)
-    image = QImage(size[0], size[1], QImage.Format_ARGB32)
-    image.fill(0x00000000)
-    svg_renderer.render(QPainter(image))
+    image = rasterizer.render_svg_image(pixmap_path, width=size[0], height=size[1])
     pixmap = QPixmap.fromImage(image)
 
     return pixmap
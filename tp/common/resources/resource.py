@@ -10,7 +10,7 @@ from __future__ import print_function, division, absolute_import
 import os
 
 from tp.common.python import folder, path
-from tp.common.resources import utils, pixmap as pixmap_resource, icon as icon_resource, theme as theme_resource
+from tp.common.resources import utils, atlas, pixmap as pixmap_resource, icon as icon_resource, theme as theme_resource
 
 
 class Resource(object):
@@ -208,6 +208,14 @@ class Resource(object):
         :return: icon_resource.Icon
         """
 
+        # Icons are served from the theme atlas if available, falling back to loose files otherwise
+        if color is None and not skip_cache and extension.lstrip('.') == 'png':
+            theme_atlas = atlas.get_atlas(self._get(category, theme) if theme else self._get(category))
+            if theme_atlas:
+                atlas_pixmap = theme_atlas.pixmap(name)
+                if atlas_pixmap is not None:
+                    return icon_resource.Icon(atlas_pixmap)
+
         path = self.image_path(name=name, category=category, extension=extension, theme=theme)
         p = icon_resource.IconCache(path=path, color=color, skip_cache=skip_cache)
 
@@ -8,10 +8,13 @@ This custom stylesheet allow us to easily define custom properties (without the
 
 from __future__ import print_function, division, absolute_import
 
+import os
 import re
 import string
+import threading
+from collections import OrderedDict
 
-from tp.common.python import helpers, path
+from tp.common.python import path
 from tp.common.resources import theme
 
 
@@ -24,6 +27,120 @@ class StyleTemplate(string.Template):
     idpattern = r'[_a-z][_a-z0-9]*'
 
 
+class CompiledStyleSheet(object):
+    """
+    Stylesheet template parsed only once into literal, placeholder (@KEY) and DPI expression (N*DPI) segments, so
+    it can be formatted with different theme values in a single pass. Rendered results are cached per theme values
+    and DPI.
+    """
+
+    # Placeholders start with @ and DPI expressions follow the N*DPI format. A placeholder directly followed by *DPI
+    # is also matched, so values resolved into a number are DPI scaled too.
+    TOKEN_REGEX = re.compile(r'(@[A-Za-z0-9_]+)(\*DPI)?|([0-9]+)\*DPI')
+    DPI_REGEX = re.compile(r'([0-9]+)\*DPI')
+    KEY_REGEX = re.compile(r'^@[A-Za-z0-9_]+$')
+
+    LITERAL = 0
+    PLACEHOLDER = 1
+    DPI = 2
+
+    def __init__(self, data, max_renders=16):
+        super(CompiledStyleSheet, self).__init__()
+
+        self._data = data
+        self._max_renders = max_renders
+        self._renders = OrderedDict()
+        self._lock = threading.Lock()
+        self._segments = list()
+
+        position = 0
+        for match in self.TOKEN_REGEX.finditer(data):
+            if match.start() > position:
+                self._segments.append((self.LITERAL, data[position:match.start()], None))
+            if match.group(1):
+                self._segments.append((self.PLACEHOLDER, match.group(1), bool(match.group(2))))
+            else:
+                self._segments.append((self.DPI, int(match.group(3)), None))
+            position = match.end()
+        if position < len(data):
+            self._segments.append((self.LITERAL, data[position:], None))
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def segments(self):
+        return self._segments
+
+    def render(self, values, dpi_value=1):
+        """
+        Returns stylesheet with all placeholders replaced with the given values and all DPI expressions evaluated.
+
+        :param dict values: dictionary that maps placeholder keys (uppercase and with @ prefix) with their values.
+        :param float dpi_value: dpi value used to evaluate DPI expressions.
+        :return: formatted stylesheet.
+        :rtype: str
+        """
+
+        values = dict((key, str(value)) for key, value in values.items())
+        cache_key = (frozenset(values.items()), dpi_value)
+        with self._lock:
+            rendered = self._renders.pop(cache_key, None)
+            if rendered is not None:
+                self._renders[cache_key] = rendered
+                return rendered
+
+        if any(not self.KEY_REGEX.match(key) for key in values):
+            # keys that cannot be tokenized are replaced one by one, as done by previous implementation
+            rendered = self._render_by_replace(values, dpi_value)
+        else:
+            rendered = self._render_segments(values, dpi_value)
+
+        with self._lock:
+            self._renders[cache_key] = rendered
+            while len(self._renders) > self._max_renders:
+                self._renders.popitem(last=False)
+
+        return rendered
+
+    def _render_segments(self, values, dpi_value):
+        resolved = dict()
+        result = list()
+        for segment_type, segment, scaled in self._segments:
+            if segment_type == self.LITERAL:
+                result.append(segment)
+            elif segment_type == self.DPI:
+                result.append(str(int(segment * dpi_value)))
+            else:
+                text = resolved.get(segment)
+                if text is None:
+                    text = resolved[segment] = self._resolve_placeholder(segment, values)
+                if scaled:
+                    text = self.DPI_REGEX.sub(
+                        lambda match: str(int(int(match.group(1)) * dpi_value)), text + '*DPI')
+                result.append(text)
+
+        return ''.join(result)
+
+    def _render_by_replace(self, values, dpi_value):
+        data = self._data
+        for key in sorted(values.keys(), key=len, reverse=True):
+            data = data.replace(key, values[key])
+
+        return self.DPI_REGEX.sub(lambda match: str(int(int(match.group(1)) * dpi_value)), data)
+
+    def _resolve_placeholder(self, placeholder, values):
+        # longest key that matches the beginning of the placeholder wins (keys can share prefixes, for example
+        # @ACCENT_COLOR and @ACCENT_COLOR_1)
+        for i in range(len(placeholder), 1, -1):
+            value = values.get(placeholder[:i])
+            if value is not None:
+                return value + placeholder[i:]
+
+        return placeholder
+
+
 class StyleSheet(object):
     """
     Base style class
@@ -33,6 +150,11 @@ class StyleSheet(object):
 
     EXTENSION = 'qss'
 
+    _COMPILED_CACHE_SIZE = 64
+    _compiled = OrderedDict()               # stores compiled stylesheets by their original data
+    _includes = dict()                      # stores resolved included files by their path
+    _cache_lock = threading.RLock()
+
     def __init__(self, stylesheet=''):
         super(StyleSheet, self).__init__()
 
@@ -89,6 +211,21 @@ class StyleSheet(object):
         :rtype: str
         """
 
+        return cls._include_paths(style_path, data, list())
+
+    @classmethod
+    def _include_paths(cls, style_path, data, dependencies):
+        """
+        Internal function that replaces #include directives and stores the paths and modification times of all
+        included files in the given dependencies list.
+
+        :param str style_path: style path.
+        :param str data: str, data of the style.
+        :param list(tuple(str, float)) dependencies: list where included files are stored.
+        :return: data with the #include directives replaced.
+        :rtype: str
+        """
+
         if not path.is_file(style_path):
             return data
 
@@ -103,8 +240,8 @@ class StyleSheet(object):
             if not path.is_file(file_to_include):
                 continue
 
-            load_data = cls.read(file_to_include)
-            new_data = cls.include_paths(file_to_include, load_data)
+            new_data, include_dependencies = cls._resolve_include(file_to_include)
+            dependencies.extend(include_dependencies)
 
             if new_data:
                 included_data.append('\n/*Included from: {}*/'.format(file_to_include))
@@ -114,43 +251,99 @@ class StyleSheet(object):
         return '\n'.join(included_data)
 
     @classmethod
-    def format(cls, data=None, dpi_value=1, **kwargs):
+    def format(cls, data=None, dpi_value=1, theme_data=None, **kwargs):
         """
         Returns style with proper format. Replaces all user defined attributes with the attributes from theme.
 
         :param str data: style data.
-        :param dict attributes: dictionary that contains all user attributes defined by style theme.
         :param float dpi_value: dpi value defined in theme.
+        :param Theme or ResolvedTheme theme_data: theme which already solved attribute values are used.
+        :param dict kwargs: dictionary that contains all user attributes defined by style theme. These attributes are
+            solved each time and override the ones of the given theme.
         :return: stylesheet data ready to be applied.
         :rtype: str
         """
 
-        keys = list(kwargs.keys())
-        if helpers.is_python2():
-            keys.sort(key=len, reverse=True)
-        else:
-            keys = sorted(keys, key=len, reverse=True)
-
-        for key in keys:
+        values = dict()
+        if theme_data is not None:
+            resolved_theme = theme_data.resolved() if isinstance(theme_data, theme.Theme) else theme_data
+            for key, option_value in resolved_theme.values().items():
+                values[str(key.upper())] = option_value
+            # attributes without @ prefix are not solved by resolved theme
+            for key in resolved_theme.theme_data.keys():
+                option_key = '@{}'.format(key).upper()
+                if not key.startswith('@') and option_key not in values:
+                    values[str(option_key)] = resolved_theme.theme_data.get(key)
+        for key in kwargs.keys():
             option_value = theme.solve_value(kwargs, key)
             option_key = (key if key.startswith('@') else '@{}'.format(key)).upper()
-            data = data.replace(str(option_key), str(option_value))
+            values[str(option_key)] = option_value
 
-        # dpi replacement
-        re_dpi = re.compile('[0-9]+[*]DPI')
-        new_data = list()
-        for line in data.split('\n'):
-            dpi_ = re_dpi.search(line)
-            if dpi_:
-                new = dpi_.group().replace('DPI', str(dpi_value))
-                val = int(eval(new))
-                line = line.replace(dpi_.group(), str(val))
-            new_data.append(line)
+        return cls.compile(data or '').render(values, dpi_value=dpi_value)
 
-        # each line of the style ends with end of line
-        data = '\n'.join(new_data)
+    @classmethod
+    def compile(cls, data):
+        """
+        Returns compiled version of the given style data. Compiled styles are cached, so each style data is only
+        parsed once.
 
-        return data
+        :param str data: style data.
+        :return: compiled stylesheet.
+        :rtype: CompiledStyleSheet
+        """
+
+        with cls._cache_lock:
+            compiled = cls._compiled.pop(data, None)
+            if compiled is None:
+                compiled = CompiledStyleSheet(data)
+            cls._compiled[data] = compiled
+            while len(cls._compiled) > cls._COMPILED_CACHE_SIZE:
+                cls._compiled.popitem(last=False)
+
+        return compiled
+
+    @classmethod
+    def clear_cache(cls):
+        """
+        Clears compiled stylesheets and resolved included files caches.
+        """
+
+        with cls._cache_lock:
+            cls._compiled.clear()
+            cls._includes.clear()
+
+    @classmethod
+    def _resolve_include(cls, file_path):
+        """
+        Internal function that returns the contents of the given included file with its own #include directives
+        resolved. Results are cached and only resolved again if the modification time of any of the involved files
+        changes.
+
+        :param str file_path: included file path.
+        :return: included data and paths and modification times of all the files involved.
+        :rtype: tuple(str, list(tuple(str, float)))
+        """
+
+        with cls._cache_lock:
+            cached = cls._includes.get(file_path)
+        if cached is not None:
+            data, dependencies = cached
+            try:
+                if all(os.path.getmtime(dependency) == mtime for dependency, mtime in dependencies):
+                    return data, dependencies
+            except OSError:
+                pass
+
+        try:
+            dependencies = [(file_path, os.path.getmtime(file_path))]
+        except OSError:
+            dependencies = list()
+        data = cls._include_paths(file_path, cls.read(file_path), dependencies)
+        if dependencies:
+            with cls._cache_lock:
+                cls._includes[file_path] = (data, dependencies)
+
+        return data, dependencies
 
     # =================================================================================================================
     # STATIC METHODS
@@ -9,13 +9,19 @@ from __future__ import print_function, division, absolute_import
 
 from tp.core import log
 from tp.core.managers import preferences
-from tp.common.python import helpers, color, path
+from tp.common.python import helpers, color, path, signal
 from tp.common.resources import cache, color as qt_color
 from tp.common.qt import consts, dpi
 
 logger = log.tpLogger
 
 
+# caches used to avoid parsing the same hex colors and looking for the same icon files over and over again. Only
+# found icon paths are cached, so icons installed later are found.
+_HEX_COLORS_CACHE = dict()
+_ICON_PATHS_CACHE = dict()
+
+
 def solve_value(theme_data, attribute_name):
     """
     Solves a theme given attribute value withing the given theme data.
@@ -25,33 +31,254 @@ def solve_value(theme_data, attribute_name):
     :return: object
     """
 
-    # import here to avoid cyclic imports
-    from tp.core.managers import resources
-
     style_attribute_name = attribute_name if attribute_name.startswith('@') else '@{}'.format(attribute_name)
-    setting = theme_data.get(style_attribute_name)
+    value, solved = _solve_setting(theme_data, style_attribute_name, theme_data.get(style_attribute_name))
+    if solved:
+        return value
+
+    return theme_data.get(attribute_name)
+
+
+def dpi_scale(value, dpi_value=1):
+    """
+    Resizes given value based on current application DPI and the given DPI value.
+
+    :param int value: value in pixels.
+    :param float dpi_value: DPI value of the theme.
+    :return: scaled value.
+    :rtype: float
+    """
+
+    scaled_value = dpi.dpi_scale(value)
+
+    return scaled_value * dpi_value if dpi_value != 1 else scaled_value
+
+
+def clear_solve_cache():
+    """
+    Clears cached hex colors and icon paths used when solving theme values.
+    """
+
+    _HEX_COLORS_CACHE.clear()
+    _ICON_PATHS_CACHE.clear()
+
+
+def _solve_setting(theme_data, style_attribute_name, setting, dpi_value=1):
+    """
+    Internal function that solves the given theme setting.
+
+    :param dict or Theme theme_data: theme dictionary data setting belongs to.
+    :param str style_attribute_name: name of the attribute (with @ prefix).
+    :param object setting: value of the attribute stored in theme data.
+    :param float dpi_value: DPI value used to scale size settings.
+    :return: solved value and whether the setting was solved. If not solved, raw theme data value should be used.
+    :rtype: tuple(object, bool)
+    """
+
     if isinstance(setting, int):
-        return setting
+        return setting, True
     elif helpers.is_string(setting):
         if setting.startswith('^'):
-            return dpi.dpi_scale(int(setting[1:]))
+            return dpi_scale(int(setting[1:]), dpi_value), True
         elif setting.startswith('@^'):
-            return dpi.dpi_scale(int(setting[2:]))
+            return dpi_scale(int(setting[2:]), dpi_value), True
         elif 'icon' in style_attribute_name.lower():
             style = theme_data.get('style', 'default')
-            resource_path = resources.get('icons', style, str(setting))
-            if path.is_file(resource_path):
-                return resource_path
-        if color.string_is_hex(setting):
-            try:
-                color_list = color.hex_to_rgba(setting)
-                return 'rgba({}, {}, {}, {})'.format(
-                    color_list[0], color_list[1], color_list[2], color_list[3])
-            except ValueError:
-                # this exception will be raised if we try to convert an attribute that is not a color.
-                return setting
+            icon_key = (style, setting)
+            resource_path = _ICON_PATHS_CACHE.get(icon_key)
+            if resource_path is None:
+                # import here to avoid cyclic imports
+                from tp.core.managers import resources
+                resource_path = resources.get('icons', style, str(setting))
+                resource_path = resource_path if path.is_file(resource_path) else None
+                if resource_path:
+                    _ICON_PATHS_CACHE[icon_key] = resource_path
+            if resource_path:
+                return resource_path, True
+        rgba = _HEX_COLORS_CACHE.get(setting)
+        if rgba is None and setting not in _HEX_COLORS_CACHE:
+            if color.string_is_hex(setting):
+                try:
+                    color_list = color.hex_to_rgba(setting)
+                    rgba = 'rgba({}, {}, {}, {})'.format(color_list[0], color_list[1], color_list[2], color_list[3])
+                except ValueError:
+                    # this exception will be raised if we try to convert an attribute that is not a color.
+                    rgba = setting
+            _HEX_COLORS_CACHE[setting] = rgba
+        if rgba is not None:
+            return rgba, True
+
+    return None, False
+
+
+class ResolvedTheme(object):
+    """
+    Class that stores all the solved @ attribute values of a theme, so they can be retrieved without solving them
+    each time. Values are solved again only when theme attributes, theme DPI or application DPI change, and changed
+    signal is only emitted with the attributes whose value actually changed.
+    """
 
-    return theme_data.get(attribute_name)
+    def __init__(self, theme_data, dpi_value=1):
+        super(ResolvedTheme, self).__init__()
+
+        self._theme_data = theme_data
+        self._dpi_value = dpi_value
+        self._dpi_multiplier = None         # application DPI multiplier used to solve DPI dependant attributes
+        self._values = dict()               # stores solved values by attribute name (with @ prefix)
+        self._unsolved = set()              # stores attribute names that fallback to raw theme data values
+        self._dpi_dependant = set()         # stores attribute names which value depends on DPI
+
+        self.changed = signal.Signal()
+
+        self.resolve()
+
+    def __getitem__(self, attribute_name):
+        return self.get(attribute_name)
+
+    def __contains__(self, attribute_name):
+        return self._style_name(attribute_name) in self._values
+
+    # =================================================================================================================
+    # PROPERTIES
+    # =================================================================================================================
+
+    @property
+    def theme_data(self):
+        return self._theme_data
+
+    @property
+    def dpi(self):
+        return self._dpi_value
+
+    # =================================================================================================================
+    # BASE
+    # =================================================================================================================
+
+    def get(self, attribute_name, default=None):
+        """
+        Returns solved value of the given attribute.
+
+        :param str attribute_name: name of the attribute to retrieve.
+        :param object default: value to return if attribute is not defined within theme.
+        :return: solved value.
+        :rtype: object
+        """
+
+        style_attribute_name = self._style_name(attribute_name)
+        if style_attribute_name in self._dpi_dependant:
+            self._check_dpi()
+        if style_attribute_name not in self._values:
+            return self._theme_data.get(attribute_name, default)
+        if style_attribute_name in self._unsolved and attribute_name != style_attribute_name:
+            return self._theme_data.get(attribute_name, default)
+
+        return self._values[style_attribute_name]
+
+    def values(self):
+        """
+        Returns a dictionary with all solved attribute values.
+
+        :return: solved values by attribute name (with @ prefix).
+        :rtype: dict
+        """
+
+        return dict(self._values)
+
+    def resolve(self, attribute_names=None):
+        """
+        Solves given attributes again. If no attributes are given, all theme attributes are solved.
+
+        :param list(str) or None attribute_names: names of the attributes to solve.
+        :return: changed values by attribute name (with @ prefix).
+        :rtype: dict
+        """
+
+        if attribute_names is None:
+            style_attribute_names = set(key for key in self._theme_data.keys() if key.startswith('@'))
+            for removed_attribute_name in set(self._values.keys()) - style_attribute_names:
+                self._discard(removed_attribute_name)
+        else:
+            style_attribute_names = set(self._style_name(attribute_name) for attribute_name in attribute_names)
+
+        changed = dict()
+        for style_attribute_name in style_attribute_names:
+            if style_attribute_name not in self._theme_data:
+                if style_attribute_name in self._values:
+                    self._discard(style_attribute_name)
+                    changed[style_attribute_name] = None
+                continue
+            setting = self._theme_data[style_attribute_name]
+            value, solved = _solve_setting(self._theme_data, style_attribute_name, setting, self._dpi_value)
+            if not solved:
+                value = setting
+                self._unsolved.add(style_attribute_name)
+            else:
+                self._unsolved.discard(style_attribute_name)
+            if helpers.is_string(setting) and (setting.startswith('^') or setting.startswith('@^')):
+                self._dpi_dependant.add(style_attribute_name)
+                self._dpi_multiplier = dpi.dpi_multiplier()
+            else:
+                self._dpi_dependant.discard(style_attribute_name)
+            if style_attribute_name not in self._values or self._values[style_attribute_name] != value:
+                changed[style_attribute_name] = value
+            self._values[style_attribute_name] = value
+
+        if changed:
+            self.changed.emit(changed)
+
+        return changed
+
+    def set_dpi(self, dpi_value):
+        """
+        Sets DPI value and solves again all the attributes which value depends on DPI.
+
+        :param float dpi_value: new DPI value.
+        :return: changed values by attribute name (with @ prefix).
+        :rtype: dict
+        """
+
+        if dpi_value == self._dpi_value:
+            return dict()
+
+        self._dpi_value = dpi_value
+
+        return self.resolve(list(self._dpi_dependant))
+
+    # =================================================================================================================
+    # INTERNAL
+    # =================================================================================================================
+
+    def _style_name(self, attribute_name):
+        """
+        Internal function that returns the name of the attribute with the @ prefix.
+
+        :param str attribute_name: attribute name.
+        :return: attribute name with @ prefix.
+        :rtype: str
+        """
+
+        return attribute_name if attribute_name.startswith('@') else '@{}'.format(attribute_name)
+
+    def _check_dpi(self):
+        """
+        Internal function that solves again DPI dependant attributes if application DPI changed since they were solved.
+        """
+
+        dpi_multiplier = dpi.dpi_multiplier()
+        if dpi_multiplier != self._dpi_multiplier:
+            self._dpi_multiplier = dpi_multiplier
+            self.resolve(list(self._dpi_dependant))
+
+    def _discard(self, style_attribute_name):
+        """
+        Internal function that removes given attribute from solved values.
+
+        :param str style_attribute_name: attribute name with @ prefix.
+        """
+
+        self._values.pop(style_attribute_name, None)
+        self._unsolved.discard(style_attribute_name)
+        self._dpi_dependant.discard(style_attribute_name)
 
 
 def fade_color(color_to_fade, alpha):
@@ -154,6 +381,8 @@ class Theme(dict):
     def __init__(self, name, data_dict=None):
         super(Theme, self).__init__()
 
+        self._resolved = None
+
         data_dict = data_dict or dict()
         overrides = data_dict.get('overrides', dict())
         overrides = {key if key.startswith('@') else '@{}'.format(key): value for key, value in overrides.items()}
@@ -173,8 +402,15 @@ class Theme(dict):
         self.update(**self._update_accent_color())
         self.update(**overrides)
 
+    def __setitem__(self, key, value):
+        super(Theme, self).__setitem__(key, value)
+        if self._resolved is not None and key.startswith('@'):
+            self._resolved.resolve([key])
+
     def __getattr__(self, item):
-        return solve_value(self, item)
+        if item.startswith('_'):
+            raise AttributeError(item)
+        return self.resolved().get(item)
 
     # =================================================================================================================
     # PROPERTIES
@@ -209,6 +445,46 @@ class Theme(dict):
         self._accent_color = value
         self.update(**self._update_accent_color())
 
+    # =================================================================================================================
+    # BASE
+    # =================================================================================================================
+
+    def update(self, *args, **kwargs):
+        """
+        Overrides base update function to solve again the updated attributes, so resolved theme is kept in sync.
+        """
+
+        data = dict(*args, **kwargs)
+        super(Theme, self).update(data)
+        if self._resolved is not None:
+            self._resolved.resolve([key for key in data.keys() if key.startswith('@')])
+
+    def resolved(self):
+        """
+        Returns resolved version of this theme, where all attribute values are already solved.
+
+        :return: resolved theme.
+        :rtype: ResolvedTheme
+        """
+
+        if self._resolved is None:
+            self._resolved = ResolvedTheme(self, dpi_value=self.get('dpi', 1))
+
+        return self._resolved
+
+    def set_dpi(self, dpi_value):
+        """
+        Sets DPI value of the theme. Attributes which value depends on DPI are solved again.
+
+        :param float dpi_value: new DPI value.
+        :return: changed values by attribute name (with @ prefix).
+        :rtype: dict
+        """
+
+        super(Theme, self).__setitem__('dpi', dpi_value)
+
+        return self.resolved().set_dpi(dpi_value)
+
     # =================================================================================================================
     # INTERNAL
     # =================================================================================================================
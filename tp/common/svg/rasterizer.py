@@ -0,0 +1,384 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module that contains a service to rasterize SVG files into images in background threads
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import threading
+from collections import OrderedDict
+
+from Qt.QtCore import Qt, Signal, QObject, QByteArray, QSize
+from Qt.QtGui import QImage, QPixmap, QIcon, QPainter
+
+# some PySide implementations (such as MoBu 2018) does not support QSvgRenderer
+SVG_RENDERER_AVAILABLE = True
+try:
+    from Qt.QtSvg import QSvgRenderer
+except ImportError:
+    SVG_RENDERER_AVAILABLE = False
+
+# concurrent.futures is not available in Python 2 (unless futures backport is installed), in that case SVGs are
+# rasterized in the thread that requests them
+FUTURES_AVAILABLE = True
+try:
+    from concurrent.futures import ThreadPoolExecutor, Future
+except ImportError:
+    FUTURES_AVAILABLE = False
+
+    class Future(object):
+        """
+        Minimal future used when concurrent.futures is not available. Its result is always set before it is returned
+        """
+
+        def __init__(self):
+            super(Future, self).__init__()
+
+            self._done = False
+            self._result = None
+            self._exception = None
+
+        def done(self):
+            return self._done
+
+        def cancelled(self):
+            return False
+
+        def result(self, timeout=None):
+            if self._exception is not None:
+                raise self._exception
+            return self._result
+
+        def exception(self, timeout=None):
+            return self._exception
+
+        def set_result(self, result):
+            self._result = result
+            self._done = True
+
+        def set_exception(self, exception):
+            self._exception = exception
+            self._done = True
+
+        def add_done_callback(self, fn):
+            fn(self)
+
+from tp.core import log
+
+logger = log.tpLogger
+
+# color used in SVG icons that is replaced when icons are colorized
+REPLACE_COLOR = '#555555'
+
+
+def render_svg_image(svg_path, width=128, height=None, replace_color=None, opacity=1.0):
+    """
+    Rasterizes given SVG file into an image. A new renderer is created each time, so this function can be called
+    from any thread.
+
+    :param str svg_path: path of the SVG file to rasterize.
+    :param int width: width of the image in pixels.
+    :param int height: height of the image in pixels. If not given, width is used.
+    :param str replace_color: color used to replace the default color of the SVG icons.
+    :param float opacity: opacity of the rasterized image.
+    :return: rasterized image.
+    :rtype: QImage
+    """
+
+    height = height or width
+    if not SVG_RENDERER_AVAILABLE or not os.path.isfile(svg_path):
+        return QImage()
+
+    with open(svg_path, 'r') as svg_file:
+        data_content = svg_file.read()
+    if replace_color is not None:
+        data_content = data_content.replace(REPLACE_COLOR, replace_color)
+
+    renderer = QSvgRenderer(QByteArray(data_content.encode('utf-8')))
+    image = QImage(int(width), int(height), QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    if opacity < 1.0:
+        painter.setOpacity(opacity)
+    renderer.render(painter)
+    painter.end()
+
+    return image
+
+
+class SvgRasterizer(object):
+    """
+    Service that rasterizes SVG files into images using a pool of worker threads.
+    Requests return futures. Concurrent requests of the same SVG with the same options share the same future, and
+    rasterized images are cached in a bounded least recently used cache.
+    """
+
+    class SvgRasterizerSignals(QObject, object):
+        rasterized = Signal(object, object)
+
+    def __init__(self, max_workers=4, max_size=256):
+        super(SvgRasterizer, self).__init__()
+
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers) if FUTURES_AVAILABLE else None
+        self._pending = dict()
+        self._images = OrderedDict()
+
+        # signals object must be created in the GUI thread. Rasterizer is not a QObject, so connection must be queued
+        # explicitly to call the slot in the thread signals object lives in (GUI thread) instead of the worker one
+        self.signals = SvgRasterizer.SvgRasterizerSignals()
+        self.signals.rasterized.connect(self._on_rasterized, Qt.QueuedConnection)
+
+    # =================================================================================================================
+    # BASE
+    # =================================================================================================================
+
+    def key(self, svg_path, size=128, color=None, opacity=1.0):
+        """
+        Returns the key that identifies a rasterization request. Key takes into account modification time of the SVG
+        file, so cached images are discarded when the file changes.
+
+        :param str svg_path: path of the SVG file to rasterize.
+        :param int or QSize size: size of the image.
+        :param str color: color used to replace the default color of the SVG icons.
+        :param float opacity: opacity of the rasterized image.
+        :return: rasterization request key.
+        :rtype: tuple
+        """
+
+        if isinstance(size, QSize):
+            size = (size.width(), size.height())
+        elif not isinstance(size, (list, tuple)):
+            size = (int(size), int(size))
+        try:
+            mtime = os.path.getmtime(svg_path)
+        except OSError:
+            mtime = None
+
+        return os.path.normcase(os.path.normpath(svg_path)), tuple(size), color, opacity, mtime
+
+    def cached(self, svg_path, size=128, color=None, opacity=1.0):
+        """
+        Returns already rasterized image of the given SVG file.
+
+        :param str svg_path: path of the SVG file.
+        :param int or QSize size: size of the image.
+        :param str color: color used to replace the default color of the SVG icons.
+        :param float opacity: opacity of the rasterized image.
+        :return: rasterized image or None if the SVG is not rasterized yet.
+        :rtype: QImage or None
+        """
+
+        key = self.key(svg_path, size=size, color=color, opacity=opacity)
+        with self._lock:
+            return self._get(key)
+
+    def request(self, svg_path, size=128, color=None, opacity=1.0, asap=False):
+        """
+        Requests the rasterization of the given SVG file.
+
+        :param str svg_path: path of the SVG file to rasterize.
+        :param int or QSize size: size of the image.
+        :param str color: color used to replace the default color of the SVG icons.
+        :param float opacity: opacity of the rasterized image.
+        :param bool asap: if True and the image is not cached, it is rasterized in the current thread.
+        :return: future which result is the rasterized image.
+        :rtype: concurrent.futures.Future
+        """
+
+        key = self.key(svg_path, size=size, color=color, opacity=opacity)
+        with self._lock:
+            image = self._get(key)
+            if image is not None:
+                future = Future()
+                future.set_result(image)
+                return future
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            asap = asap or self._executor is None
+            if asap:
+                future = Future()
+                self._pending[key] = future
+            else:
+                future = self._pending[key] = self._executor.submit(self._rasterize, key)
+
+        if asap:
+            try:
+                future.set_result(self._rasterize(key))
+            except Exception as exc:
+                future.set_exception(exc)
+
+        return future
+
+    def request_many(self, svg_paths, size=128, color=None, opacity=1.0):
+        """
+        Requests the rasterization of multiple SVG files.
+
+        :param list(str) svg_paths: paths of the SVG files to rasterize.
+        :param int or QSize size: size of the images.
+        :param str color: color used to replace the default color of the SVG icons.
+        :param float opacity: opacity of the rasterized images.
+        :return: futures which results are the rasterized images, in the same order as given paths.
+        :rtype: list(concurrent.futures.Future)
+        """
+
+        return [self.request(svg_path, size=size, color=color, opacity=opacity) for svg_path in svg_paths]
+
+    def rasterize(self, svg_path, size=128, color=None, opacity=1.0, timeout=None):
+        """
+        Returns the rasterized image of the given SVG file, waiting for it if it is being rasterized.
+
+        :param str svg_path: path of the SVG file to rasterize.
+        :param int or QSize size: size of the image.
+        :param str color: color used to replace the default color of the SVG icons.
+        :param float opacity: opacity of the rasterized image.
+        :param float timeout: maximum number of seconds to wait.
+        :return: rasterized image.
+        :rtype: QImage
+        """
+
+        return self.request(svg_path, size=size, color=color, opacity=opacity, asap=True).result(timeout=timeout)
+
+    def icon(self, svg_path, callback, size=128, color=None, opacity=1.0, placeholder=None):
+        """
+        Returns an icon for the given SVG file without blocking the GUI thread. If the SVG is already rasterized, its
+        icon is returned. Otherwise, a placeholder icon is returned and the given callback is called, in the GUI thread,
+        with the final icon once the SVG is rasterized.
+
+        :param str svg_path: path of the SVG file to rasterize.
+        :param callable callback: function called with the final icon.
+        :param int or QSize size: size of the icon.
+        :param str color: color used to replace the default color of the SVG icons.
+        :param float opacity: opacity of the icon.
+        :param QIcon placeholder: icon returned while the SVG is rasterized. If not given, an empty icon is used.
+        :return: final icon if SVG is already rasterized; placeholder icon otherwise.
+        :rtype: QIcon
+        """
+
+        future = self.request(svg_path, size=size, color=color, opacity=opacity)
+        if self._is_rasterized(future):
+            return QIcon(QPixmap.fromImage(future.result()))
+
+        # signal is emitted from the worker thread and queued into the GUI thread, where pixmaps can be created
+        future.add_done_callback(lambda done_future: self.signals.rasterized.emit(done_future, callback))
+
+        # rasterization can finish before the callback is added, in that case the final icon is returned so it is not
+        # replaced by the placeholder after the callback is called
+        if self._is_rasterized(future):
+            return QIcon(QPixmap.fromImage(future.result()))
+
+        return placeholder if placeholder is not None else QIcon()
+
+    def clear(self):
+        """
+        Removes all cached images
+        """
+
+        with self._lock:
+            self._images.clear()
+
+    def shutdown(self, wait=True):
+        """
+        Stops worker threads. Run this before application shutdown.
+
+        :param bool wait: whether to wait until pending requests are finished.
+        """
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    # =================================================================================================================
+    # INTERNAL
+    # =================================================================================================================
+
+    def _get(self, key):
+        """
+        Internal function that returns cached image for the given key. Lock must be acquired before calling it.
+
+        :param tuple key: rasterization request key.
+        :return: rasterized image.
+        :rtype: QImage or None
+        """
+
+        image = self._images.pop(key, None)
+        if image is not None:
+            self._images[key] = image
+
+        return image
+
+    def _is_rasterized(self, future):
+        """
+        Internal function that returns whether given rasterization future finished successfully.
+
+        :param concurrent.futures.Future future: rasterization future.
+        :return: True if the future finished without errors; False otherwise.
+        :rtype: bool
+        """
+
+        return future.done() and not future.cancelled() and future.exception() is None
+
+    def _rasterize(self, key):
+        """
+        Internal function that rasterizes the SVG of the given request key and stores the image in cache.
+
+        :param tuple key: rasterization request key.
+        :return: rasterized image.
+        :rtype: QImage
+        """
+
+        svg_path, size, color, opacity, _ = key
+        try:
+            image = render_svg_image(svg_path, width=size[0], height=size[1], replace_color=color, opacity=opacity)
+        except Exception:
+            with self._lock:
+                self._pending.pop(key, None)
+            logger.exception('Impossible to rasterize SVG: {}'.format(svg_path))
+            raise
+
+        with self._lock:
+            self._pending.pop(key, None)
+            if not image.isNull():
+                self._images[key] = image
+                while len(self._images) > self._max_size:
+                    self._images.popitem(last=False)
+
+        return image
+
+    def _on_rasterized(self, future, callback):
+        """
+        Internal callback function that is called in the GUI thread when a requested icon is rasterized.
+
+        :param concurrent.futures.Future future: finished rasterization future.
+        :param callable callback: function called with the final icon.
+        """
+
+        if not self._is_rasterized(future):
+            return
+
+        callback(QIcon(QPixmap.fromImage(future.result())))
+
+
+_RASTERIZER = None
+_RASTERIZER_LOCK = threading.Lock()
+
+
+def get_rasterizer():
+    """
+    Returns global SVG rasterizer service. It should be created the first time from the GUI thread.
+
+    :return: SVG rasterizer.
+    :rtype: SvgRasterizer
+    """
+
+    global _RASTERIZER
+
+    with _RASTERIZER_LOCK:
+        if _RASTERIZER is None:
+            _RASTERIZER = SvgRasterizer()
+
+    return _RASTERIZER
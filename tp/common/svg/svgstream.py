@@ -0,0 +1,730 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Module that contains functionality to process SVG files without building a full document in memory:
+    - Streaming transforms (recolor, strip metadata, resize, minify) implemented as SAX filters.
+    - Element index by id and class that allows random access edits on large SVG files.
+    - Batch entry point that processes a folder of SVG files in parallel processes.
+
+Only Python standard library is used, so this module can be used at build time outside of DCCs.
+
+Usage:
+    python -m tp.common.svg.svgstream icons/ build/icons/ --recolor "#555555=#FF0000" --strip-metadata --minify
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import re
+import io
+import sys
+import logging
+import argparse
+import multiprocessing
+from xml import sax
+from xml.sax import saxutils
+from xml.parsers import expat
+from collections import OrderedDict
+
+# concurrent.futures is not available in Python 2 (unless futures backport is installed), in that case SVG files of
+# a folder are transformed serially
+FUTURES_AVAILABLE = True
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    FUTURES_AVAILABLE = False
+
+from tp.common.svg import consts
+
+LOGGER = logging.getLogger(consts.LIB_ID)
+
+SVG_EXTENSION = '.svg'
+
+# attributes that can contain colors
+COLOR_ATTRIBUTES = ('fill', 'stroke', 'stop-color', 'flood-color', 'lighting-color', 'color')
+
+# elements and attribute prefixes that are removed when stripping metadata
+METADATA_ELEMENTS = ('metadata', 'title', 'desc', 'sodipodi:namedview')
+METADATA_PREFIXES = ('sodipodi:', 'inkscape:', 'sketch:', 'xmlns:sodipodi', 'xmlns:inkscape', 'xmlns:sketch')
+
+# elements which text content is meaningful, so whitespace is not removed from them when minifying
+TEXT_ELEMENTS = ('text', 'tspan', 'textPath', 'style', 'script')
+
+# element references, such as url(#abc) gradient references, look like hex colors and must not be recolored
+_HEX_COLOR_RE = re.compile(r'(?<!url\()(?<!url\(\')(?<!url\(")#(?:[0-9a-fA-F]{6}|[0-9a-fA-F]{3})\b')
+_SIZE_RE = re.compile(r'^\s*([0-9.]+)')
+
+
+def normalize_color(color):
+    """
+    Returns given hex color in lowercase long format (#rrggbb).
+
+    :param str color: hex color (#RGB or #RRGGBB).
+    :return: normalized hex color.
+    :rtype: str
+    """
+
+    color = color.strip().lower()
+    if len(color) == 4 and color.startswith('#'):
+        color = '#' + ''.join(c * 2 for c in color[1:])
+
+    return color
+
+
+def recolor_text(text, color_map):
+    """
+    Replaces all the hex colors of the given text using the given color map.
+
+    :param str text: text to recolor (attribute value, style attribute or style sheet).
+    :param dict color_map: dictionary that maps normalized source hex colors with target colors.
+    :return: recolored text.
+    :rtype: str
+    """
+
+    if '#' not in text:
+        return text
+
+    return _HEX_COLOR_RE.sub(lambda match: color_map.get(normalize_color(match.group()), match.group()), text)
+
+
+class RecolorFilter(saxutils.XMLFilterBase):
+    """
+    SAX filter that replaces colors of color attributes, style attributes and style elements.
+    """
+
+    def __init__(self, parent=None, color_map=None):
+        saxutils.XMLFilterBase.__init__(self, parent)
+
+        self._color_map = dict((normalize_color(k), v) for k, v in (color_map or dict()).items())
+        self._in_style = 0
+
+    def startElement(self, name, attrs):
+        new_attrs = OrderedDict()
+        for attr_name in attrs.getNames():
+            value = attrs.getValue(attr_name)
+            if attr_name in COLOR_ATTRIBUTES or attr_name == 'style':
+                value = recolor_text(value, self._color_map)
+            new_attrs[attr_name] = value
+        if name == 'style':
+            self._in_style += 1
+        saxutils.XMLFilterBase.startElement(self, name, sax.xmlreader.AttributesImpl(new_attrs))
+
+    def endElement(self, name):
+        if name == 'style':
+            self._in_style -= 1
+        saxutils.XMLFilterBase.endElement(self, name)
+
+    def characters(self, content):
+        if self._in_style:
+            content = recolor_text(content, self._color_map)
+        saxutils.XMLFilterBase.characters(self, content)
+
+
+class StripMetadataFilter(saxutils.XMLFilterBase):
+    """
+    SAX filter that removes metadata elements and editor specific (Inkscape, Sodipodi, Sketch) attributes.
+    """
+
+    def __init__(self, parent=None):
+        saxutils.XMLFilterBase.__init__(self, parent)
+
+        self._skip_depth = 0
+
+    def startElement(self, name, attrs):
+        if self._skip_depth or name in METADATA_ELEMENTS or name.startswith(METADATA_PREFIXES):
+            self._skip_depth += 1
+            return
+        new_attrs = OrderedDict(
+            (attr_name, attrs.getValue(attr_name)) for attr_name in attrs.getNames()
+            if not attr_name.startswith(METADATA_PREFIXES))
+        saxutils.XMLFilterBase.startElement(self, name, sax.xmlreader.AttributesImpl(new_attrs))
+
+    def endElement(self, name):
+        if self._skip_depth:
+            self._skip_depth -= 1
+            return
+        saxutils.XMLFilterBase.endElement(self, name)
+
+    def characters(self, content):
+        if not self._skip_depth:
+            saxutils.XMLFilterBase.characters(self, content)
+
+    def ignorableWhitespace(self, whitespace):
+        if not self._skip_depth:
+            saxutils.XMLFilterBase.ignorableWhitespace(self, whitespace)
+
+
+class ResizeFilter(saxutils.XMLFilterBase):
+    """
+    SAX filter that changes the size of the root SVG element. If the SVG does not define a viewBox, one is created
+    from its original size, so its contents are scaled to the new size.
+    """
+
+    def __init__(self, parent=None, width=None, height=None):
+        saxutils.XMLFilterBase.__init__(self, parent)
+
+        self._width = width
+        self._height = height or width
+        self._root_found = False
+
+    def startElement(self, name, attrs):
+        if self._root_found or name != 'svg':
+            saxutils.XMLFilterBase.startElement(self, name, attrs)
+            return
+
+        self._root_found = True
+        new_attrs = OrderedDict((attr_name, attrs.getValue(attr_name)) for attr_name in attrs.getNames())
+        if 'viewBox' not in new_attrs:
+            width_match = _SIZE_RE.match(new_attrs.get('width', ''))
+            height_match = _SIZE_RE.match(new_attrs.get('height', ''))
+            if width_match and height_match:
+                new_attrs['viewBox'] = '0 0 {} {}'.format(width_match.group(1), height_match.group(1))
+        if self._width:
+            new_attrs['width'] = str(self._width)
+        if self._height:
+            new_attrs['height'] = str(self._height)
+        saxutils.XMLFilterBase.startElement(self, name, sax.xmlreader.AttributesImpl(new_attrs))
+
+
+class MinifyFilter(saxutils.XMLFilterBase):
+    """
+    SAX filter that removes whitespace only text between elements and collapses whitespace of attribute values.
+    """
+
+    def __init__(self, parent=None):
+        saxutils.XMLFilterBase.__init__(self, parent)
+
+        self._text_depth = 0
+
+    def startElement(self, name, attrs):
+        if name in TEXT_ELEMENTS:
+            self._text_depth += 1
+        new_attrs = OrderedDict(
+            (attr_name, ' '.join(attrs.getValue(attr_name).split())) for attr_name in attrs.getNames())
+        saxutils.XMLFilterBase.startElement(self, name, sax.xmlreader.AttributesImpl(new_attrs))
+
+    def endElement(self, name):
+        if name in TEXT_ELEMENTS:
+            self._text_depth -= 1
+        saxutils.XMLFilterBase.endElement(self, name)
+
+    def characters(self, content):
+        if self._text_depth or content.strip():
+            saxutils.XMLFilterBase.characters(self, content)
+
+    def ignorableWhitespace(self, whitespace):
+        pass
+
+
+class _CommentsHandler(object):
+    """
+    Lexical handler that forwards comments into the given XML generator. Comments are not forwarded when minifying
+    or stripping metadata.
+    """
+
+    def __init__(self, generator):
+        self._generator = generator
+
+    def comment(self, content):
+        self._generator.ignorableWhitespace('<!--{}-->'.format(content))
+
+    def startDTD(self, name, public_id, system_id):
+        pass
+
+    def endDTD(self):
+        pass
+
+    def startCDATA(self):
+        pass
+
+    def endCDATA(self):
+        pass
+
+
+# transforms that can be used in pipelines, by name
+FILTERS = OrderedDict([
+    ('recolor', RecolorFilter),
+    ('strip_metadata', StripMetadataFilter),
+    ('resize', ResizeFilter),
+    ('minify', MinifyFilter)
+])
+
+
+def transform(source, target, operations):
+    """
+    Streams given SVG source through the given operations and writes the result into target. Source document is
+    never fully loaded in memory.
+
+    :param str or file source: SVG file path or file object to read from.
+    :param str or file target: SVG file path or file object (binary) to write into.
+    :param list(tuple(str, dict)) operations: list of operation names and their arguments. Valid operation names
+        are: recolor (color_map), strip_metadata, resize (width, height) and minify.
+    """
+
+    reader = sax.make_parser()
+    reader.setFeature(sax.handler.feature_namespaces, False)
+    reader.setFeature(sax.handler.feature_external_ges, False)
+
+    filters = list()
+    parent = reader
+    for operation_name, operation_kwargs in operations:
+        if operation_name not in FILTERS:
+            raise ValueError('Invalid SVG operation: "{}". Valid operations: {}'.format(
+                operation_name, ', '.join(FILTERS.keys())))
+        parent = FILTERS[operation_name](parent, **(operation_kwargs or dict()))
+        filters.append(parent)
+
+    close_target = False
+    if not hasattr(target, 'write'):
+        target_folder = os.path.dirname(target)
+        if target_folder and not os.path.isdir(target_folder):
+            os.makedirs(target_folder)
+        target = io.open(target, 'wb')
+        close_target = True
+    try:
+        # short empty elements are only supported by Python 3 generator
+        generator_kwargs = {'short_empty_elements': True} if sys.version_info[0] >= 3 else dict()
+        generator = saxutils.XMLGenerator(target, encoding='utf-8', **generator_kwargs)
+        parent.setContentHandler(generator)
+        if not any(isinstance(svg_filter, (MinifyFilter, StripMetadataFilter)) for svg_filter in filters):
+            reader.setProperty(sax.handler.property_lexical_handler, _CommentsHandler(generator))
+        parent.parse(source)
+    finally:
+        if close_target:
+            target.close()
+
+
+def transform_file(source_path, target_path, operations):
+    """
+    Streams given SVG file through the given operations. If target path is the source path, file is replaced once
+    the transformation finishes.
+
+    :param str source_path: SVG file path.
+    :param str target_path: path where transformed SVG file is stored.
+    :param list(tuple(str, dict)) operations: list of operation names and their arguments.
+    :return: target path.
+    :rtype: str
+    """
+
+    temp_path = '{}.{}.tmp'.format(target_path, os.getpid())
+    try:
+        transform(source_path, temp_path, operations)
+        if os.path.isfile(target_path):
+            os.remove(target_path)
+        os.rename(temp_path, target_path)
+    finally:
+        if os.path.isfile(temp_path):
+            os.remove(temp_path)
+
+    return target_path
+
+
+def _transform_file_job(job):
+    """
+    Internal function used by process pool workers to transform a file.
+
+    :param tuple(str, str, list) job: source path, target path and operations.
+    :return: source path and error message (None if the transformation was successful).
+    :rtype: tuple(str, str or None)
+    """
+
+    source_path, target_path, operations = job
+    try:
+        transform_file(source_path, target_path, operations)
+    except Exception as exc:
+        return source_path, str(exc)
+
+    return source_path, None
+
+
+def transform_folder(source_folder, target_folder, operations, processes=None, recursive=True):
+    """
+    Transforms all SVG files of the given folder in parallel processes.
+
+    :param str source_folder: folder containing SVG files.
+    :param str target_folder: folder where transformed SVG files are stored, keeping folder structure.
+    :param list(tuple(str, dict)) operations: list of operation names and their arguments.
+    :param int processes: number of processes. If not given, the number of CPUs is used.
+    :param bool recursive: whether to process SVG files of sub folders.
+    :return: report with the list of transformed files and the list of failed files and their errors.
+    :rtype: dict
+    """
+
+    jobs = list()
+    for root, folders, files in os.walk(source_folder):
+        if not recursive:
+            folders[:] = list()
+        for file_name in files:
+            if not file_name.lower().endswith(SVG_EXTENSION):
+                continue
+            source_path = os.path.join(root, file_name)
+            target_path = os.path.join(target_folder, os.path.relpath(source_path, source_folder))
+            target_dir = os.path.dirname(target_path)
+            if not os.path.isdir(target_dir):
+                os.makedirs(target_dir)
+            jobs.append((source_path, target_path, operations))
+
+    report = {'transformed': list(), 'failed': list()}
+    if not jobs:
+        return report
+
+    if FUTURES_AVAILABLE:
+        chunk_size = max(1, len(jobs) // ((processes or multiprocessing.cpu_count()) * 4))
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_transform_file_job, jobs, chunksize=chunk_size))
+    else:
+        results = [_transform_file_job(job) for job in jobs]
+    for source_path, error in results:
+        if error:
+            LOGGER.warning('Impossible to transform SVG file "{}": {}'.format(source_path, error))
+            report['failed'].append((source_path, error))
+        else:
+            report['transformed'].append(source_path)
+
+    return report
+
+
+class SvgIndex(object):
+    """
+    Index of the elements of a SVG file by id and class. Index stores the byte offset of each indexed element, so
+    attribute edits are applied by rewriting only the start tags of the edited elements, without loading the
+    document into memory.
+    """
+
+    def __init__(self, svg_path):
+        super(SvgIndex, self).__init__()
+
+        self._svg_path = svg_path
+        self._elements = list()
+        self._by_id = dict()
+        self._by_class = dict()
+        self._edits = dict()
+
+        self.reload()
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __contains__(self, element_id):
+        return element_id in self._by_id
+
+    # =================================================================================================================
+    # PROPERTIES
+    # =================================================================================================================
+
+    @property
+    def path(self):
+        return self._svg_path
+
+    # =================================================================================================================
+    # BASE
+    # =================================================================================================================
+
+    def reload(self):
+        """
+        Indexes SVG file again, discarding all not saved edits.
+        """
+
+        self._elements = list()
+        self._by_id = dict()
+        self._by_class = dict()
+        self._edits = dict()
+
+        parser = expat.ParserCreate()
+        parser.ordered_attributes = True
+        parser.buffer_text = True
+
+        def _start_element(name, attributes):
+            attributes = OrderedDict(zip(attributes[0::2], attributes[1::2]))
+            if 'id' not in attributes and 'class' not in attributes:
+                return
+            element = {'tag': name, 'attributes': attributes, 'offset': parser.CurrentByteIndex}
+            self._elements.append(element)
+            if 'id' in attributes:
+                self._by_id[attributes['id']] = element
+            for class_name in attributes.get('class', '').split():
+                self._by_class.setdefault(class_name, list()).append(element)
+
+        parser.StartElementHandler = _start_element
+        with io.open(self._svg_path, 'rb') as svg_file:
+            parser.ParseFile(svg_file)
+
+    def ids(self):
+        """
+        Returns ids of all indexed elements.
+
+        :return: list of element ids.
+        :rtype: list(str)
+        """
+
+        return list(self._by_id.keys())
+
+    def classes(self):
+        """
+        Returns all class names used by indexed elements.
+
+        :return: list of class names.
+        :rtype: list(str)
+        """
+
+        return list(self._by_class.keys())
+
+    def get(self, element_id):
+        """
+        Returns the tag and attributes of the element with the given id.
+
+        :param str element_id: element id.
+        :return: element tag and attributes.
+        :rtype: tuple(str, dict) or None
+        """
+
+        element = self._by_id.get(element_id)
+        if not element:
+            return None
+
+        return element['tag'], OrderedDict(self._element_attributes(element))
+
+    def find_by_class(self, class_name):
+        """
+        Returns the ids of the elements with the given class.
+
+        :param str class_name: class name.
+        :return: list of element ids. Elements without id are returned as None.
+        :rtype: list(str or None)
+        """
+
+        return [element['attributes'].get('id') for element in self._by_class.get(class_name, list())]
+
+    def set_attribute(self, element_id, attribute_name, value):
+        """
+        Sets the value of an attribute of the element with the given id. Edits are not stored until save is called.
+
+        :param str element_id: element id.
+        :param str attribute_name: attribute name.
+        :param str or None value: new attribute value. If None, attribute is removed.
+        """
+
+        element = self._by_id.get(element_id)
+        if not element:
+            raise KeyError('SVG element with id "{}" not found in "{}"'.format(element_id, self._svg_path))
+        self._edit(element, attribute_name, value)
+
+    def set_class_attribute(self, class_name, attribute_name, value):
+        """
+        Sets the value of an attribute of all the elements with the given class.
+
+        :param str class_name: class name.
+        :param str attribute_name: attribute name.
+        :param str or None value: new attribute value. If None, attribute is removed.
+        :return: number of edited elements.
+        :rtype: int
+        """
+
+        elements = self._by_class.get(class_name, list())
+        for element in elements:
+            self._edit(element, attribute_name, value)
+
+        return len(elements)
+
+    def has_edits(self):
+        """
+        Returns whether there are edits pending to be saved.
+
+        :return: True if there are pending edits; False otherwise.
+        :rtype: bool
+        """
+
+        return bool(self._edits)
+
+    def save(self, target_path=None):
+        """
+        Stores all edits. Only the start tags of edited elements are rewritten, the rest of the file is copied
+        in chunks.
+
+        :param str target_path: path where edited SVG is stored. If not given, SVG file is overwritten.
+        :return: path of the saved file.
+        :rtype: str
+        """
+
+        target_path = target_path or self._svg_path
+        temp_path = '{}.{}.tmp'.format(target_path, os.getpid())
+        edits = sorted(self._edits.values(), key=lambda element: element['offset'])
+        try:
+            with io.open(self._svg_path, 'rb') as source_file, io.open(temp_path, 'wb') as target_file:
+                position = 0
+                for element in edits:
+                    self._copy_bytes(source_file, target_file, element['offset'] - position)
+                    tag_length = self._start_tag_length(source_file)
+                    source_file.seek(element['offset'] + tag_length)
+                    target_file.write(self._start_tag(element).encode('utf-8'))
+                    position = element['offset'] + tag_length
+                self._copy_bytes(source_file, target_file, None)
+            if os.path.isfile(target_path):
+                os.remove(target_path)
+            os.rename(temp_path, target_path)
+        finally:
+            if os.path.isfile(temp_path):
+                os.remove(temp_path)
+
+        if target_path == self._svg_path:
+            self.reload()
+
+        return target_path
+
+    # =================================================================================================================
+    # INTERNAL
+    # =================================================================================================================
+
+    def _element_attributes(self, element):
+        """
+        Internal function that returns the attributes of the given element with its pending edits applied.
+
+        :param dict element: indexed element.
+        :return: element attributes.
+        :rtype: OrderedDict
+        """
+
+        return element.get('edited_attributes', element['attributes'])
+
+    def _edit(self, element, attribute_name, value):
+        """
+        Internal function that registers an attribute edit of the given element.
+
+        :param dict element: indexed element.
+        :param str attribute_name: attribute name.
+        :param str or None value: new attribute value. If None, attribute is removed.
+        """
+
+        attributes = element.setdefault('edited_attributes', OrderedDict(element['attributes']))
+        if value is None:
+            attributes.pop(attribute_name, None)
+        else:
+            attributes[attribute_name] = str(value)
+        self._edits[element['offset']] = element
+
+    def _start_tag(self, element):
+        """
+        Internal function that returns the start tag of the given element with its pending edits applied.
+
+        :param dict element: indexed element.
+        :return: start tag.
+        :rtype: str
+        """
+
+        attributes = ''.join(
+            ' {}={}'.format(name, saxutils.quoteattr(value)) for name, value in self._element_attributes(
+                element).items())
+
+        return '<{}{}{}>'.format(element['tag'], attributes, '/' if element.get('empty') else '')
+
+    def _start_tag_length(self, source_file):
+        """
+        Internal function that returns the length, in bytes, of the start tag located at the current position of the
+        given file. It also stores whether the tag is an empty element tag.
+
+        :param file source_file: binary file which current position is the beginning of a start tag.
+        :return: start tag length.
+        :rtype: int
+        """
+
+        start = source_file.tell()
+        quote = None
+        length = 0
+        previous = None
+        while True:
+            chunk = source_file.read(4096)
+            if not chunk:
+                raise ValueError('Unterminated start tag at byte {} of "{}"'.format(start, self._svg_path))
+            for i in range(len(chunk)):
+                char = chunk[i:i + 1]
+                if quote:
+                    if char == quote:
+                        quote = None
+                elif char in (b'"', b"'"):
+                    quote = char
+                elif char == b'>':
+                    source_file.seek(start)
+                    element = self._edits.get(start)
+                    if element is not None:
+                        element['empty'] = previous == b'/'
+                    return length + i + 1
+                previous = char
+            length += len(chunk)
+
+    def _copy_bytes(self, source_file, target_file, size):
+        """
+        Internal function that copies given number of bytes from the current position of the source file.
+
+        :param file source_file: binary file to read from.
+        :param file target_file: binary file to write into.
+        :param int or None size: number of bytes to copy. If None, all remaining bytes are copied.
+        """
+
+        while size is None or size > 0:
+            chunk = source_file.read(65536 if size is None else min(size, 65536))
+            if not chunk:
+                break
+            target_file.write(chunk)
+            if size is not None:
+                size -= len(chunk)
+
+
+def _parse_color_map(values):
+    color_map = dict()
+    for value in values or list():
+        source_color, _, target_color = value.partition('=')
+        if not target_color:
+            raise argparse.ArgumentTypeError('Invalid recolor value "{}". Expected format: "#555555=#FF0000"'.format(
+                value))
+        color_map[source_color] = target_color
+
+    return color_map
+
+
+def main(args=None):
+    """
+    Command line entry point that transforms a folder of SVG files in parallel processes.
+
+    :param list(str) args: command line arguments. If not given, sys.argv is used.
+    :return: exit code.
+    :rtype: int
+    """
+
+    arg_parser = argparse.ArgumentParser(description='Batch SVG streaming transformations')
+    arg_parser.add_argument('source', help='folder (or SVG file) to process')
+    arg_parser.add_argument('target', help='folder (or SVG file) where processed SVG files are stored')
+    arg_parser.add_argument(
+        '--recolor', action='append', metavar='SOURCE=TARGET', help='replaces a color (can be used multiple times)')
+    arg_parser.add_argument('--strip-metadata', action='store_true', help='removes metadata and editor data')
+    arg_parser.add_argument('--size', metavar='WIDTHxHEIGHT', help='new size of the SVG files, for example: 32x32')
+    arg_parser.add_argument('--minify', action='store_true', help='removes unnecessary whitespace')
+    arg_parser.add_argument('--processes', type=int, default=None, help='number of processes to use')
+    arg_parser.add_argument('--no-recursive', action='store_true', help='skips sub folders')
+    parsed = arg_parser.parse_args(args)
+
+    operations = list()
+    if parsed.recolor:
+        operations.append(('recolor', {'color_map': _parse_color_map(parsed.recolor)}))
+    if parsed.strip_metadata:
+        operations.append(('strip_metadata', dict()))
+    if parsed.size:
+        width, _, height = parsed.size.lower().partition('x')
+        operations.append(('resize', {'width': width, 'height': height or width}))
+    if parsed.minify:
+        operations.append(('minify', dict()))
+
+    logging.basicConfig(level=logging.INFO)
+    if os.path.isfile(parsed.source):
+        transform_file(parsed.source, parsed.target, operations)
+        return 0
+
+    report = transform_folder(
+        parsed.source, parsed.target, operations, processes=parsed.processes, recursive=not parsed.no_recursive)
+    LOGGER.info('Transformed SVG files: {} | Failed: {}'.format(len(report['transformed']), len(report['failed'])))
+
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())